@@ -0,0 +1,59 @@
+"""
+Call overhead benchmark: python benchmarks/calls.py [--calls N] [--runs N]
+
+Times a procedure counting down with tail calls in programs that first define 10, 1,000 and 10,000 globals, for each
+dialect and Scheme engine, so that how the cost of a call depends on the size of the program shows. Best of --runs,
+in microseconds per call.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylisp import common_pylisp, scheme_pylisp  # noqa: E402
+
+sizes = (10, 1000, 10000)
+programs = {
+    'scheme': ('(define g{i} {i})', '(define (count-down n) (if (= n 0) 0 (count-down (- n 1))))',
+               '(count-down {calls})'),
+    'common': ('(defparameter g{i} {i})', '(defun count-down (n) (if (= n 0) 0 (count-down (- n 1))))',
+               '(count-down {calls})'),
+}
+
+
+def interpreters():
+    # (label, dialect, function making a fresh interpreter)
+    yield 'scheme analyze', 'scheme', lambda: scheme_pylisp.Interpreter('analyze')
+    yield 'scheme vm', 'scheme', lambda: scheme_pylisp.Interpreter('vm')
+    yield 'common', 'common', common_pylisp.Interpreter
+
+
+def per_call(make, dialect, size, calls, runs):
+    define, procedure, call = programs[dialect]
+    interpreter = make()
+    interpreter.run('\n'.join(define.format(i=i) for i in range(size)))
+    interpreter.run(procedure)
+    code = call.format(calls=calls)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        interpreter.run(code)
+        times.append(time.perf_counter() - start)
+    return min(times) / calls * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python benchmarks/calls.py', description=__doc__.split('\n\n')[1])
+    parser.add_argument('--calls', type=int, default=20000, help='calls per run (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='runs of each, the best kept (default %(default)s)')
+    args = parser.parse_args(argv)
+    print(f'{"globals":>24}' + ''.join(f'{size:>10}' for size in sizes))
+    for label, dialect, make in interpreters():
+        row = [per_call(make, dialect, size, args.calls, args.runs) for size in sizes]
+        print(f'{label + " us/call":>24}' + ''.join(f'{us:>10.2f}' for us in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Memory benchmark: python benchmarks/memory.py [--cells N]
+
+Measures with tracemalloc the bytes per cell of a list of --cells conses built from Python, holding an int or a
+string in each, for each dialect.
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylisp import common_pylisp, scheme_pylisp  # noqa: E402
+
+
+def per_cell(module, cells, item):
+    # Bytes allocated per cons for a list of `cells` conses holding `item(i)`, the items included
+    nil = module.BuiltIns.NIL
+    tracemalloc.start()
+    lst = nil
+    for i in range(cells):
+        lst = module.Cons(item(module, i), lst)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return allocated / cells
+
+
+items = {
+    'int': lambda module, i: i + 1000,  # Beyond the small ints Python shares
+    'string': lambda module, i: module.BuiltIns.String('s'),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python benchmarks/memory.py', description=__doc__.split('\n\n')[1])
+    parser.add_argument('--cells', type=int, default=1000000, help='conses in the list (default %(default)s)')
+    args = parser.parse_args(argv)
+    for name, module in (('scheme', scheme_pylisp), ('common', common_pylisp)):
+        cons = sys.getsizeof(module.Cons(1, module.BuiltIns.NIL))
+        row = '  '.join(f'{kind} {per_cell(module, args.cells, item):.0f}' for kind, item in items.items())
+        print(f'{name}: cons {cons} bytes; bytes per cell with items: {row}')
+
+
+if __name__ == '__main__':
+    main()
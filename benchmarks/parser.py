@@ -0,0 +1,87 @@
+"""
+Parser benchmark: python benchmarks/parser.py [--megabytes N] [--runs N]
+
+Times Parser().parse for each dialect on generated sources of about --megabytes: SICP-style definitions, and string
+literals of 20 KB. Best of --runs with the garbage collector paused, in MB/s.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylisp import common_pylisp, scheme_pylisp  # noqa: E402
+
+definitions = {
+    'scheme': '''
+(define (sqrt-iter-{i} guess x)
+  ; Newton's method, SICP 1.1.7
+  (if (good-enough? guess x)
+      guess
+      (sqrt-iter-{i} (improve guess x) x)))
+(define (count-change-{i} amount kinds)
+  (cond ((= amount 0) 1)
+        ((or (< amount 0) (= kinds 0)) 0)
+        (else (+ (count-change-{i} amount (- kinds 1)) (count-change-{i} (- amount {n}) kinds)))))
+(define data-{i} '(alpha beta {n} {x} "text {n}" (nested (list {n} {x}))))
+''',
+    'common': '''
+(defun sqrt-iter-{i} (guess x)
+  ; Newton's method, SICP 1.1.7
+  (if (good-enough guess x)
+      guess
+      (sqrt-iter-{i} (improve guess x) x)))
+(defun count-change-{i} (amount kinds)
+  (cond ((= amount 0) 1)
+        ((< amount 0) 0)
+        ((= kinds 0) 0)
+        (t (+ (count-change-{i} amount (- kinds 1)) (count-change-{i} (- amount {n}) kinds)))))
+(defparameter data-{i} '(alpha beta {n} {x} "text {n}" (nested (list {n} {x}))))
+''',
+}
+
+
+def sources(dialect, megabytes):
+    # (name, text) of the sources to parse
+    rng = random.Random(1)
+    size = int(megabytes * 1e6)
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        part = definitions[dialect].format(i=i, n=rng.randint(0, 10 ** 6), x=round(rng.uniform(-1e3, 1e3), 3))
+        parts.append(part)
+        length += len(part)
+        i += 1
+    yield 'definitions', ''.join(parts)
+    yield 'strings', '\n'.join('"' + 'x' * 20000 + '"' for _ in range(max(1, size // 20000)))
+
+
+def throughput(module, text, runs):
+    times = []
+    gc.disable()
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            module.Parser().parse(text)
+            times.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return len(text.encode()) / 1e6 / min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python benchmarks/parser.py', description=__doc__.split('\n\n')[1])
+    parser.add_argument('--megabytes', type=float, default=3, help='size of each source (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='runs of each, the best kept (default %(default)s)')
+    args = parser.parse_args(argv)
+    for dialect, module in (('scheme', scheme_pylisp), ('common', common_pylisp)):
+        for name, text in sources(dialect, args.megabytes):
+            print(f'{dialect} {name}: {len(text.encode()) / 1e6:.1f} MB at {throughput(module, text, args.runs):.2f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
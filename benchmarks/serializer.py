@@ -0,0 +1,70 @@
+"""
+Serializer benchmark: python benchmarks/serializer.py [--lists N] [--runs N]
+
+Times Serializer.dumps and Serializer.loads against printing and reading the same value, on nested lists of symbols,
+numbers and strings built from a fixed seed, with some of the lists shared. Best of --runs, in seconds.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pylisp.scheme_pylisp import BuiltIns, Cons, Parser, Serializer, Symbol  # noqa: E402
+
+
+def build(rng, symbols, shared, depth):
+    items = []
+    for _ in range(8):
+        r = rng.random()
+        if depth > 0 and r < 0.3:
+            items.append(build(rng, symbols, shared, depth - 1))
+        elif r < 0.35 and depth > 1 and shared:  # Shared lists are of depth 1, so printing them stays linear
+            items.append(rng.choice(shared))
+        elif r < 0.6:
+            items.append(rng.choice(symbols))
+        elif r < 0.8:
+            items.append(rng.randint(-10 ** 6, 10 ** 6))
+        else:
+            items.append(BuiltIns.String(f'text {rng.randint(0, 99)}'))
+    lst = BuiltIns.NIL
+    for item in reversed(items):
+        lst = Cons(item, lst)
+    if depth == 1 and len(shared) < 50:
+        shared.append(lst)
+    return lst
+
+
+def best(runs, function):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python benchmarks/serializer.py', description=__doc__.split('\n\n')[1])
+    parser.add_argument('--lists', type=int, default=300, help='top-level lists (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='runs of each, the best kept (default %(default)s)')
+    args = parser.parse_args(argv)
+    rng = random.Random(1)
+    symbols = [Symbol(f'S{i}') for i in range(200)]
+    shared = []
+    value = BuiltIns.NIL
+    for _ in range(args.lists):
+        value = Cons(build(rng, symbols, shared, 3), value)
+    text = str(value)
+    data = Serializer.dumps(value)
+    assert str(Serializer.loads(data)) == text
+    print(f'print {best(args.runs, lambda: str(value)):.3f}s  '
+          f'read {best(args.runs, lambda: Parser().parse(text)):.3f}s  {len(text.encode()) // 1024}KB')
+    print(f'dumps {best(args.runs, lambda: Serializer.dumps(value)):.3f}s  '
+          f'loads {best(args.runs, lambda: Serializer.loads(data)):.3f}s  {len(data) // 1024}KB')
+
+
+if __name__ == '__main__':
+    main()
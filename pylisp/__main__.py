@@ -0,0 +1,86 @@
+"""
+Command-line runner: python -m pylisp [options] [file ...]
+
+Runs the given files and then the `-e` code in one global environment, or standard input when there is neither.
+The dialect is that of the file suffixes, which must agree unless --dialect is given. Only the interpreter of the
+dialect used is imported.
+"""
+import argparse
+import importlib
+import io
+import sys
+
+dialects = {'scheme': 'pylisp.scheme_pylisp', 'common': 'pylisp.common_pylisp'}
+common_suffixes = ('.lisp', '.lsp', '.cl')
+
+
+def read_forms(interpreter, sources, cache):
+    # Top-level forms of each source in turn, read as they are evaluated
+    for kind, source in sources:
+        if kind == 'code':
+            yield from interpreter.Parser().iter_forms(io.StringIO(source))
+        elif source == '-':
+            yield from interpreter.Parser().iter_forms(sys.stdin)
+        elif cache:
+            yield from interpreter.ParseCache.read(source)
+        else:
+            with open(source, encoding='utf-8') as stream:
+                yield from interpreter.Parser().iter_forms(stream)
+
+
+def run_sampled(interpreter, forms, args):
+    # The stacks are written even if the program fails
+    sampler = interpreter.Sampler(args.rate)
+    try:
+        sampler.run(lambda: interpreter.SchemePyLispInterpreter.run_forms(forms, args.engine, args.image))
+    finally:
+        with open(args.sample, 'w', encoding='utf-8') as file:
+            sampler.report(file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pylisp', description='Runs Scheme or Common Lisp programs.')
+    parser.add_argument('files', nargs='*', help='source files, run in order; - for standard input')
+    parser.add_argument('-e', dest='code', action='append', default=[], help='code run after the files; repeatable')
+    parser.add_argument('--dialect', choices=dialects,
+                        help='default: common for .lisp, .lsp and .cl files, otherwise scheme')
+    parser.add_argument('--engine', choices=('analyze', 'vm'), default='analyze', help='Scheme evaluator')
+    parser.add_argument('--cache', action='store_true', help='keep the forms read from files in __pycache__')
+    parser.add_argument('--image', help='Scheme image saved by SAVE-IMAGE to start from')
+    parser.add_argument('--sample', metavar='FILE', help='write the Scheme call stacks sampled while running to FILE, '
+                                                         'collapsed for flame graph tools')
+    parser.add_argument('--rate', type=int, default=100, help='samples a second with --sample')
+    args = parser.parse_args(argv)
+
+    dialect = args.dialect
+    if dialect is None:
+        # Of the files, which all run in one global environment; standard input and -e code follow them
+        found = {'common' if file.lower().endswith(common_suffixes) else 'scheme' for file in args.files if file != '-'}
+        if len(found) > 1:
+            parser.error('the files are of both dialects; run them separately, or pass --dialect')
+        dialect = found.pop() if found else 'scheme'
+    if dialect == 'common' and (args.engine != 'analyze' or args.image is not None or args.sample is not None):
+        parser.error('--engine, --image and --sample apply to Scheme only')
+    interpreter = importlib.import_module(dialects[dialect])
+    sources = [('file', file) for file in args.files] + [('code', code) for code in args.code]
+    forms = read_forms(interpreter, sources or [('file', '-')], args.cache)
+    try:
+        if args.sample is not None:
+            run_sampled(interpreter, forms, args)
+        elif dialect == 'scheme':
+            interpreter.SchemePyLispInterpreter.run_forms(forms, args.engine, args.image)
+        else:
+            interpreter.CommonPyLispInterpreter.run_forms(forms)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        sys.stdout.flush()
+        print(f'{type(e).__name__}: {" ".join(str(arg) for arg in e.args)}', file=sys.stderr)
+        return 1
+    finally:
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,17 @@
+import contextlib
+import contextvars
+import io
+import itertools
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+
+profiling = False  # Whether a `Profiler` runs, so that procedures record their applications
+
+
 class Error:
     # Lisp errors
     class IllegalProcedureNameException(Exception): pass
@@ -20,42 +34,43 @@ class Error:
 
 
 class Object:
-    # All things to be evaluated are objects
+    # All things to be evaluated are objects; `__slots__` throughout keeps instances free of a per-object dict
+    __slots__ = ()  # `value` is a slot of the subclasses holding one, so that a cons is only its car and cdr
+
     def __init__(self, value):
         self.value = value
 
-    def evaluate(self, env):
-        raise Exception('Undefined Object evaluation:', self)
-
 
 class Symbol(Object):
-    # Represents a binding in the environment
-    def evaluate(self, env):
-        return env.get_var(self)
+    # Represents a binding in the environment; interned, so each name is a single object compared by identity
+    __slots__ = ('value',)
+    table = {}
+
+    def __new__(cls, value):
+        symbol = Symbol.table.get(value)
+        if symbol is None:
+            symbol = Symbol.table.setdefault(value, super().__new__(cls))
+        return symbol
 
     def __str__(self):
         return str(self.value)
 
 
 class SelfEvaluatingObject(Object):
-    def evaluate(self, env):
-        return self
+    __slots__ = ('value',)
 
     def __str__(self):
         return str(self.value)
 
 
 class Cons(Object):
+    __slots__ = ('car', 'cdr')
+    value = 'CONS'  # Shared by all conses rather than stored in each
+
     def __init__(self, car, cdr):
-        super().__init__('CONS')
         self.car = car
         self.cdr = cdr
 
-    def evaluate(self, env):
-        proc = env.get_proc(self.car)
-        args = self.cdr
-        return proc.evaluate(env, args)
-
     def __str__(self):
         if self.cdr is BuiltIns.NIL:
             return f'({self.car})'
@@ -70,29 +85,73 @@ class Cons(Object):
         return f'({" ".join(s)})'
 
 
+class Cell:
+    # Holds the value of a global binding; analyzed code keeps a reference to the cell instead of looking it up
+    __slots__ = ('symbol', 'value')
+
+    def __init__(self, symbol, value=None):
+        self.symbol = symbol
+        self.value = value  # `None` while unbound
+
+
 class Environment:
-    def __init__(self, var_bindings: dict, proc_bindings: dict):
-        self.var_bindings = var_bindings
-        self.proc_bindings = proc_bindings
+    # Global bindings; an extended environment shadows its parent with cells of its own, copied on first use
+    def __init__(self, var_bindings: dict, proc_bindings: dict, parent=None):
+        self.var_cells = {symbol: Cell(symbol, value) for symbol, value in var_bindings.items()}
+        self.proc_cells = {symbol: Cell(symbol, value) for symbol, value in proc_bindings.items()}
+        self.parent = parent
+
+    def var_cell(self, symbol):
+        cell = self.var_cells.get(symbol)
+        if cell is None:
+            cell = Cell(symbol, None if self.parent is None else self.parent.lookup_var(symbol))
+            self.var_cells[symbol] = cell
+        return cell
+
+    def proc_cell(self, symbol):
+        cell = self.proc_cells.get(symbol)
+        if cell is None:
+            cell = Cell(symbol, None if self.parent is None else self.parent.lookup_proc(symbol))
+            self.proc_cells[symbol] = cell
+        return cell
+
+    def lookup_var(self, symbol):
+        # Value of `symbol` without adding a cell for it, so that parents shared by many environments are only read
+        env = self
+        while env is not None:
+            cell = env.var_cells.get(symbol)
+            if cell is not None:
+                return cell.value
+            env = env.parent
+        return None
+
+    def lookup_proc(self, symbol):
+        env = self
+        while env is not None:
+            cell = env.proc_cells.get(symbol)
+            if cell is not None:
+                return cell.value
+            env = env.parent
+        return None
 
     def bind_var(self, symbol, item):
         if type(symbol) is not Symbol:
             raise Error.IllegalVariableNameException(symbol)
         if BuiltIns.is_symbol_globally_bound(symbol):
             raise Error.SymbolLockBoundViolationException(symbol)
-        self.var_bindings[symbol.value] = item
+        self.var_cell(symbol).value = item
 
     def bind_proc(self, symbol, item):
         if type(symbol) is not Symbol:
             raise Error.IllegalProcedureNameException(symbol)
         if BuiltIns.is_symbol_globally_bound(symbol):
             raise Error.SymbolLockBoundViolationException(symbol)
-        self.proc_bindings[symbol.value] = item
+        self.proc_cell(symbol).value = item
 
     def get_var(self, symbol):
         if type(symbol) is not Symbol:
             raise Error.IllegalVariableNameException(symbol)
-        var = self.var_bindings.get(symbol.value)
+        var = self.var_cell(symbol).value
         if var is None:
             raise Error.UndefinedVariableException(symbol)
         return var
@@ -100,583 +159,1194 @@ class Environment:
     def get_proc(self, symbol):
         if type(symbol) is not Symbol:
             raise Error.IllegalProcedureNameException(symbol)
-        proc = self.proc_bindings.get(symbol.value)
+        proc = self.proc_cell(symbol).value
         if proc is None:
             raise Error.UndefinedProcedureException(symbol)
         return proc
 
-    def copy(self):
-        return self.var_bindings.copy(), self.proc_bindings.copy()
+    def extend(self):
+        return Environment({}, {}, self)
+
+
+class TailCall:
+    # A procedure application left pending in tail position, resolved in a loop rather than on the Python stack
+    __slots__ = ('proc', 'args')
+
+    def __init__(self, proc, args):
+        self.proc = proc
+        self.args = args
+
+    @staticmethod
+    def resolve(result):
+        while type(result) is TailCall:
+            result = result.proc.apply_tail(result.args)
+        return result
 
 
 class Procedure:
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
-    def evaluate(self, env, args):
-        raise Exception('Undefined Procedure evaluation:', self)
+    def apply(self, args):
+        # Applies the procedure to a list of already evaluated arguments
+        raise Exception('Undefined Procedure application:', self)
+
+    def apply_tail(self, args):
+        # Application in tail position; may return a `TailCall` to be resolved by the caller
+        return self.apply(args)
 
     def __str__(self):
         return f'#<FUNCTION {self.name}>'
 
 
+class SpecialForm(Procedure):
+    # Syntax resolved by the `Analyzer` rather than applied at run time
+    def analyze(self, args, scope, tail):
+        raise Exception('Undefined SpecialForm analysis:', self)
+
+    def apply(self, args):
+        raise Error.IllegalFunctionCallException(self)
+
+
 class UserDefinedProcedure(Procedure):
-    def __init__(self, name, parameters, expression):
+    __slots__ = ('parameters', 'expression', 'frame', 'body', 'size')
+
+    def __init__(self, name, parameters, expression, frame, body, size):
         super().__init__(name)
-        self.parameters = parameters
+        self.parameters = parameters  # Tuple of parameter `Symbol`s
         self.expression = expression
+        self.frame = frame  # Frame the procedure was defined in
+        self.body = body  # `expression` as analyzed by `Analyzer.analyze_body`
+        self.size = size  # Number of slots in a frame of the body
 
-    def evaluate(self, env, args):
-        lexical_env = Environment(*env.copy())
-        parameter = self.parameters
-        arg = args
-        while parameter is not BuiltIns.NIL and arg is not BuiltIns.NIL:  # Binding values to parameters
-            lexical_env.bind_var(parameter.car, arg.car.evaluate(env))
-            parameter = parameter.cdr
-            arg = arg.cdr
-        if parameter is not BuiltIns.NIL or arg is not BuiltIns.NIL:  # Left over parameter or argument
+    def apply(self, args):
+        return TailCall.resolve(self.apply_tail(args))
+
+    def apply_tail(self, args):
+        if len(args) != len(self.parameters):  # Left over parameter or argument
             raise Error.InvalidNOFArgumentsException(self)
-        e = self.expression
-        while e is not BuiltIns.NIL:  # Evaluating expressions in function; return result of last evaluation
-            result = e.car.evaluate(lexical_env)
-            if e.cdr is BuiltIns.NIL:
-                return result
-            else:
-                e = e.cdr
+        frame = [self.frame, *args]
+        if self.size > len(frame):
+            frame.extend([None] * (self.size - len(frame)))
+        if not profiling:
+            return self.body(frame)
+        profiler = Profiler.current.get()
+        if profiler is None:
+            return self.body(frame)
+        # Recorded here rather than by a wrapper, as applications of user procedures are the most frequent
+        depth = len(profiler.stack)
+        profiler.enter(self.name)
+        try:
+            return self.body(frame)
+        finally:
+            if len(profiler.stack) > depth + 1:
+                profiler.unwind(depth + 1)
+            profiler.exit()
 
 
 class BuiltIns:
 
     class NilClass(SelfEvaluatingObject):
+        __slots__ = ()
+
         def __init__(self):
             super().__init__('NIL')
 
     NIL = NilClass()
 
     class TClass(SelfEvaluatingObject):
+        __slots__ = ()
+
         def __init__(self):
             super().__init__('T')
 
     T = TClass()
 
-    class Number(SelfEvaluatingObject):
-        def __add__(self, other):
-            return BuiltIns.Number(self.value + other.value)
-
-        def __sub__(self, other):
-            return BuiltIns.Number(self.value - other.value)
+    # Numbers are native Python ints and floats, so arithmetic allocates no wrapper objects
 
-        def __mul__(self, other):
-            return BuiltIns.Number(self.value * other.value)
-
-        def __truediv__(self, other):
-            if other.value == 0:
-                raise ValueError("Division by zero is not allowed")
-            return BuiltIns.Number(self.value / other.value)
-
-        def __gt__(self, other):
-            return self.value > other.value
-
-        def __lt__(self, other):
-            return self.value < other.value
-
-        def __ge__(self, other):
-            return self.value >= other.value
-
-        def __le__(self, other):
-            return self.value <= other.value
-
-        def __eq__(self, other):
-            return self.value == other.value
-
-    class String(SelfEvaluatingObject): pass
+    class String(SelfEvaluatingObject):
+        __slots__ = ()
 
     class BuiltInProcs:
         class ConsFunc(Procedure):
             def __init__(self):
                 super().__init__('CONS')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is BuiltIns.NIL or  # 1 arg
-                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+            def apply(self, args):
+                if len(args) != 2:
                     raise Error.InvalidNOFArgumentsException(self)
-                return Cons(args.car.evaluate(env),
-                            args.cdr.car.evaluate(env))
+                return Cons(args[0], args[1])
 
         class CarFunc(Procedure):
             def __init__(self):
                 super().__init__('CAR')
 
-            def call(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                return args.car.evaluate(env).car
+                return args[0].car
 
         class CdrFunc(Procedure):
             def __init__(self):
                 super().__init__('CDR')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                return args.car.evaluate(env).cdr
+                return args[0].cdr
 
         class ListFunc(Procedure):
             def __init__(self):
                 super().__init__('LIST')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL:
-                    return args
-                a = args
-                while a is not BuiltIns.NIL:
-                    a.car = a.car.evaluate(env)
-                    a = a.cdr
-                return args
+            def apply(self, args):
+                result = BuiltIns.NIL
+                for item in reversed(args):
+                    result = Cons(item, result)
+                return result
 
         class AddProc(Procedure):
             def __init__(self):
                 super().__init__('+')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL:
-                    return BuiltIns.Number(0)
-                else:
-                    return args.car.evaluate(env) + BuiltIns.global_funcs.get("+").evaluate(env, args.cdr)
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return args[0] + args[1]
+                total = 0
+                for arg in args:
+                    total += arg
+                return total
 
         class DiffProc(Procedure):
             def __init__(self):
                 super().__init__('-')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                if args.cdr is BuiltIns.NIL:  # 1 arg
-                    total = args.car.evaluate(env) * BuiltIns.Number(-1)
-                else:
-                    total = args.car.evaluate(env)
-                    arg = args.cdr
-                    while arg is not BuiltIns.NIL:
-                        total -= arg.car.evaluate(env)
-                        arg = arg.cdr
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return args[0] - args[1]
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                if len(args) == 1:  # 1 arg
+                    return -args[0]
+                total = args[0]
+                for i in range(1, len(args)):
+                    total -= args[i]
                 return total
 
         class ProdProc(Procedure):
             def __init__(self):
                 super().__init__('*')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL:
-                    return BuiltIns.Number(1)
-                else:
-                    return args.car.evaluate(env) * BuiltIns.global_funcs.get("*").evaluate(env, args.cdr)
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return args[0] * args[1]
+                total = 1
+                for arg in args:
+                    total *= arg
+                return total
 
         class QuotProc(Procedure):
             def __init__(self):
                 super().__init__('/')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                if args.cdr is BuiltIns.NIL:  # 1 arg
-                    total = BuiltIns.Number(1.0) / args.car.evaluate(env)
+            def apply(self, args):
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                if len(args) == 1:  # 1 arg
+                    total = 1.0
+                    start = 0
                 else:
-                    total = args.car.evaluate(env)
-                    arg = args.cdr
-                    while arg is not BuiltIns.NIL:
-                        total /= arg.car.evaluate(env)
-                        arg = arg.cdr
+                    total = args[0]
+                    start = 1
+                for i in range(start, len(args)):
+                    if args[i] == 0:
+                        raise ValueError("Division by zero is not allowed")
+                    total /= args[i]
                 return total
 
         class EqualProc(Procedure):
             def __init__(self):
                 super().__init__('=')
 
-            def call(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                check = args.car.evaluate(env)
-                arg = args.cdr
-                while arg is not BuiltIns.NIL:
-                    if args.car.evaluate(env) != check: return BuiltIns.NIL
-                    arg = arg.cdr
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return BuiltIns.T if args[0] == args[1] else BuiltIns.NIL
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                check = args[0]
+                for i in range(1, len(args)):
+                    if args[i] != check: return BuiltIns.NIL
                 return BuiltIns.T
 
         class GreaterThanProc(Procedure):
             def __init__(self):
                 super().__init__('>')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is BuiltIns.NIL or  # 1 arg
-                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
-                    raise Error.InvalidNOFArgumentsException(self)
-                t1 = args.car.evaluate(env)
-                t2 = args.cdr.car.evaluate(env)
-                return BuiltIns.T if t1 > t2 else BuiltIns.NIL
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return BuiltIns.T if args[0] > args[1] else BuiltIns.NIL
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                # Each argument must be greater than the next
+                for i in range(1, len(args)):
+                    if not args[i - 1] > args[i]: return BuiltIns.NIL
+                return BuiltIns.T
 
         class LessThanProc(Procedure):
             def __init__(self):
                 super().__init__('<')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is BuiltIns.NIL or  # 1 arg
-                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
-                    raise Error.InvalidNOFArgumentsException(self)
-                t1 = args.car.evaluate(env)
-                t2 = args.cdr.car.evaluate(env)
-                return BuiltIns.T if t1 < t2 else BuiltIns.NIL
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return BuiltIns.T if args[0] < args[1] else BuiltIns.NIL
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                # Each argument must be less than the next
+                for i in range(1, len(args)):
+                    if not args[i - 1] < args[i]: return BuiltIns.NIL
+                return BuiltIns.T
 
         class NotProc(Procedure):
             def __init__(self):
                 super().__init__('NOT')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                return BuiltIns.T if args.car.evaluate(env) is BuiltIns.NIL else BuiltIns.NIL
+                return BuiltIns.T if args[0] is BuiltIns.NIL else BuiltIns.NIL
 
-        class IfProc(Procedure):
+        class IfProc(SpecialForm):
             def __init__(self):
                 super().__init__('IF')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL or  # 1 arg
                         args.cdr.cdr is BuiltIns.NIL or  # 2 args
                         args.cdr.cdr.cdr is not BuiltIns.NIL):  # > 3 args
                     raise Error.InvalidNOFArgumentsException(self)
                 #  (if T 1 0) -> arguments = (T (1 (0 NIL)))
-                if args.car.evaluate(env) is BuiltIns.T:
-                    return args.cdr.car.evaluate(env)
-                else:
-                    return args.cdr.cdr.car.evaluate(env)
+                predicate = Analyzer.analyze(args.car, scope)
+                consequent = Analyzer.analyze(args.cdr.car, scope, tail)
+                alternative = Analyzer.analyze(args.cdr.cdr.car, scope, tail)
+                t = BuiltIns.T
+
+                def execute(frame):
+                    if predicate(frame) is t:
+                        return consequent(frame)
+                    else:
+                        return alternative(frame)
+                return execute
 
-        class CondProc(Procedure):
+        class CondProc(SpecialForm):
             def __init__(self):
                 super().__init__('COND')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
+                clauses = []
                 arg = args
-                while args is not BuiltIns.NIL:
-                    if arg.car.car.evaluate(env) is BuiltIns.T:
-                        return arg.car.cdr.car.evaluate(env)
+                while arg is not BuiltIns.NIL:
+                    clauses.append((Analyzer.analyze(arg.car.car, scope),
+                                    Analyzer.analyze(arg.car.cdr.car, scope, tail)))
                     arg = arg.cdr
-                return BuiltIns.NIL
+                t = BuiltIns.T
+                nil = BuiltIns.NIL
 
-        class QuoteProc(Procedure):
+                def execute(frame):
+                    for predicate, consequent in clauses:
+                        if predicate(frame) is t:
+                            return consequent(frame)
+                    return nil
+                return execute
+
+        class QuoteProc(SpecialForm):
             def __init__(self):
                 super().__init__('QUOTE')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is not BuiltIns.NIL):  # > 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                return args.car
+                quoted = args.car
+                return lambda frame: quoted
 
-        class DefunProc(Procedure):
+        class DefunProc(SpecialForm):
             def __init__(self):
                 super().__init__('DEFUN')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL or  # 1 arg
                         args.cdr.cdr is BuiltIns.NIL):  # 2 args
                     raise Error.InvalidNOFArgumentsException(self)
-                env.bind_proc(args.car, UserDefinedProcedure(name=args.car,
-                                                             parameters=args.cdr.car,
-                                                             expression=args.cdr.cdr))
-                return args.car
-
-        class FunctionProc(Procedure):
+                name = args.car
+                if type(name) is not Symbol:
+                    raise Error.IllegalProcedureNameException(name)
+                if BuiltIns.is_symbol_globally_bound(name):
+                    raise Error.SymbolLockBoundViolationException(name)
+                value = Analyzer.analyze_lambda(name, args.cdr.car, args.cdr.cdr, scope)
+                cell = scope.env.proc_cell(name)
+
+                def execute(frame):
+                    cell.value = value(frame)
+                    return name
+                return execute
+
+        class FunctionProc(SpecialForm):
             def __init__(self):
                 super().__init__('FUNCTION')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is not BuiltIns.NIL):  # > 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                return env.get_proc(args.car)
+                return Analyzer.analyze_function(args.car, scope)
 
         class FuncallProc(Procedure):
             def __init__(self):
                 super().__init__('FUNCALL')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                return args.car.evaluate(env).evaluate(env, args.cdr)
+            def apply(self, args):
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                return args[0].apply(args[1:])
 
-        class LambdaProc(Procedure):
+            def apply_tail(self, args):
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                return TailCall(args[0], args[1:])
+
+        class LambdaProc(SpecialForm):
             def __init__(self):
                 super().__init__('LAMBDA')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL):  # 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                return UserDefinedProcedure(name='LAMBDA', parameters=args.car, expression=args.cdr)
+                return Analyzer.analyze_lambda('LAMBDA', args.car, args.cdr, scope)
 
-        class LetProc(Procedure):
+        class LetProc(SpecialForm):
             def __init__(self):
                 super().__init__('LET')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL):  # 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                lexical_env = Environment(*env.copy())
+                names = []
+                values = []
                 assignment = args.car
                 while assignment is not BuiltIns.NIL:
                     if (assignment.car is BuiltIns.NIL or  # 0 args
-                            args.car.cdr is BuiltIns.NIL or  # 1 arg
-                            args.car.cdr.cdr is not BuiltIns.NIL):  # > 2 arg
+                            assignment.car.cdr is BuiltIns.NIL or  # 1 arg
+                            assignment.car.cdr.cdr is not BuiltIns.NIL):  # > 2 arg
                         raise Error.InvalidNOFArgumentsException(assignment)
-                    lexical_env.bind_var(assignment.car.car, assignment.car.cdr.car.evaluate(env))
+                    Analyzer.check_variable_name(assignment.car.car)
+                    names.append(assignment.car.car)
+                    values.append(Analyzer.analyze(assignment.car.cdr.car, scope))
                     assignment = assignment.cdr
-                expression = args.cdr
-                while expression is not BuiltIns.NIL:  # Evaluating expressions in let; return result of last expression
-                    result = expression.car.evaluate(lexical_env)
-                    if expression.cdr is BuiltIns.NIL:
-                        return result
-                    else:
-                        expression = expression.cdr
-
-        class DefparameterFunc(Procedure):
+                # LET bindings take slots of the enclosing frame, visible only while analyzing the body
+                with scope.block(names) as slots:
+                    body = Analyzer.analyze_body(args.cdr, scope, tail)
+                bindings = tuple(zip(slots, values))
+
+                def execute(frame):
+                    for slot, value in bindings:
+                        frame[slot] = value(frame)
+                    return body(frame)
+                return execute
+
+        class DefparameterFunc(SpecialForm):
             def __init__(self):
                 super().__init__('DEFPARAMETER')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL or  # 1 arg
                         args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
                     raise Error.InvalidNOFArgumentsException(self)
-                env.bind_var(args.car, args.cdr.car.evaluate(env))
+                name = args.car
+                Analyzer.check_variable_name(name)
+                value = Analyzer.analyze(args.cdr.car, scope)
+                cell = scope.env.var_cell(name)
 
-        class DefvarFunc(Procedure):
+                def execute(frame):
+                    cell.value = value(frame)
+                    return name
+                return execute
+
+        class DefvarFunc(SpecialForm):
             def __init__(self):
                 super().__init__('DEFVAR')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL or  # 1 arg
                         args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
                     raise Error.InvalidNOFArgumentsException(self)
-                try:
-                    env.get_var(args.car)
-                except Error.UndefinedVariableException:  # Bind if isn't already bound
-                    env.bind_var(args.car, args.cdr.car.evaluate(env))
+                name = args.car
+                Analyzer.check_variable_name(name)
+                value = Analyzer.analyze(args.cdr.car, scope)
+                cell = scope.env.var_cell(name)
+
+                def execute(frame):
+                    if cell.value is None:  # Bind if isn't already bound
+                        cell.value = value(frame)
+                    return name
+                return execute
 
         class PrintProc(Procedure):
             def __init__(self):
                 super().__init__('PRINT')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                print(args.car.evaluate(env))
+                print(args[0], file=BuiltIns.output.get())
                 return BuiltIns.NIL
 
+        class ProfileProc(SpecialForm):
+            # (profile exp [memory]): the value of `exp`, after printing the time of the functions it applied, and the
+            # blocks they retained unless `memory` is NIL
+            def __init__(self):
+                super().__init__('PROFILE')
+
+            def analyze(self, args, scope, tail):
+                if (args is BuiltIns.NIL or  # 0 args
+                        args.cdr is not BuiltIns.NIL and args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+                    raise Error.InvalidNOFArgumentsException(self)
+                thunk = Analyzer.analyze_lambda('PROFILE', BuiltIns.NIL, Cons(args.car, BuiltIns.NIL), scope)
+                memory = None if args.cdr is BuiltIns.NIL else Analyzer.analyze(args.cdr.car, scope)
+
+                def execute(frame):
+                    profiler = Profiler(memory is not None and memory(frame) is not BuiltIns.NIL)
+                    procedure = thunk(frame)
+                    value = profiler.run(lambda: procedure.apply([]))
+                    profiler.report(BuiltIns.output.get())
+                    return value
+                return execute
+
     global_vars = {
-        "NIL": NIL,
-        "T": T,
+        Symbol("NIL"): NIL,
+        Symbol("T"): T,
     }
     global_funcs = {
-        "CONS": BuiltInProcs.ConsFunc(),
-        "CAR": BuiltInProcs.CarFunc(),
-        "CDR": BuiltInProcs.CdrFunc(),
-        "LIST": BuiltInProcs.ListFunc(),
-        "+": BuiltInProcs.AddProc(),
-        "-": BuiltInProcs.DiffProc(),
-        "*": BuiltInProcs.ProdProc(),
-        "/": BuiltInProcs.QuotProc(),
-        ">": BuiltInProcs.GreaterThanProc(),
-        "<": BuiltInProcs.LessThanProc(),
-        "=": BuiltInProcs.EqualProc(),
-        "NOT": BuiltInProcs.NotProc(),
-        "IF": BuiltInProcs.IfProc(),
-        "COND": BuiltInProcs.CondProc(),
-        "QUOTE": BuiltInProcs.QuoteProc(),
-        "DEFUN": BuiltInProcs.DefunProc(),
-        "FUNCALL": BuiltInProcs.FuncallProc(),
-        "FUNCTION": BuiltInProcs.FunctionProc(),
-        "LAMBDA": BuiltInProcs.LambdaProc(),
-        "LET": BuiltInProcs.LetProc(),
-        "DEFPARAMETER": BuiltInProcs.DefparameterFunc(),
-        "DEFVAR": BuiltInProcs.DefvarFunc(),
-        "PRINT": BuiltInProcs.PrintProc(),
+        Symbol("CONS"): BuiltInProcs.ConsFunc(),
+        Symbol("CAR"): BuiltInProcs.CarFunc(),
+        Symbol("CDR"): BuiltInProcs.CdrFunc(),
+        Symbol("LIST"): BuiltInProcs.ListFunc(),
+        Symbol("+"): BuiltInProcs.AddProc(),
+        Symbol("-"): BuiltInProcs.DiffProc(),
+        Symbol("*"): BuiltInProcs.ProdProc(),
+        Symbol("/"): BuiltInProcs.QuotProc(),
+        Symbol(">"): BuiltInProcs.GreaterThanProc(),
+        Symbol("<"): BuiltInProcs.LessThanProc(),
+        Symbol("="): BuiltInProcs.EqualProc(),
+        Symbol("NOT"): BuiltInProcs.NotProc(),
+        Symbol("IF"): BuiltInProcs.IfProc(),
+        Symbol("COND"): BuiltInProcs.CondProc(),
+        Symbol("QUOTE"): BuiltInProcs.QuoteProc(),
+        Symbol("DEFUN"): BuiltInProcs.DefunProc(),
+        Symbol("FUNCALL"): BuiltInProcs.FuncallProc(),
+        Symbol("FUNCTION"): BuiltInProcs.FunctionProc(),
+        Symbol("LAMBDA"): BuiltInProcs.LambdaProc(),
+        Symbol("LET"): BuiltInProcs.LetProc(),
+        Symbol("DEFPARAMETER"): BuiltInProcs.DefparameterFunc(),
+        Symbol("DEFVAR"): BuiltInProcs.DefvarFunc(),
+        Symbol("PRINT"): BuiltInProcs.PrintProc(),
+        Symbol("PROFILE"): BuiltInProcs.ProfileProc(),
     }
     global_env = Environment(global_vars, global_funcs)
+    output = contextvars.ContextVar('output', default=None)  # File PRINT writes to; standard output if `None`
 
     @staticmethod
     def is_symbol_globally_bound(symbol: Symbol) -> bool:
-        return BuiltIns.global_env.proc_bindings.get(symbol.value, None) is not None or \
-            BuiltIns.global_env.var_bindings.get(symbol.value, None) is not None
+        return symbol in BuiltIns.global_funcs or symbol in BuiltIns.global_vars
+
+
+class Scope:
+    """
+    Compile-time picture of a frame for lexical addressing (SICP 5.5.6): the slot each visible name is kept in.
+
+    Frames are lists with the parent frame in slot 0, so a variable is found at a (depth, slot) address fixed at
+    analysis time. Variables bound in no enclosing scope are globals, held in cells of `env`.
+    """
+    def __init__(self, parent, parameters, env=None):
+        self.parent = parent
+        self.env = env if parent is None else parent.env
+        self.names = list(parameters)  # Visible names, innermost last
+        self.slots = list(range(1, len(self.names) + 1))
+        self.size = len(self.names) + 1  # Number of slots in a frame, including the parent frame
+
+    def allocate(self, symbol):
+        self.names.append(symbol)
+        self.slots.append(self.size)
+        self.size += 1
+        return self.size - 1
+
+    def lookup(self, symbol):
+        scope = self
+        depth = 0
+        while scope is not None:
+            for i in range(len(scope.names) - 1, -1, -1):
+                if scope.names[i] is symbol:
+                    return depth, scope.slots[i]
+            scope = scope.parent
+            depth += 1
+        return None
+
+    @contextlib.contextmanager
+    def block(self, names):
+        # Names visible only within a LET body, stored in slots of the enclosing frame
+        count = len(self.names)
+        try:
+            yield [self.allocate(name) for name in names]
+        finally:
+            del self.names[count:]
+            del self.slots[count:]
+
+
+class Analyzer:
+    """
+    Syntactic analysis (SICP 4.1.7): turns a parsed form into a Python closure taking a frame,
+    so special forms are dispatched once at analysis time instead of on every evaluation.
+
+    `tail` marks forms in tail position, whose applications return a `TailCall` instead of recursing.
+    """
+    @staticmethod
+    def evaluate(exp, env):
+        scope = Scope(None, (), env)
+        execute = Analyzer.analyze(exp, scope)
+        return execute([None] * scope.size)
+
+    @staticmethod
+    def analyze(exp, scope, tail=False):
+        if type(exp) is Symbol:
+            return Analyzer.analyze_variable(exp, scope)
+        if type(exp) is Cons:
+            if type(exp.car) is Symbol:
+                form = BuiltIns.global_funcs.get(exp.car)
+                if isinstance(form, SpecialForm):
+                    return form.analyze(exp.cdr, scope, tail)
+            return Analyzer.analyze_application(exp, scope, tail)
+        return lambda frame: exp
+
+    @staticmethod
+    def check_variable_name(symbol):
+        if type(symbol) is not Symbol:
+            raise Error.IllegalVariableNameException(symbol)
+        if BuiltIns.is_symbol_globally_bound(symbol):
+            raise Error.SymbolLockBoundViolationException(symbol)
+
+    @staticmethod
+    def analyze_variable(symbol, scope):
+        address = scope.lookup(symbol)
+        if address is None:
+            cell = scope.env.var_cell(symbol)
+
+            def execute(frame):
+                var = cell.value
+                if var is None:
+                    raise Error.UndefinedVariableException(symbol)
+                return var
+            return execute
+        depth, slot = address
+        if depth == 0:
+            return lambda frame: frame[slot]
+        if depth == 1:
+            return lambda frame: frame[0][slot]
+        if depth == 2:
+            return lambda frame: frame[0][0][slot]
+
+        def execute(frame):
+            for _ in range(depth):
+                frame = frame[0]
+            return frame[slot]
+        return execute
+
+    @staticmethod
+    def analyze_function(symbol, scope):
+        # Functions have their own, global namespace
+        if type(symbol) is not Symbol:
+            raise Error.IllegalProcedureNameException(symbol)
+        cell = scope.env.proc_cell(symbol)
+
+        def execute(frame):
+            proc = cell.value
+            if proc is None:
+                raise Error.UndefinedProcedureException(symbol)
+            return proc
+        return execute
+
+    @staticmethod
+    def analyze_application(exp, scope, tail):
+        operator = Analyzer.analyze_function(exp.car, scope)
+        operands = []
+        arg = exp.cdr
+        while arg is not BuiltIns.NIL:
+            operands.append(Analyzer.analyze(arg.car, scope))
+            arg = arg.cdr
+        # Operands are evaluated by arity-specialized closures to avoid building a generator per call
+        if len(operands) == 0:
+            evaluate_operands = lambda frame: []
+        elif len(operands) == 1:
+            a, = operands
+            evaluate_operands = lambda frame: [a(frame)]
+        elif len(operands) == 2:
+            a, b = operands
+            evaluate_operands = lambda frame: [a(frame), b(frame)]
+        elif len(operands) == 3:
+            a, b, c = operands
+            evaluate_operands = lambda frame: [a(frame), b(frame), c(frame)]
+        else:
+            evaluate_operands = lambda frame: [operand(frame) for operand in operands]
+        if tail:
+            def execute(frame):
+                proc = operator(frame)
+                if type(proc) is UserDefinedProcedure:  # Only user procedures can grow the stack
+                    return TailCall(proc, evaluate_operands(frame))
+                return proc.apply_tail(evaluate_operands(frame))
+            return execute
+        return lambda frame: operator(frame).apply(evaluate_operands(frame))
+
+    @staticmethod
+    def analyze_body(expression, scope, tail=True):
+        # Sequence of expressions returning the value of the last one
+        sequence = []
+        e = expression
+        while e.cdr is not BuiltIns.NIL:
+            sequence.append(Analyzer.analyze(e.car, scope))
+            e = e.cdr
+        last = Analyzer.analyze(e.car, scope, tail)
+        if len(sequence) == 0:
+            return last
+
+        def execute(frame):
+            for exp in sequence:
+                exp(frame)
+            return last(frame)
+        return execute
+
+    @staticmethod
+    def analyze_lambda(name, parameters, expression, scope):
+        names = []
+        parameter = parameters
+        while parameter is not BuiltIns.NIL:
+            Analyzer.check_variable_name(parameter.car)
+            names.append(parameter.car)
+            parameter = parameter.cdr
+        names = tuple(names)
+        lambda_scope = Scope(scope, names)
+        body = Analyzer.analyze_body(expression, lambda_scope)
+        size = lambda_scope.size
+        return lambda frame: UserDefinedProcedure(name=name, parameters=names, expression=expression,
+                                                  frame=frame, body=body, size=size)
 
 
 class Parser:
+    symbols = {}  # Spelling as read -> interned symbol, so each distinct spelling is converted once
+
+    # Whitespace and comments, then one token; numbers are told apart from symbols here rather than by conversion
+    tokens = re.compile(r'''
+        (?:\s+|;[^\n]*)*
+        (?:
+            (?P<open>\()
+            |(?P<close>\))
+            |(?P<quote>')
+            |(?P<function>\#')                                 # #'name -> (FUNCTION name)
+            |(?P<string>"[^"]*"?)                              # Unterminated if the input ends before the closing `"`
+            |(?P<int>[+-]?\d+(?![^\s()';"]))
+            |(?P<float>[+-]?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][+-]?\d+)?(?![^\s()';"]))
+            |(?P<symbol>[^\s()';"]+)
+            |(?P<end>\Z)
+        )
+    ''', re.VERBOSE)
+
     class ConsBuilder:
         def __init__(self):
             """
-            root & tar cons for easy bookkeeping: what to return and what to add to, respectively
-            When adding, assert that `target.cdr` is `NIL`, then set `target.cdr` to `Cons(val, NIL)`
-
-            Note: trailing `NIL` is redacted from root reprs:
-
-            ToBeConsed: (1 2 3 4)
-            Root          |  Target
-            (1 (2))         (2 NIL)
-            (1 (2 3))       (3 NIL)
-            (1 (2 (3 4)))   (4 NIL)
+            The items read for each open list are collected in a Python list, and consed together into the list
+            only when its closing parenthesis is read.
 
             ToBeConsed: (1 (2 3) 4)
-            Root         |         Target
-            (1)                   (1 NIL)
-            (2 3)                 (3 NIL)
-            (1 (2 3))         ((2 3) NIL)
-            (1 ((2 3) 4))         (4 NIL)
+            Open lists                |  Built
+            [1]
+            [1] [2 3]
+            [1 (2 3)]                    (2 3)
+            [1 (2 3) 4]
+                                         (1 (2 3) 4)
+
+            A quote opens a list of its own, `[QUOTE]`, which closes itself once it has an item.
             """
-            self.cons_q = []
-            self.level = 0
-            self.quote_q = []
+            self.open_lists = []  # Items of each open list, innermost last
+            self.quotes = []  # Whether each open list is a quote
+            self.forms = []  # Completed top-level forms not yet taken by the parser
 
         def empty(self):
-            return len(self.cons_q) == 0
+            return len(self.open_lists) == 0
 
         def add(self, leaf):
-            if len(self.cons_q) == 0:  # Not in any list
+            if len(self.open_lists) == 0:  # Not in any list
                 return False
-            root_cons, tar_cons = self.cons_q[-1]
-            if tar_cons.car is None:  # (None . NIL)
-                # Should only be reached on 1st call immediately after `open_list`
-                tar_cons.car = leaf
-            else:  # (x . NIL)
-                assert tar_cons.cdr is BuiltIns.NIL
-                tar_cons.cdr = Cons(car=leaf, cdr=BuiltIns.NIL)  # (x . (leaf . NIL))
-                self.cons_q[-1] = root_cons, tar_cons.cdr
-                if len(self.quote_q) > 0 and self.level == self.quote_q[-1]:
-                    self.quote_q.pop()
-                    self.close_list()
+            items = self.open_lists[-1]
+            items.append(leaf)
+            if self.quotes[-1] and len(items) == 2:
+                self.close_list()
             return True
 
-        def quote(self):
-            self.open_list()
-            self.add(Symbol('QUOTE'))
-            self.quote_q.append(self.level)
+        def quote(self, symbol=Symbol('QUOTE')):
+            self.open_lists.append([symbol])
+            self.quotes.append(True)
 
         def open_list(self):
-            self.level += 1
-            cons = Cons(car=None, cdr=BuiltIns.NIL)
-            self.cons_q.append((cons, cons))
+            self.open_lists.append([])
+            self.quotes.append(False)
 
         def close_list(self):
-            self.level -= 1
-            cons, _ = self.cons_q.pop()
-            if cons.car is None:  # Empty list
-                cons = BuiltIns.NIL
-            if len(self.cons_q) == 0:
-                return cons
-            self.add(cons)
+            items = self.open_lists.pop()
+            self.quotes.pop()
+            cons = BuiltIns.NIL  # Empty list
+            for i in range(len(items) - 1, -1, -1):
+                cons = Cons(items[i], cons)
+            if len(self.open_lists) == 0:
+                self.forms.append(cons)
+            else:
+                self.add(cons)
 
         def clear(self):
-            self.cons_q.clear()
-            self.level = 0
-            self.quote_q.clear()
+            self.open_lists.clear()
+            self.quotes.clear()
+            self.forms.clear()
 
     def __init__(self):
         self.cons_builder = self.ConsBuilder()
-        self.result = []
-        self.symbol_build = ''
-        self.string_building = False
+        self.pending = ''  # Unfinished token at the end of the last chunk
 
     def parse(self, code: str) -> list:
         #  Returns list of Atoms/Cons to be evaluated
+        return list(self.iter_forms(io.StringIO(code)))
+
+    def iter_forms(self, stream, chunk_size=65536):
+        """
+        Yields the top-level forms read from a text file object, each as soon as it is complete, so that they can be
+        evaluated while the rest of the input is still being read. The input is read a line (of at most `chunk_size`
+        characters) at a time, which suits sockets as well as files, and only the form being read is held in memory.
+        """
         self.cons_builder.clear()
-        self.result.clear()
-        self.symbol_build = ''
-        self.string_building = False
-
-        # Case-insensitive names, comments begin w/ `;`
-        lines = list(map(lambda l: l if ';' not in l else l[:l.index(';')], code.strip().split('\n')))
-        for line in lines:
-            for char in line:
-                if char == '"':
-                    if not self.string_building:
-                        self.string_building = True
-                    else:
-                        self.exit_atom_build()
-                elif self.string_building:
-                    self.enter_atom_build(char)
-                    continue
-                elif char == ' ':
-                    self.exit_atom_build()
-                elif char == '(':
-                    self.exit_atom_build()
-                    self.cons_builder.open_list()
-                elif char == ')':
-                    self.exit_atom_build()
-                    try:
-                        returned_list = self.cons_builder.close_list()
-                    except IndexError:
-                        raise Error.UnmatchedParenthesesException()
-                    if returned_list is not None:
-                        self.result.append(returned_list)
-                elif char == '\'':
-                    if self.symbol_build == '#':  # Rough fix
-                        self.enter_atom_build(char)
-                    else:
-                        self.cons_builder.quote()
-
-                else:
-                    self.enter_atom_build(char)
-        if self.string_building:
-            raise Error.UnmatchedQuotationException()
+        self.pending = ''
+        for chunk in iter(lambda: stream.readline(chunk_size), ''):
+            yield from self.feed(chunk)
+        yield from self.feed('', True)
         if not self.cons_builder.empty():
             raise Error.UnmatchedParenthesesException()
-        return self.result
-
-    def enter_atom_build(self, char):
-        self.symbol_build += char
-
-    def exit_atom_build(self):
-        if len(self.symbol_build) > 0:
-            if self.string_building:
-                atom = BuiltIns.String(self.symbol_build)
-                self.string_building = False
-            elif self.symbol_build.startswith("#'"):
-                self.cons_builder.open_list()
-                self.cons_builder.add(Symbol('FUNCTION'))
-                self.symbol_build = self.symbol_build[2:]
-                self.exit_atom_build()
-                self.cons_builder.close_list()
-                return
-            else:
+
+    def feed(self, chunk, final=False):
+        # Case-insensitive names, comments begin w/ `;` and run to the end of the line
+        text = self.pending + chunk
+        self.pending = ''
+        end = len(text)
+        builder = self.cons_builder
+        forms = builder.forms
+        open_lists = builder.open_lists
+        quotes = builder.quotes
+        for match in Parser.tokens.finditer(text):
+            kind = match.lastgroup
+            if kind == 'open':
+                open_lists.append([])
+                quotes.append(False)
+                continue
+            if kind == 'close':
                 try:
-                    atom = BuiltIns.Number(int(self.symbol_build))
-                except ValueError:
-                    try:
-                        atom = BuiltIns.Number(float(self.symbol_build))
-                    except ValueError:
-                        atom = Symbol(self.symbol_build.upper())
+                    builder.close_list()
+                except IndexError:
+                    raise Error.UnmatchedParenthesesException()
+                if len(forms) > 0:
+                    yield from forms
+                    forms.clear()
+                continue
+            if kind == 'end' or match.end() == end and not final:
+                # Left for the next chunk, which may continue a comment or atom
+                self.pending = text[match.start():]
+                return
+            token = match.group(kind)
+            if kind == 'symbol':
+                atom = Parser.symbols.get(token)
+                if atom is None:
+                    atom = Parser.symbols[token] = Symbol(token.upper())
+            elif kind == 'int':
+                atom = int(token)
+            elif kind == 'float':
+                atom = float(token)
+            elif kind == 'string':
+                if len(token) == 1 or token[-1] != '"':
+                    raise Error.UnmatchedQuotationException()
+                atom = BuiltIns.String(token[1:-1])
+            elif kind == 'function':
+                builder.quote(Symbol('FUNCTION'))
+                continue
+            else:  # quote
+                builder.quote()
+                continue
+            if len(open_lists) > 0 and not quotes[-1]:  # Inlined `builder.add` for the common case
+                open_lists[-1].append(atom)
+                continue
             # If `atom` is outside list:
-            if not self.cons_builder.add(atom):
-                self.result.append(atom)
-            self.symbol_build = ''
+            if not builder.add(atom):
+                forms.append(atom)
+            if len(forms) > 0:
+                yield from forms
+                forms.clear()
+
+
+class ParseCache:
+    """
+    The forms read from a source file, kept in `__pycache__` beside it so that an unchanged file is not parsed again.
+
+    A cache file starts with a key made of the cache version, the `marshal` version, the byte order and the SHA-256 of
+    the source; a cache whose key does not match is ignored and rewritten. The forms follow as `marshal` data, flattened
+    so that loading them is a single pass without recursion:
+
+    (define (f x) x)  ->  constants (DEFINE F X), atoms [0 1 2 2], shape [-3 2 -1 3]
+
+    `atoms` are indices into `constants` (symbol names, strings as UTF-8 bytes, numbers) in the order read. In `shape`,
+    -n takes the next n atoms and n >= 0 replaces the last n items taken with the list of them.
+    """
+    version = 1  # Of the reader and of the format above; bumping it invalidates existing caches
+
+    @staticmethod
+    def path(source):
+        directory, name = os.path.split(source)
+        return os.path.join(directory, '__pycache__', f'{name}.common-pylisp.cache')
+
+    @staticmethod
+    def key(data):
+        import hashlib  # Imported here, as is array, so that importing the interpreter stays cheap
+        return f'{ParseCache.version}:{marshal.version}:{sys.byteorder}:'.encode() + hashlib.sha256(data).digest()
+
+    @staticmethod
+    def read(source):
+        # Returns the forms of the file at `source`, from its cache if there is a valid one
+        with open(source, 'rb') as f:
+            data = f.read()
+        key = ParseCache.key(data)
+        path = ParseCache.path(source)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(key)) == key:
+                    return ParseCache.decode(*marshal.load(f))
+        except (OSError, EOFError, ValueError, TypeError):  # Missing or damaged cache
+            pass
+        forms = Parser().parse(data.decode('utf-8'))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f'{path}.{os.getpid()}'
+            with open(temporary, 'wb') as f:
+                f.write(key)
+                marshal.dump(ParseCache.encode(forms), f)
+            os.replace(temporary, path)  # Readers never see a partly written cache
+        except OSError:  # An unwritable directory just goes without a cache
+            pass
+        return forms
+
+    @staticmethod
+    def pack(values):
+        # Smallest array of signed ints that holds `values`
+        import array
+        for typecode in 'bhiq':
+            try:
+                return typecode, array.array(typecode, values).tobytes()
+            except OverflowError:
+                pass
+
+    @staticmethod
+    def encode(forms):
+        constants = {}
+        atoms = []
+        shape = []
+        pending = [(form, False) for form in reversed(forms)]  # Items to visit, and lists to close once visited
+        while len(pending) > 0:
+            exp, close = pending.pop()
+            if close:
+                shape.append(exp)
+            elif type(exp) is Cons or exp is BuiltIns.NIL:
+                items = []
+                while exp is not BuiltIns.NIL:
+                    items.append(exp.car)
+                    exp = exp.cdr
+                pending.append((len(items), True))
+                pending.extend((item, False) for item in reversed(items))
+            else:
+                if type(exp) is Symbol:
+                    constant = exp.value
+                elif type(exp) is BuiltIns.String:
+                    constant = exp.value.encode('utf-8')
+                else:
+                    constant = exp
+                # Keyed by type as well, since 1 == 1.0
+                atoms.append(constants.setdefault((type(constant), constant), len(constants)))
+                if len(shape) > 0 and shape[-1] < 0:
+                    shape[-1] -= 1
+                else:
+                    shape.append(-1)
+        return tuple(constant for _, constant in constants), ParseCache.pack(atoms), ParseCache.pack(shape)
+
+    @staticmethod
+    def decode(constants, atoms, shape):
+        table = []
+        for constant in constants:
+            if type(constant) is str:
+                constant = Symbol(constant)
+            elif type(constant) is bytes:
+                constant = BuiltIns.String(constant.decode('utf-8'))
+            table.append(constant)
+        typecode, data = atoms
+        atoms = iter(list(map(table.__getitem__, memoryview(data).cast(typecode))))
+        typecode, data = shape
+        stack = []
+        for n in memoryview(data).cast(typecode):
+            if n < 0:
+                stack.extend(itertools.islice(atoms, -n))
+            else:
+                cons = BuiltIns.NIL
+                for _ in range(n):
+                    cons = Cons(stack.pop(), cons)
+                stack.append(cons)
+        return stack
+
+
+class Profiler:
+    """
+    Deterministic profile of the functions applied by a program: for each name, the number of applications and the
+    time spent in them inclusive and exclusive of the functions they applied. With `memory`, also the memory blocks
+    still allocated when they return (`sys.getallocatedblocks`), likewise. Retained blocks are not the blocks
+    allocated: memory freed before a function returns is not counted. The thunk of PROFILE is left out of the stats.
+
+    Builtins are recorded by wrapping their classes' `apply` only while some profiler runs, and functions defined by
+    the program record themselves in `UserDefinedProcedure.apply_tail` once the module's `profiling` flag is set, so a
+    program run without a profiler pays nothing for it. A tail call ends the application it replaces, and time spent
+    in a function applied recursively is counted once in its inclusive time.
+    """
+    current = contextvars.ContextVar('profiler', default=None)  # Profiler of the program being run
+    lock = threading.Lock()
+    active = 0  # Profilers running
+    wrapped = {}  # class -> [`apply` wrapped, or `None` if inherited; profilers running that wrap it]
+    hidden = ('PROFILE',)  # Name of the thunk of PROFILE
+
+    def __init__(self, memory=False):
+        # name -> [calls, inclusive time, exclusive time, retained blocks, exclusive retained blocks,
+        #         applications on `stack`]; exclusive retained blocks may be negative, see `report`
+        self.stats = {}
+        self.stack = []  # [stats of the name, start time, blocks at start, time in callees, blocks in callees]
+        self.memory = memory
+        if memory:
+            self.enter = self.enter_counting
+            self.exit = self.exit_counting
+
+    def enter(self, name):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0.0, 0.0, 0, 0, 0]
+        stat[5] += 1
+        self.stack.append([stat, time.perf_counter(), 0, 0.0, 0])
+
+    def exit(self):
+        end = time.perf_counter()
+        stat, start, _, callee_time, _ = self.stack.pop()
+        elapsed = end - start
+        stat[0] += 1
+        stat[2] += elapsed - callee_time
+        stat[5] -= 1
+        if stat[5] == 0:  # Outermost application of the name
+            stat[1] += elapsed
+        if self.stack:
+            self.stack[-1][3] += elapsed
+
+    def enter_counting(self, name):
+        # `enter`, counting retained blocks
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0.0, 0.0, 0, 0, 0]
+        stat[5] += 1
+        record = [stat, 0.0, 0, 0.0, 0]
+        self.stack.append(record)
+        # Read last and first in `exit_counting`, so that the profiler's own objects are not counted
+        record[1] = time.perf_counter()
+        record[2] = sys.getallocatedblocks() + 1  # Counting the int returned
+
+    def exit_counting(self):
+        blocks = sys.getallocatedblocks()
+        end = time.perf_counter()
+        stat, start, start_blocks, callee_time, callee_blocks = self.stack.pop()
+        elapsed = end - start
+        allocated = max(blocks - start_blocks, 0)
+        stat[0] += 1
+        stat[2] += elapsed - callee_time
+        stat[4] += allocated - callee_blocks  # Not clamped per application, see `report`
+        stat[5] -= 1
+        if stat[5] == 0:  # Outermost application of the name
+            stat[1] += elapsed
+            stat[3] += allocated
+        if self.stack:
+            caller = self.stack[-1]
+            caller[3] += elapsed
+            caller[4] += allocated
+
+    def unwind(self, depth):
+        # Ends the applications above `depth`, including those left by an exception
+        while len(self.stack) > depth:
+            self.exit()
+
+    def run(self, thunk):
+        token = Profiler.current.set(self)
+        depth = len(self.stack)
+        targets = [type(proc) for proc in BuiltIns.global_funcs.values() if not isinstance(proc, SpecialForm)]
+        Profiler.instrument(targets)
+        try:
+            return thunk()
+        finally:
+            self.unwind(depth)
+            Profiler.uninstrument(targets)
+            Profiler.current.reset(token)
+            for name in Profiler.hidden:
+                self.stats.pop(name, None)
+
+    def report(self, file=None, limit=None):
+        # Prints the stats sorted by exclusive time, at most `limit` rows
+        rows = sorted(self.stats.items(), key=lambda item: item[1][2], reverse=True)
+        if not self.memory:
+            print(f'{"calls":>10} {"inclusive":>10} {"exclusive":>10}  function', file=file)
+            for name, (calls, inclusive, exclusive, *_) in rows[:limit]:
+                print(f'{calls:>10} {inclusive:>10.6f} {exclusive:>10.6f}  {name}', file=file)
+            return
+        print(f'{"calls":>10} {"inclusive":>10} {"exclusive":>10} {"retained":>10} {"own retained":>12}  function',
+              file=file)
+        for name, (calls, inclusive, exclusive, blocks, own_blocks, _) in rows[:limit]:
+            # Blocks a function frees that its callees retained make its own count negative, reported as none
+            own_blocks = min(max(own_blocks, 0), blocks)
+            print(f'{calls:>10} {inclusive:>10.6f} {exclusive:>10.6f} {blocks:>10} {own_blocks:>12}  {name}', file=file)
+
+    @staticmethod
+    def wrap(cls, function):
+        # `function` recording the applications of instances of exactly `cls`
+        def apply(self, args):
+            profiler = Profiler.current.get()
+            if profiler is None or type(self) is not cls:
+                return function(self, args)
+            depth = len(profiler.stack)
+            profiler.enter(self.name)
+            try:
+                return function(self, args)
+            finally:
+                if len(profiler.stack) > depth + 1:
+                    profiler.unwind(depth + 1)
+                profiler.exit()
+        return apply
+
+    @staticmethod
+    def instrument(targets):
+        global profiling
+        with Profiler.lock:
+            Profiler.active += 1
+            profiling = True
+            for cls in targets:
+                wrapped = Profiler.wrapped.get(cls)
+                if wrapped is None:
+                    Profiler.wrapped[cls] = [cls.__dict__.get('apply'), 1]
+                    cls.apply = Profiler.wrap(cls, cls.apply)
+                else:
+                    wrapped[1] += 1
+
+    @staticmethod
+    def uninstrument(targets):
+        global profiling
+        with Profiler.lock:
+            Profiler.active -= 1
+            profiling = Profiler.active > 0
+            for cls in targets:
+                wrapped = Profiler.wrapped[cls]
+                wrapped[1] -= 1
+                if wrapped[1] > 0:
+                    continue
+                del Profiler.wrapped[cls]
+                if wrapped[0] is None:
+                    del cls.apply
+                else:
+                    cls.apply = wrapped[0]
 
 
 class CommonPyLispInterpreter:
     @staticmethod
-    def run(code: str):
-        run_env = Environment(*BuiltIns.global_env.copy())
+    def run(code):
+        # `code` is a string or a text file object, evaluated form by form as it is read
         parser = Parser()
-        parsed = parser.parse(code)
-        for exp in parsed:
-            exp.evaluate(run_env)
+        CommonPyLispInterpreter.run_forms(parser.iter_forms(io.StringIO(code) if type(code) is str else code))
 
+    @staticmethod
+    def run_file(path, cache: bool = False):
+        # With `cache`, the forms read are kept beside the file and reused while it is unchanged, see `ParseCache`
+        if cache:
+            CommonPyLispInterpreter.run_forms(ParseCache.read(path))
+            return
+        with open(path, encoding='utf-8') as stream:
+            CommonPyLispInterpreter.run(stream)
+
+    @staticmethod
+    def run_forms(forms):
+        interpreter = Interpreter()
+        for exp in forms:
+            interpreter.evaluate(exp)
 
-c = """
+    @staticmethod
+    def evaluate(exp, env):
+        return Analyzer.evaluate(exp, env)
+
+
+class Interpreter:
+    """
+    A Common Lisp program with global environments of its own over the builtins, for running many programs side by side.
+
+    Creating one costs an empty `Environment`: the builtins are copied into it cell by cell as the program first uses
+    them, and the builtin environment itself is only ever read. An instance runs one form at a time; separate instances
+    can run in separate threads without seeing each other's bindings, PRINT writing to each one's `output`.
+    """
+    __slots__ = ('env', 'output', 'lock')
+
+    def __init__(self, output=None):
+        self.env = BuiltIns.global_env.extend()
+        self.output = output  # File object PRINT writes to; `None` for that of the caller's context
+        self.lock = threading.Lock()
+
+    def evaluate(self, exp):
+        with self.lock:
+            token = None if self.output is None else BuiltIns.output.set(self.output)
+            try:
+                return CommonPyLispInterpreter.evaluate(exp, self.env)
+            finally:
+                if token is not None:
+                    BuiltIns.output.reset(token)
+
+    def run(self, code):
+        # Evaluates the forms of `code`, a string or a text file object, returning the value of the last one
+        value = BuiltIns.NIL
+        for exp in Parser().iter_forms(io.StringIO(code) if type(code) is str else code):
+            value = self.evaluate(exp)
+        return value
+
+    def run_file(self, path, cache: bool = False):
+        if cache:
+            value = BuiltIns.NIL
+            for exp in ParseCache.read(path):
+                value = self.evaluate(exp)
+            return value
+        with open(path, encoding='utf-8') as stream:
+            return self.run(stream)
+
+    def profile(self, code, limit=None, memory=False):
+        # Runs `code` as `run` does under a new `Profiler`, printing its report to `output`; returns the profiler
+        profiler = Profiler(memory)
+        profiler.run(lambda: self.run(code))
+        profiler.report(self.output, limit)
+        return profiler
+
+
+if __name__ == '__main__':
+    c = """
 (defun square (x) (* x x))
 (defun abs (x)
     (if (< x 0)
@@ -742,6 +1412,6 @@ c = """
 (print (quote (a b c)))
 (print '(a b c))
 (print (- 3 1 2))
-"""
+    """
 
-CommonPyLispInterpreter.run(c)
+    CommonPyLispInterpreter.run(c)
@@ -1,3 +1,39 @@
+import collections
+import contextlib
+import contextvars
+import importlib.util
+import io
+import itertools
+import marshal
+import os
+import re
+import sys
+import threading
+import functools
+import gc
+import math
+import time
+import types
+
+
+def lazy_import(name):
+    # The module, imported when one of its attributes is first used; `None` if it is not installed
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+numpy = lazy_import('numpy')  # Vectors are held in lists without it
+profiling = False  # Whether a `Profiler` runs, so that procedures record their applications
+
+
 class Error:
     # Lisp errors
     class IllegalProcedureNameException(Exception): pass
@@ -18,43 +54,78 @@ class Error:
 
     class SymbolLockBoundViolationException(Exception): pass
 
+    class VectorIndexOutOfRangeException(Exception): pass
+
+    class VectorLengthMismatchException(Exception): pass
+
+    class IncompatibleImageException(Exception): pass
+
+    class IncompatibleDataException(Exception): pass
+
+    class OutsideTaskException(Exception): pass
+
+    class IllegalSuspensionException(Exception): pass
+
+    class WrongTypeArgumentException(Exception): pass
+
 
 class Object:
-    # All things to be evaluated are objects
+    # All things to be evaluated are objects; `__slots__` throughout keeps instances free of a per-object dict
+    __slots__ = ()  # `value` is a slot of the subclasses holding one, so that a cons is only its car and cdr
+
     def __init__(self, value):
         self.value = value
 
-    def evaluate(self, env):
-        raise Exception('Undefined Object evaluation:', self)
-
 
 class Symbol(Object):
-    # Represents a binding in the environment
-    def evaluate(self, env):
-        return env.get(self)
+    # Represents a binding in the environment; interned, so each name is a single object compared by identity
+    __slots__ = ('value',)
+    table = {}
+
+    def __new__(cls, value):
+        symbol = Symbol.table.get(value)
+        if symbol is None:
+            symbol = Symbol.table.setdefault(value, super().__new__(cls))
+        return symbol
+
+    def __reduce__(self):
+        # Unpickled through `__new__`, so as the interned symbol
+        return Symbol, (self.value,)
 
     def __str__(self):
         return str(self.value)
 
 
 class SelfEvaluatingObject(Object):
-    def evaluate(self, env):
-        return self
+    __slots__ = ('value',)
 
     def __str__(self):
         return str(self.value)
 
 
 class Cons(Object):
+    __slots__ = ('car', 'cdr')
+    value = 'CONS'  # Shared by all conses rather than stored in each
+
     def __init__(self, car, cdr):
-        super().__init__('CONS')
         self.car = car
         self.cdr = cdr
 
-    def evaluate(self, env):
-        proc = env.get(self.car)
-        args = self.cdr
-        return proc.evaluate(env, args)
+    def __reduce__(self):
+        # Pickled as its items rather than cell by cell, so that a long list does not exceed the recursion limit
+        items = []
+        p = self
+        while type(p) is Cons:
+            items.append(p.car)
+            p = p.cdr
+        return Cons, (None, None), (items, p)
+
+    def __setstate__(self, state):
+        items, p = state
+        for i in range(len(items) - 1, 0, -1):
+            p = Cons(items[i], p)
+        self.car = items[0]
+        self.cdr = p
 
     def __str__(self):
         if self.cdr is BuiltIns.NIL:
@@ -70,298 +141,597 @@ class Cons(Object):
         return f'({" ".join(s)})'
 
 
+class Cell:
+    # Holds the value of a global binding; analyzed code keeps a reference to the cell instead of looking it up
+    __slots__ = ('symbol', 'value')
+
+    def __init__(self, symbol, value=None):
+        self.symbol = symbol
+        self.value = value  # `None` while unbound
+
+
 class Environment:
-    def __init__(self, var_bindings: dict):
-        self.bindings = var_bindings
+    # Global bindings; an extended environment shadows its parent with cells of its own, copied on first use
+    def __init__(self, var_bindings: dict, parent=None):
+        self.cells = {symbol: Cell(symbol, value) for symbol, value in var_bindings.items()}
+        self.parent = parent
+        self.restricted = frozenset()  # Names of the `EnvironmentForm`s the programs of this environment may not use
+
+    def cell(self, symbol):
+        cell = self.cells.get(symbol)
+        if cell is None:
+            cell = Cell(symbol, None if self.parent is None else self.parent.lookup(symbol))
+            self.cells[symbol] = cell
+        return cell
+
+    def lookup(self, symbol):
+        # Value of `symbol` without adding a cell for it, so that parents shared by many environments are only read
+        env = self
+        while env is not None:
+            cell = env.cells.get(symbol)
+            if cell is not None:
+                return cell.value
+            env = env.parent
+        return None
 
     def bind(self, symbol, item):
         if type(symbol) is not Symbol:
             raise Error.IllegalVariableNameException(symbol)
-        if self.bindings.get(symbol) is not None:
-            raise Error.SymbolLockBoundViolationException(symbol)
-        self.bindings[symbol.value] = item
+        self.cell(symbol).value = item
 
     def get(self, symbol):
-        obj = self.bindings.get(symbol.value)
+        obj = self.cell(symbol).value
         if obj is None:
             raise Error.UndefinedVariableException(symbol)
         return obj
 
-    def copy(self):
-        return self.bindings.copy()
+    def extend(self):
+        return Environment({}, self)
+
+
+class TailCall:
+    # A procedure application left pending in tail position, resolved in a loop rather than on the Python stack
+    __slots__ = ('proc', 'args')
+
+    def __init__(self, proc, args):
+        self.proc = proc
+        self.args = args
+
+    @staticmethod
+    def resolve(result):
+        pending = None  # Memoized applications missing from their caches, whose value is that of the last call
+        while type(result) is TailCall:
+            proc = result.proc
+            if type(proc) is MemoizedProcedure:
+                key = MemoizedProcedure.arguments_key(result.args)
+                value = proc.get(key)
+                if value is not None:
+                    result = value
+                    break
+                if pending is None:
+                    pending = []
+                pending.append((proc, key))
+                proc = proc.proc
+            result = proc.apply_tail(result.args)
+        if pending is not None:
+            for proc, key in pending:
+                proc.store(key, result)
+        return result
 
 
 class Procedure:
+    __slots__ = ('name',)
+    kernel = None  # Batched form of the procedure, see `Vectorizer`
+
     def __init__(self, name):
         self.name = name
 
-    def evaluate(self, env, args):
-        raise Exception('Undefined Procedure evaluation:', self)
+    def apply(self, args):
+        # Applies the procedure to a list of already evaluated arguments
+        raise Exception('Undefined Procedure application:', self)
+
+    def apply_tail(self, args):
+        # Application in tail position; may return a `TailCall` to be resolved by the caller
+        return self.apply(args)
 
     def __str__(self):
         return f'#<FUNCTION {self.name}>'
 
 
+class SpecialForm(Procedure):
+    # Syntax resolved by the `Analyzer` rather than applied at run time
+    def analyze(self, args, scope, tail):
+        raise Exception('Undefined SpecialForm analysis:', self)
+
+    def apply(self, args):
+        raise Error.IllegalFunctionCallException(self)
+
+
 class UserDefinedProcedure(Procedure):
-    def __init__(self, name, parameters, expression):
+    __slots__ = ('parameters', 'expression', 'frame', 'body', 'size', 'kernel', 'scope')
+
+    def __init__(self, name, parameters, expression, frame, body, size, kernel=None, scope=None):
         super().__init__(name)
-        self.parameters = parameters
+        self.parameters = parameters  # Tuple of parameter `Symbol`s
         self.expression = expression
-
-    def evaluate(self, env, args):
-        lexical_env = Environment(env.copy())
-        parameter = self.parameters
-        arg = args
-        while parameter is not BuiltIns.NIL and arg is not BuiltIns.NIL:  # Binding values to parameters
-            lexical_env.bind(parameter.car, arg.car.evaluate(env))
-            parameter = parameter.cdr
-            arg = arg.cdr
-        if parameter is not BuiltIns.NIL or arg is not BuiltIns.NIL:  # Left over parameter or argument
+        self.frame = frame  # Frame the procedure was defined in
+        self.body = body  # `expression` as analyzed by `Analyzer.analyze_body`
+        self.size = size  # Number of slots in a frame of the body
+        self.kernel = kernel
+        self.scope = scope  # Snapshot of the `Scope` the procedure was analyzed in
+
+    def __reduce__(self):
+        # Analyzed code cannot be pickled, so an image keeps the source and scope, analyzed again when first applied
+        return (UserDefinedProcedure, (self.name, self.parameters, self.expression, None, None, self.size),
+                (self.frame, self.scope))
+
+    def __setstate__(self, state):
+        self.frame, self.scope = state
+        self.body = self.analyze_body
+
+    def analyze_body(self, frame):
+        # Body of a procedure restored from an image, until it replaces itself on the first application
+        scope = Scope(self.scope, self.parameters)
+        self.body = Analyzer.analyze_body(self.expression, scope)
+        self.kernel = Vectorizer.translate(self.parameters, self.expression, scope)
+        return self.body(frame)
+
+    def apply(self, args):
+        return TailCall.resolve(self.apply_tail(args))
+
+    def apply_tail(self, args):
+        if len(args) != len(self.parameters):  # Left over parameter or argument
             raise Error.InvalidNOFArgumentsException(self)
-        e = self.expression
-        while e is not BuiltIns.NIL:  # Evaluating expressions in function; return result of last evaluation
-            result = e.car.evaluate(lexical_env)
-            if e.cdr is BuiltIns.NIL:
-                return result
-            else:
-                e = e.cdr
+        frame = [self.frame, *args]
+        if self.size > len(frame):
+            frame.extend([None] * (self.size - len(frame)))
+        if not profiling:
+            return self.body(frame)
+        profiler = Profiler.current.get()
+        if profiler is None:
+            return self.body(frame)
+        # Recorded here rather than by a wrapper, as applications of user procedures are the most frequent
+        depth = len(profiler.stack)
+        profiler.enter(self.name)
+        try:
+            return self.body(frame)
+        finally:
+            if len(profiler.stack) > depth + 1:
+                profiler.unwind(depth + 1)
+            profiler.exit()
+
+
+class MemoizedProcedure(Procedure):
+    """
+    Procedure remembering the results of a pure procedure by argument (SICP exercise 3.27).
+
+    At most `size` results are kept, the least recently used being evicted first. The cache is looked up when the
+    procedure is applied and filled when its application returns, by `TailCall.resolve` and by the `VirtualMachine`,
+    so that memoized recursion keeps to the stack an unmemoized procedure would use.
+    """
+    __slots__ = ('proc', 'size', 'cache', 'hits', 'misses')
+    default_size = 4096
+
+    def __init__(self, proc, size=None):
+        super().__init__(proc.name)
+        self.proc = proc
+        self.size = MemoizedProcedure.default_size if size is None else size
+        self.cache = collections.OrderedDict()  # Argument keys -> result, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(obj):
+        # Hashable key equal for structurally equal data; numbers keep their type so that 1 and 1.0 differ
+        if type(obj) is int or type(obj) is float:
+            return type(obj), obj
+        if type(obj) is Cons:
+            items = []
+            while type(obj) is Cons:
+                items.append(MemoizedProcedure.key(obj.car))
+                obj = obj.cdr
+            return Cons, tuple(items), MemoizedProcedure.key(obj)
+        if type(obj) is BuiltIns.String:
+            return BuiltIns.String, obj.value
+        if type(obj) is BuiltIns.Vector:
+            return BuiltIns.Vector, tuple(MemoizedProcedure.key(item) for item in obj.items())
+        return obj  # Symbols, NIL, T and procedures are only equal to themselves
+
+    @staticmethod
+    def arguments_key(args):
+        return tuple([MemoizedProcedure.key(arg) for arg in args])
+
+    def get(self, key):
+        # Result cached for `key`, or `None`, counting a hit or a miss
+        value = self.cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        cache = self.cache
+        cache[key] = value
+        if len(cache) > self.size:
+            cache.popitem(last=False)
+
+    def apply(self, args):
+        return TailCall.resolve(TailCall(self, args))
+
+    def apply_tail(self, args):
+        return TailCall(self, args)
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 class BuiltIns:
     class NilClass(SelfEvaluatingObject):
+        __slots__ = ()
+
         def __init__(self):
             super().__init__('NIL')
 
     NIL = NilClass()
 
     class TClass(SelfEvaluatingObject):
+        __slots__ = ()
+
         def __init__(self):
             super().__init__('T')
 
     T = TClass()
 
-    class Number(SelfEvaluatingObject):
-        def __add__(self, other):
-            return BuiltIns.Number(self.value + other.value)
-
-        def __sub__(self, other):
-            return BuiltIns.Number(self.value - other.value)
-
-        def __mul__(self, other):
-            return BuiltIns.Number(self.value * other.value)
-
-        def __truediv__(self, other):
-            if other.value == 0:
-                raise ValueError("Division by zero is not allowed")
-            return BuiltIns.Number(self.value / other.value)
-
-        def __gt__(self, other):
-            return self.value > other.value
-
-        def __lt__(self, other):
-            return self.value < other.value
-
-        def __ge__(self, other):
-            return self.value >= other.value
+    # Numbers are native Python ints and floats, so arithmetic allocates no wrapper objects
 
-        def __le__(self, other):
-            return self.value <= other.value
+    class String(SelfEvaluatingObject):
+        __slots__ = ()
+
+    class Vector(SelfEvaluatingObject):
+        """
+        Fixed-length sequence. While its elements are all integers in int64 range, or all floats, it is held in a NumPy
+        array (when NumPy is installed), so the bulk vector procedures run as single vectorized calls; otherwise it is
+        held in a list, so that no element is converted. The bulk procedures fall back to Python integers when a result
+        could leave int64.
+        """
+        __slots__ = ()
+
+        def __init__(self, items):
+            super().__init__(items if numpy is not None and type(items) is numpy.ndarray else
+                             BuiltIns.Vector.storage(items))
+
+        @staticmethod
+        def storage(items):
+            items = list(items)
+            if numpy is not None and len(items) > 0:
+                if all(type(item) is float for item in items):
+                    return numpy.array(items, dtype=float)
+                if all(type(item) is int for item in items):
+                    try:
+                        return numpy.array(items, dtype=numpy.int64)
+                    except OverflowError:
+                        pass
+            return items
+
+        def numeric(self):
+            return numpy is not None and type(self.value) is numpy.ndarray
+
+        def items(self):
+            # Elements as native Python objects
+            return self.value.tolist() if self.numeric() else self.value
+
+        def check_index(self, index):
+            if type(index) is not int or not 0 <= index < len(self.value):
+                raise Error.VectorIndexOutOfRangeException(index)
+
+        def ref(self, index):
+            self.check_index(index)
+            item = self.value[index]
+            return item.item() if self.numeric() else item
+
+        def set(self, index, item):
+            self.check_index(index)
+            if self.numeric() and not (type(item) is float if self.value.dtype == float else
+                                       type(item) is int and -2 ** 63 <= item < 2 ** 63):
+                self.value = self.value.tolist()
+            self.value[index] = item
+
+        def __len__(self):
+            return len(self.value)
+
+        def __str__(self):
+            return f'#({" ".join(str(item) for item in self.items())})'
+
+    class Promise(SelfEvaluatingObject):
+        # Delayed evaluation (SICP 3.5.1); the value is computed once, after which the thunk and its frame are dropped.
+        # A thunk may return a generator instead, which yields the promises it needs and is sent their values, so that
+        # chains of promises, like those of nested STREAM-FILTERs, are forced by a loop rather than by recursion
+        __slots__ = ('thunk',)
+
+        def __init__(self, thunk):
+            super().__init__(None)
+            self.thunk = thunk  # Callable of no arguments; `None` once forced
+
+        def force(self):
+            if self.thunk is None:
+                return self.value
+            promise = self
+            pending = []  # Promises being computed by generators, each waiting for the value of the next
+            while True:
+                thunk = promise.thunk
+                if thunk is None:
+                    value = promise.value
+                else:
+                    value = thunk()
+                    if type(value) is types.GeneratorType:
+                        pending.append((promise, value))
+                        value = None
+                    else:
+                        value = promise.settle(value)
+                while pending:
+                    promise, generator = pending[-1]
+                    try:
+                        promise = generator.send(value)
+                        break
+                    except StopIteration as stop:
+                        pending.pop()
+                        value = promise.settle(stop.value)
+                else:
+                    return value
+
+        def settle(self, value):
+            if self.thunk is not None:  # Unless forced again while computing `value`
+                self.value = value
+                self.thunk = None
+            return self.value
+
+        @staticmethod
+        def rest_of(stream):
+            # Promise of the rest of a non-empty stream, i.e. a cons whose cdr is a promise
+            if type(stream) is not Cons or type(stream.cdr) is not BuiltIns.Promise:
+                raise Error.WrongTypeArgumentException(stream)
+            return stream.cdr
+
+        def __str__(self):
+            return '#<PROMISE>'
+
+    class Task(SelfEvaluatingObject):
+        # Green thread of a `Scheduler`; the value is that of its procedure once done
+        __slots__ = ('scheduler', 'proc', 'args', 'state', 'park', 'done', 'error', 'waiters', 'future')
+
+        def __init__(self, scheduler, proc, args):
+            super().__init__(None)
+            self.scheduler = scheduler
+            self.proc = proc
+            self.args = args
+            self.state = None  # Machine state to resume from, see `VirtualMachine.execute`
+            self.park = None  # What the scheduler does with the task once suspended, given the scheduler and the task
+            self.done = False
+            self.error = None  # Exception the task failed with
+            self.waiters = []  # Tasks joining this one
+            self.future = None  # Future of the value, for the host
+
+        def __str__(self):
+            return '#<TASK>'
+
+    class Channel(SelfEvaluatingObject):
+        # Unbounded queue of values between tasks; the value is the deque of items sent but not yet received
+        __slots__ = ('receivers',)
 
-        def __eq__(self, other):
-            return self.value == other.value
+        def __init__(self):
+            super().__init__(collections.deque())
+            self.receivers = collections.deque()  # Tasks waiting for an item
 
-    class String(SelfEvaluatingObject):
-        pass
+        def __str__(self):
+            return '#<CHANNEL>'
 
     class BuiltInProcs:
         class ConsFunc(Procedure):
             def __init__(self):
                 super().__init__('CONS')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is BuiltIns.NIL or  # 1 arg
-                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+            def apply(self, args):
+                if len(args) != 2:
                     raise Error.InvalidNOFArgumentsException(self)
-                return Cons(args.car.evaluate(env), args.cdr.car.evaluate(env))
+                return Cons(args[0], args[1])
 
         class CarFunc(Procedure):
             def __init__(self):
                 super().__init__('CAR')
 
-            def call(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                return args.car.evaluate(env).car
+                return args[0].car
 
         class CdrFunc(Procedure):
             def __init__(self):
                 super().__init__('CDR')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                return args.car.evaluate(env).cdr
+                return args[0].cdr
 
         class ListFunc(Procedure):
             def __init__(self):
                 super().__init__('LIST')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL:
-                    return args
-                a = args
-                while a is not BuiltIns.NIL:
-                    a.car = a.car.evaluate(env)
-                    a = a.cdr
-                return args
+            def apply(self, args):
+                result = BuiltIns.NIL
+                for item in reversed(args):
+                    result = Cons(item, result)
+                return result
 
         class AddProc(Procedure):
             def __init__(self):
                 super().__init__('+')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL:
-                    return BuiltIns.Number(0)
-                else:
-                    return args.car.evaluate(env) + BuiltIns.globals.get("+").evaluate(env, args.cdr)
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return args[0] + args[1]
+                total = 0
+                for arg in args:
+                    total += arg
+                return total
 
         class DiffProc(Procedure):
             def __init__(self):
                 super().__init__('-')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                if args.cdr is BuiltIns.NIL:  # 1 arg
-                    total = args.car.evaluate(env) * BuiltIns.Number(-1)
-                else:
-                    total = args.car.evaluate(env)
-                    arg = args.cdr
-                    while arg is not BuiltIns.NIL:
-                        total -= arg.car.evaluate(env)
-                        arg = arg.cdr
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return args[0] - args[1]
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                if len(args) == 1:  # 1 arg
+                    return -args[0]
+                total = args[0]
+                for i in range(1, len(args)):
+                    total -= args[i]
                 return total
 
         class ProdProc(Procedure):
             def __init__(self):
                 super().__init__('*')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL:
-                    return BuiltIns.Number(1)
-                else:
-                    return args.car.evaluate(env) * BuiltIns.globals.get("*").evaluate(env, args.cdr)
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return args[0] * args[1]
+                total = 1
+                for arg in args:
+                    total *= arg
+                return total
 
         class QuotProc(Procedure):
             def __init__(self):
                 super().__init__('/')
 
-            def evaluate(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                if args.cdr is BuiltIns.NIL:  # 1 arg
-                    total = BuiltIns.Number(1.0) / args.car.evaluate(env)
+            def apply(self, args):
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                if len(args) == 1:  # 1 arg
+                    total = 1.0
+                    start = 0
                 else:
-                    total = args.car.evaluate(env)
-                    arg = args.cdr
-                    while arg is not BuiltIns.NIL:
-                        total /= arg.car.evaluate(env)
-                        arg = arg.cdr
+                    total = args[0]
+                    start = 1
+                for i in range(start, len(args)):
+                    if args[i] == 0:
+                        raise ValueError("Division by zero is not allowed")
+                    total /= args[i]
                 return total
 
         class EqualProc(Procedure):
             def __init__(self):
                 super().__init__('=')
 
-            def call(self, env, args):
-                if args is BuiltIns.NIL: raise Error.InvalidNOFArgumentsException(self)  # 0 args
-                check = args.car.evaluate(env)
-                arg = args.cdr
-                while arg is not BuiltIns.NIL:
-                    if args.car.evaluate(env) != check: return BuiltIns.NIL
-                    arg = arg.cdr
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return BuiltIns.T if args[0] == args[1] else BuiltIns.NIL
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                check = args[0]
+                for i in range(1, len(args)):
+                    if args[i] != check: return BuiltIns.NIL
                 return BuiltIns.T
 
         class GreaterThanProc(Procedure):
             def __init__(self):
                 super().__init__('>')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is BuiltIns.NIL or  # 1 arg
-                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
-                    raise Error.InvalidNOFArgumentsException(self)
-                t1 = args.car.evaluate(env)
-                t2 = args.cdr.car.evaluate(env)
-                return BuiltIns.T if t1 > t2 else BuiltIns.NIL
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return BuiltIns.T if args[0] > args[1] else BuiltIns.NIL
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                # Each argument must be greater than the next
+                for i in range(1, len(args)):
+                    if not args[i - 1] > args[i]: return BuiltIns.NIL
+                return BuiltIns.T
 
         class LessThanProc(Procedure):
             def __init__(self):
                 super().__init__('<')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is BuiltIns.NIL or  # 1 arg
-                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
-                    raise Error.InvalidNOFArgumentsException(self)
-                t1 = args.car.evaluate(env)
-                t2 = args.cdr.car.evaluate(env)
-                return BuiltIns.T if t1 < t2 else BuiltIns.NIL
+            def apply(self, args):
+                if len(args) == 2:  # Common case
+                    return BuiltIns.T if args[0] < args[1] else BuiltIns.NIL
+                if len(args) == 0: raise Error.InvalidNOFArgumentsException(self)  # 0 args
+                # Each argument must be less than the next
+                for i in range(1, len(args)):
+                    if not args[i - 1] < args[i]: return BuiltIns.NIL
+                return BuiltIns.T
 
         class NotProc(Procedure):
             def __init__(self):
                 super().__init__('NOT')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                return BuiltIns.T if args.car.evaluate(env) is BuiltIns.NIL else BuiltIns.NIL
+                return BuiltIns.T if args[0] is BuiltIns.NIL else BuiltIns.NIL
 
-        class IfProc(Procedure):
+        class IfProc(SpecialForm):
             def __init__(self):
                 super().__init__('IF')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL or  # 1 arg
                         args.cdr.cdr is BuiltIns.NIL or  # 2 args
                         args.cdr.cdr.cdr is not BuiltIns.NIL):  # > 3 args
                     raise Error.InvalidNOFArgumentsException(self)
                 #  (if T 1 0) -> arguments = (T (1 (0 NIL)))
-                if args.car.evaluate(env) is BuiltIns.T:
-                    return args.cdr.car.evaluate(env)
-                else:
-                    return args.cdr.cdr.car.evaluate(env)
+                predicate = Analyzer.analyze(args.car, scope)
+                consequent = Analyzer.analyze(args.cdr.car, scope, tail)
+                alternative = Analyzer.analyze(args.cdr.cdr.car, scope, tail)
+                t = BuiltIns.T
+
+                def execute(frame):
+                    if predicate(frame) is t:
+                        return consequent(frame)
+                    else:
+                        return alternative(frame)
+                return execute
 
-        class CondProc(Procedure):
+        class CondProc(SpecialForm):
             def __init__(self):
                 super().__init__('COND')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
+                clauses = []
                 arg = args
-                while args is not BuiltIns.NIL:
-                    if arg.car.car.evaluate(env) is BuiltIns.T:
-                        return arg.car.cdr.car.evaluate(env)
+                while arg is not BuiltIns.NIL:
+                    clauses.append((Analyzer.analyze(arg.car.car, scope),
+                                    Analyzer.analyze(arg.car.cdr.car, scope, tail)))
                     arg = arg.cdr
-                return BuiltIns.NIL
+                t = BuiltIns.T
+                nil = BuiltIns.NIL
+
+                def execute(frame):
+                    for predicate, consequent in clauses:
+                        if predicate(frame) is t:
+                            return consequent(frame)
+                    return nil
+                return execute
 
-        class QuoteProc(Procedure):
+        class QuoteProc(SpecialForm):
             def __init__(self):
                 super().__init__('QUOTE')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is not BuiltIns.NIL):  # > 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                return args.car
+                quoted = args.car
+                return lambda frame: quoted
 
-        class DefineProc(Procedure):
-            def __init__(self):
-                super().__init__('DEFINE')
+        class DefineProc(SpecialForm):
+            def __init__(self, name='DEFINE'):
+                super().__init__(name)
 
-            def evaluate(self, env, args):
+            def analyze_value(self, args, scope):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.car is BuiltIns.NIL or  # No Designator Names (FuncName + Parameters / VarName)
                         args.cdr is BuiltIns.NIL):  # No Func Def
@@ -369,248 +739,2692 @@ class BuiltIns:
                 if type(args.car) is Symbol:  # Def var
                     if args.cdr.cdr is not BuiltIns.NIL:  # > 2 args
                         raise Error.InvalidNOFArgumentsException(self)
-                    env.bind(args.car, args.cdr.car.evaluate(env))
-                    return args.car
-                else:  # Def func
-                    env.bind(args.car.car, UserDefinedProcedure(name=args.car.car,
-                                                                parameters=args.car.cdr,
-                                                                expression=args.cdr))
-                    return args.car.car
+                    return args.car, Analyzer.analyze(args.cdr.car, scope)
+                # Def func
+                name = args.car.car
+                if type(name) is not Symbol:
+                    raise Error.IllegalVariableNameException(name)
+                return name, Analyzer.analyze_lambda(name, args.car.cdr, args.cdr, scope)
+
+            def analyze(self, args, scope, tail):
+                name, value = self.analyze_value(args, scope)
+                if scope.toplevel:
+                    cell = scope.env.cell(name)
+
+                    def execute(frame):
+                        cell.value = value(frame)
+                        return name
+                    return execute
+                slot = scope.local_slot(name)
+
+                def execute(frame):
+                    frame[slot] = value(frame)
+                    return name
+                return execute
+
+        class DefineMemoizedProc(DefineProc):
+            # (define-memoized (f args...) body...): DEFINE of a procedure wrapped by MEMOIZE
+            def __init__(self):
+                super().__init__('DEFINE-MEMOIZED')
 
-        class LambdaProc(Procedure):
+            def analyze_value(self, args, scope):
+                if args is BuiltIns.NIL or type(args.car) is not Cons:
+                    raise Error.IllegalProcedureNameException(self)
+                name, value = super().analyze_value(args, scope)
+                return name, lambda frame: MemoizedProcedure(value(frame))
+
+        class LambdaProc(SpecialForm):
             def __init__(self):
                 super().__init__('LAMBDA')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL):  # 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                return UserDefinedProcedure(name='LAMBDA', parameters=args.car, expression=args.cdr)
+                return Analyzer.analyze_lambda('LAMBDA', args.car, args.cdr, scope)
 
-        class LetProc(Procedure):
+        class LetProc(SpecialForm):
             def __init__(self):
                 super().__init__('LET')
 
-            def evaluate(self, env, args):
+            def analyze(self, args, scope, tail):
                 if (args is BuiltIns.NIL or  # 0 args
                         args.cdr is BuiltIns.NIL):  # 1 arg
                     raise Error.InvalidNOFArgumentsException(self)
-                lexical_env = Environment(*env.copy())
+                names = []
+                values = []
                 assignment = args.car
                 while assignment is not BuiltIns.NIL:
                     if (assignment.car is BuiltIns.NIL or  # 0 args
-                            args.car.cdr is BuiltIns.NIL or  # 1 arg
-                            args.car.cdr.cdr is not BuiltIns.NIL):  # > 2 arg
+                            assignment.car.cdr is BuiltIns.NIL or  # 1 arg
+                            assignment.car.cdr.cdr is not BuiltIns.NIL):  # > 2 arg
                         raise Error.InvalidNOFArgumentsException(assignment)
-                    lexical_env.bind(assignment.car.car, assignment.car.cdr.car.evaluate(env))
+                    if type(assignment.car.car) is not Symbol:
+                        raise Error.IllegalVariableNameException(assignment.car.car)
+                    names.append(assignment.car.car)
+                    values.append(Analyzer.analyze(assignment.car.cdr.car, scope))
                     assignment = assignment.cdr
-                expression = args.cdr
-                while expression is not BuiltIns.NIL:  # Evaluating expressions in let; return result of last expression
-                    result = expression.car.evaluate(lexical_env)
-                    if expression.cdr is BuiltIns.NIL:
-                        return result
-                    else:
-                        expression = expression.cdr
+                # LET bindings take slots of the enclosing frame, visible only while analyzing the body
+                with scope.block(names) as slots:
+                    body = Analyzer.analyze_body(args.cdr, scope, tail)
+                bindings = tuple(zip(slots, values))
+
+                def execute(frame):
+                    for slot, value in bindings:
+                        frame[slot] = value(frame)
+                    return body(frame)
+                return execute
+
+        class DelayProc(SpecialForm):
+            def __init__(self):
+                super().__init__('DELAY')
+
+            def analyze(self, args, scope, tail):
+                if (args is BuiltIns.NIL or  # 0 args
+                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+                    raise Error.InvalidNOFArgumentsException(self)
+                # The expression gets a frame of its own, as the body of a procedure of no arguments
+                procedure = Analyzer.analyze_lambda('DELAY', BuiltIns.NIL, args, scope)
+                return lambda frame: BuiltIns.Promise(functools.partial(procedure(frame).apply, []))
+
+        class ConsStreamProc(SpecialForm):
+            def __init__(self):
+                super().__init__('CONS-STREAM')
+
+            def analyze(self, args, scope, tail):
+                if (args is BuiltIns.NIL or  # 0 args
+                        args.cdr is BuiltIns.NIL or  # 1 arg
+                        args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+                    raise Error.InvalidNOFArgumentsException(self)
+                # (cons-stream a b) -> (cons a (delay b))
+                car = Analyzer.analyze(args.car, scope)
+                procedure = Analyzer.analyze_lambda('DELAY', BuiltIns.NIL, args.cdr, scope)
+                return lambda frame: Cons(car(frame), BuiltIns.Promise(functools.partial(procedure(frame).apply, [])))
 
         class DisplayProc(Procedure):
             def __init__(self):
                 super().__init__('DISPLAY')
 
-            def evaluate(self, env, args):
-                if (args is BuiltIns.NIL or  # 0 args
-                        args.cdr is not BuiltIns.NIL):  # > 1 arg
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                print(args.car.evaluate(env), end='')
+                print(args[0], end='', file=BuiltIns.output.get())
                 return BuiltIns.NIL
 
         class NewlineProc(Procedure):
             def __init__(self):
                 super().__init__('NEWLINE')
 
-            def evaluate(self, env, args):
-                if args is not BuiltIns.NIL:  # > 0
+            def apply(self, args):
+                if len(args) != 0:  # > 0
+                    raise Error.InvalidNOFArgumentsException(self)
+                print(file=BuiltIns.output.get())
+                return BuiltIns.NIL
+
+        class MemoizeProc(Procedure):
+            def __init__(self):
+                super().__init__('MEMOIZE')
+
+            def apply(self, args):
+                # (memoize f) or (memoize f max-size)
+                if len(args) not in (1, 2):
+                    raise Error.InvalidNOFArgumentsException(self)
+                return MemoizedProcedure(*args)
+
+        class MemoStatsProc(Procedure):
+            def __init__(self):
+                super().__init__('MEMO-STATS')
+
+            def apply(self, args):
+                # (hits misses entries)
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                if type(args[0]) is not MemoizedProcedure:
+                    raise Error.WrongTypeArgumentException(args[0])
+                return Cons(args[0].hits, Cons(args[0].misses, Cons(len(args[0].cache), BuiltIns.NIL)))
+
+        class MemoClearProc(Procedure):
+            def __init__(self):
+                super().__init__('MEMO-CLEAR!')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                if type(args[0]) is not MemoizedProcedure:
+                    raise Error.WrongTypeArgumentException(args[0])
+                args[0].clear()
+                return BuiltIns.NIL
+
+        class MapProc(Procedure):
+            def __init__(self):
+                super().__init__('MAP')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                proc, sequence = args
+                vector = Vectorizer.vector(sequence)
+                result = Vectorizer.apply(proc, [vector])
+                if result is None:
+                    result = [proc.apply([item]) for item in vector.items()]
+                return Vectorizer.sequence(result, sequence)
+
+        class FilterProc(Procedure):
+            def __init__(self):
+                super().__init__('FILTER')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                predicate, sequence = args
+                vector = Vectorizer.vector(sequence)
+                result = Vectorizer.apply(predicate, [vector])
+                if result is None:
+                    result = [item for item in vector.items() if predicate.apply([item]) is BuiltIns.T]
+                elif result.dtype == bool:
+                    result = vector.value[result]
+                else:  # A number is never true
+                    result = []
+                return Vectorizer.sequence(result, sequence)
+
+        class AccumulateProc(Procedure):
+            def __init__(self):
+                super().__init__('ACCUMULATE')
+
+            def apply(self, args):
+                if len(args) != 3:
+                    raise Error.InvalidNOFArgumentsException(self)
+                op, initial, sequence = args
+                vector = Vectorizer.vector(sequence)
+                result = Vectorizer.fold(op, initial, vector)
+                if result is None:
+                    # (op item1 (op item2 ... (op itemN initial)))
+                    result = initial
+                    items = vector.items()
+                    for i in range(len(items) - 1, -1, -1):
+                        result = op.apply([items[i], result])
+                return result
+
+        class MakeVectorProc(Procedure):
+            def __init__(self):
+                super().__init__('MAKE-VECTOR')
+
+            def apply(self, args):
+                if len(args) not in (1, 2):
+                    raise Error.InvalidNOFArgumentsException(self)
+                return BuiltIns.Vector([args[1] if len(args) == 2 else 0] * args[0])
+
+        class VectorRefProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-REF')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return args[0].ref(args[1])
+
+        class VectorSetProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-SET!')
+
+            def apply(self, args):
+                if len(args) != 3:
+                    raise Error.InvalidNOFArgumentsException(self)
+                args[0].set(args[1], args[2])
+                return BuiltIns.NIL
+
+        class VectorLengthProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-LENGTH')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return len(args[0])
+
+        class ListToVectorProc(Procedure):
+            def __init__(self):
+                super().__init__('LIST->VECTOR')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                items = []
+                p = args[0]
+                while p is not BuiltIns.NIL:
+                    items.append(p.car)
+                    p = p.cdr
+                return BuiltIns.Vector(items)
+
+        class VectorAddProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-ADD')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                a, b = args
+                if len(a) != len(b):
+                    raise Error.VectorLengthMismatchException(a, b)
+                if a.numeric() and b.numeric():
+                    bounds = Vectorizer.magnitude(a.value), Vectorizer.magnitude(b.value)
+                    if None in bounds or sum(bounds) < 2 ** 63:  # Else an integer sum could wrap in int64
+                        return BuiltIns.Vector(a.value + b.value)
+                return BuiltIns.Vector([x + y for x, y in zip(a.items(), b.items())])
+
+        class VectorScaleProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-SCALE')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                vector, k = args
+                if vector.numeric() and (type(k) is float or type(k) is int and
+                                         (Vectorizer.magnitude(vector.value) or 1) * abs(k) < 2 ** 63):
+                    return BuiltIns.Vector(vector.value * k)
+                return BuiltIns.Vector([x * k for x in vector.items()])
+
+        class VectorSumProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-SUM')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                if args[0].numeric():
+                    bound = Vectorizer.magnitude(args[0].value)
+                    if bound is None or len(args[0]) * bound < 2 ** 63:
+                        return args[0].value.sum().item()
+                return sum(args[0].items())
+
+        class VectorDotProc(Procedure):
+            def __init__(self):
+                super().__init__('VECTOR-DOT')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                a, b = args
+                if len(a) != len(b):
+                    raise Error.VectorLengthMismatchException(a, b)
+                if a.numeric() and b.numeric():
+                    bounds = Vectorizer.magnitude(a.value), Vectorizer.magnitude(b.value)
+                    if None in bounds or len(a) * bounds[0] * bounds[1] < 2 ** 63:
+                        return numpy.dot(a.value, b.value).item()
+                return sum(x * y for x, y in zip(a.items(), b.items()))
+
+        class PromiseProc(Procedure):
+            # Wraps a procedure of no arguments in a promise; applied by code compiled for DELAY and CONS-STREAM
+            def __init__(self):
+                super().__init__('PROMISE')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return BuiltIns.Promise(functools.partial(args[0].apply, []))
+
+        class ForceProc(Procedure):
+            def __init__(self):
+                super().__init__('FORCE')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return args[0].force() if type(args[0]) is BuiltIns.Promise else args[0]
+
+        class StreamCarProc(Procedure):
+            def __init__(self):
+                super().__init__('STREAM-CAR')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                BuiltIns.Promise.rest_of(args[0])
+                return args[0].car
+
+        class StreamCdrProc(Procedure):
+            def __init__(self):
+                super().__init__('STREAM-CDR')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return BuiltIns.Promise.rest_of(args[0]).force()
+
+        class StreamNullProc(Procedure):
+            def __init__(self):
+                super().__init__('STREAM-NULL?')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return BuiltIns.T if args[0] is BuiltIns.NIL else BuiltIns.NIL
+
+        class StreamMapProc(Procedure):
+            def __init__(self):
+                super().__init__('STREAM-MAP')
+
+            def apply(self, args):
+                # (stream-map proc stream...), ending with the shortest stream
+                if len(args) < 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                proc = args[0]
+                streams = args[1:]
+                for stream in streams:
+                    if stream is BuiltIns.NIL:
+                        return BuiltIns.NIL
+                # The rest is delayed holding only the promises of the rest of each stream
+                rest = [BuiltIns.Promise.rest_of(stream) for stream in streams]
+                return Cons(proc.apply([stream.car for stream in streams]),
+                            BuiltIns.Promise(functools.partial(self.apply_rest, proc, rest)))
+
+            def apply_rest(self, proc, promises):
+                # Thunk of the rest, as a generator for `Promise.force`
+                streams = []
+                for promise in promises:
+                    streams.append((yield promise))
+                return self.apply([proc, *streams])
+
+        class StreamFilterProc(Procedure):
+            def __init__(self):
+                super().__init__('STREAM-FILTER')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                predicate, stream = args
+                del args[:]  # Skipped elements can be collected as soon as they are passed
+                while stream is not BuiltIns.NIL:
+                    rest = BuiltIns.Promise.rest_of(stream)
+                    if predicate.apply([stream.car]) is BuiltIns.T:
+                        return Cons(stream.car, BuiltIns.Promise(functools.partial(self.apply_rest, predicate, rest)))
+                    stream = rest.force()
+                return BuiltIns.NIL
+
+            def apply_rest(self, predicate, promise):
+                # Thunk of the rest, as a generator for `Promise.force`
+                stream = yield promise
+                while stream is not BuiltIns.NIL:
+                    rest = BuiltIns.Promise.rest_of(stream)
+                    if predicate.apply([stream.car]) is BuiltIns.T:
+                        return Cons(stream.car, BuiltIns.Promise(functools.partial(self.apply_rest, predicate, rest)))
+                    stream = yield rest
+                return BuiltIns.NIL
+
+        class StreamRefProc(Procedure):
+            def __init__(self):
+                super().__init__('STREAM-REF')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                stream, n = args
+                del args[:]  # Elements already passed can be collected unless the caller holds the stream
+                for _ in range(n):
+                    stream = BuiltIns.Promise.rest_of(stream).force()
+                BuiltIns.Promise.rest_of(stream)
+                return stream.car
+
+        class EnvironmentForm(SpecialForm):
+            # Application of `proc` with the global environment of the program as its first argument
+            def __init__(self, name, proc):
+                super().__init__(name)
+                self.proc = proc
+
+            def check(self, env):
+                if self.name in env.restricted:
+                    raise Error.UndefinedVariableException(Symbol(self.name))
+
+            def analyze(self, args, scope, tail):
+                self.check(scope.env)
+                operands = []
+                while args is not BuiltIns.NIL:
+                    operands.append(Analyzer.analyze(args.car, scope))
+                    args = args.cdr
+                env = scope.env
+                proc = self.proc
+                return lambda frame: proc.apply([env, *[operand(frame) for operand in operands]])
+
+        class SaveImageProc(Procedure):
+            # (save-image "file"): saves the global bindings of the program, see `Image`
+            def __init__(self):
+                super().__init__('SAVE-IMAGE')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                Image.save(args[1].value, args[0])
+                return BuiltIns.NIL
+
+        class LoadImageProc(Procedure):
+            # (load-image "file"): binds the globals saved in an image
+            def __init__(self):
+                super().__init__('LOAD-IMAGE')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                Image.load(args[1].value, args[0])
+                return BuiltIns.NIL
+
+        class PMapProc(Procedure):
+            # (pmap f list), (pmap f list chunk-size) or (pmap f list chunk-size workers), see `Parallel`
+            def __init__(self, name='PMAP'):
+                super().__init__(name)
+
+            def apply(self, args):
+                if len(args) not in (3, 4, 5):
+                    raise Error.InvalidNOFArgumentsException(self)
+                env, proc, sequence, *options = args
+                items = []
+                while sequence is not BuiltIns.NIL:
+                    items.append(sequence.car)
+                    sequence = sequence.cdr
+                results = Parallel.map(env, proc, items, *options)
+                result = BuiltIns.NIL
+                for i in range(len(results) - 1, -1, -1):
+                    result = Cons(results[i], result)
+                return result
+
+        class ParallelForEachProc(PMapProc):
+            # PMAP for the effects in the workers; their changes to global bindings are not seen here
+            def __init__(self):
+                super().__init__('PARALLEL-FOR-EACH')
+
+            def apply(self, args):
+                super().apply(args)
+                return BuiltIns.NIL
+
+        class ProfileProc(Procedure):
+            # Applies a procedure of no arguments under a new `Profiler`, counting retained blocks if the second
+            # argument is given and true, and writes its report as DISPLAY does
+            def __init__(self):
+                super().__init__('PROFILE')
+
+            def apply(self, args):
+                if len(args) not in (1, 2):
+                    raise Error.InvalidNOFArgumentsException(self)
+                profiler = Profiler(len(args) == 2 and args[1] is BuiltIns.T)
+                value = profiler.run(functools.partial(args[0].apply, []))
+                profiler.report(BuiltIns.output.get())
+                return value
+
+        class ProfileForm(SpecialForm):
+            # (profile exp [memory]): the value of `exp`, after reporting the time of the procedures it applied, and
+            # the blocks they retained if `memory` is true
+            def __init__(self, proc):
+                super().__init__('PROFILE')
+                self.proc = proc
+
+            def analyze(self, args, scope, tail):
+                if (args is BuiltIns.NIL or  # 0 args
+                        args.cdr is not BuiltIns.NIL and args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+                    raise Error.InvalidNOFArgumentsException(self)
+                procedure = Analyzer.analyze_lambda('PROFILE', BuiltIns.NIL, Cons(args.car, BuiltIns.NIL), scope)
+                proc = self.proc
+                if args.cdr is BuiltIns.NIL:
+                    return lambda frame: proc.apply([procedure(frame)])
+                memory = Analyzer.analyze(args.cdr.car, scope)
+                return lambda frame: proc.apply([procedure(frame), memory(frame)])
+
+        class SpawnProc(Procedure):
+            # (spawn thunk): a new task applying `thunk`, see `Scheduler`
+            def __init__(self):
+                super().__init__('SPAWN')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                scheduler = Scheduler.current.get()
+                if scheduler is None:
+                    raise Error.OutsideTaskException(self)
+                return scheduler.spawn(args[0])
+
+        class SuspendingProc(Procedure):
+            # Procedure that may suspend the task applying it
+            def suspend(self, park):
+                if Scheduler.current.get() is None:
+                    raise Error.OutsideTaskException(self)
+                raise VirtualMachine.Suspension(self, park)
+
+        class YieldProc(SuspendingProc):
+            # (yield): lets the other ready tasks run first
+            def __init__(self):
+                super().__init__('YIELD')
+
+            def apply(self, args):
+                if len(args) != 0:
+                    raise Error.InvalidNOFArgumentsException(self)
+                self.suspend(lambda scheduler, task: scheduler.resume(task, BuiltIns.NIL))
+
+        class JoinProc(SuspendingProc):
+            # (join task): the value of `task`, once done; fails with the error of a failed task
+            def __init__(self):
+                super().__init__('JOIN')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                task = args[0]
+                if task.done:
+                    if task.error is not None:
+                        raise task.error
+                    return task.value
+                self.suspend(lambda scheduler, joiner: task.waiters.append(joiner))
+
+        class AwaitProc(SuspendingProc):
+            # (await awaitable): the result of a host coroutine or future, run on the event loop meanwhile
+            def __init__(self):
+                super().__init__('AWAIT')
+
+            def apply(self, args):
+                if len(args) != 1:
                     raise Error.InvalidNOFArgumentsException(self)
-                print()
+                self.suspend(lambda scheduler, task: scheduler.wait(task, args[0]))
+
+        class MakeChannelProc(Procedure):
+            def __init__(self):
+                super().__init__('MAKE-CHANNEL')
+
+            def apply(self, args):
+                if len(args) != 0:
+                    raise Error.InvalidNOFArgumentsException(self)
+                return BuiltIns.Channel()
+
+        class ChannelPutProc(Procedure):
+            # (channel-put channel value): never waits
+            def __init__(self):
+                super().__init__('CHANNEL-PUT')
+
+            def apply(self, args):
+                if len(args) != 2:
+                    raise Error.InvalidNOFArgumentsException(self)
+                channel, value = args
+                while len(channel.receivers) > 0:
+                    receiver = channel.receivers.popleft()
+                    if not receiver.done:  # Unless failed while waiting
+                        receiver.scheduler.resume(receiver, value)
+                        return BuiltIns.NIL
+                channel.value.append(value)
                 return BuiltIns.NIL
 
+        class ChannelGetProc(SuspendingProc):
+            # (channel-get channel): the oldest item of `channel`, waiting for one while it is empty
+            def __init__(self):
+                super().__init__('CHANNEL-GET')
+
+            def apply(self, args):
+                if len(args) != 1:
+                    raise Error.InvalidNOFArgumentsException(self)
+                channel = args[0]
+                if len(channel.value) > 0:
+                    return channel.value.popleft()
+                self.suspend(lambda scheduler, task: channel.receivers.append(task))
+
     globals = {
-        "NIL": NIL,
-        "T": T,
-        "CONS": BuiltInProcs.ConsFunc(),
-        "CAR": BuiltInProcs.CarFunc(),
-        "CDR": BuiltInProcs.CdrFunc(),
-        "LIST": BuiltInProcs.ListFunc(),
-        "+": BuiltInProcs.AddProc(),
-        "-": BuiltInProcs.DiffProc(),
-        "*": BuiltInProcs.ProdProc(),
-        "/": BuiltInProcs.QuotProc(),
-        ">": BuiltInProcs.GreaterThanProc(),
-        "<": BuiltInProcs.LessThanProc(),
-        "=": BuiltInProcs.EqualProc(),
-        "NOT": BuiltInProcs.NotProc(),
-        "IF": BuiltInProcs.IfProc(),
-        "COND": BuiltInProcs.CondProc(),
-        "QUOTE": BuiltInProcs.QuoteProc(),
-        "DEFINE": BuiltInProcs.DefineProc(),
-        "LAMBDA": BuiltInProcs.LambdaProc(),
-        "LET": BuiltInProcs.LetProc(),
-        "DISPLAY": BuiltInProcs.DisplayProc(),
-        "NEWLINE": BuiltInProcs.NewlineProc(),
+        Symbol("NIL"): NIL,
+        Symbol("T"): T,
+        Symbol("CONS"): BuiltInProcs.ConsFunc(),
+        Symbol("CAR"): BuiltInProcs.CarFunc(),
+        Symbol("CDR"): BuiltInProcs.CdrFunc(),
+        Symbol("LIST"): BuiltInProcs.ListFunc(),
+        Symbol("+"): BuiltInProcs.AddProc(),
+        Symbol("-"): BuiltInProcs.DiffProc(),
+        Symbol("*"): BuiltInProcs.ProdProc(),
+        Symbol("/"): BuiltInProcs.QuotProc(),
+        Symbol(">"): BuiltInProcs.GreaterThanProc(),
+        Symbol("<"): BuiltInProcs.LessThanProc(),
+        Symbol("="): BuiltInProcs.EqualProc(),
+        Symbol("NOT"): BuiltInProcs.NotProc(),
+        Symbol("IF"): BuiltInProcs.IfProc(),
+        Symbol("COND"): BuiltInProcs.CondProc(),
+        Symbol("QUOTE"): BuiltInProcs.QuoteProc(),
+        Symbol("DEFINE"): BuiltInProcs.DefineProc(),
+        Symbol("DEFINE-MEMOIZED"): BuiltInProcs.DefineMemoizedProc(),
+        Symbol("LAMBDA"): BuiltInProcs.LambdaProc(),
+        Symbol("LET"): BuiltInProcs.LetProc(),
+        Symbol("DELAY"): BuiltInProcs.DelayProc(),
+        Symbol("CONS-STREAM"): BuiltInProcs.ConsStreamProc(),
+        Symbol("DISPLAY"): BuiltInProcs.DisplayProc(),
+        Symbol("NEWLINE"): BuiltInProcs.NewlineProc(),
+        Symbol("MEMOIZE"): BuiltInProcs.MemoizeProc(),
+        Symbol("MEMO-STATS"): BuiltInProcs.MemoStatsProc(),
+        Symbol("MEMO-CLEAR!"): BuiltInProcs.MemoClearProc(),
+        Symbol("MAP"): BuiltInProcs.MapProc(),
+        Symbol("FILTER"): BuiltInProcs.FilterProc(),
+        Symbol("ACCUMULATE"): BuiltInProcs.AccumulateProc(),
+        Symbol("MAKE-VECTOR"): BuiltInProcs.MakeVectorProc(),
+        Symbol("VECTOR-REF"): BuiltInProcs.VectorRefProc(),
+        Symbol("VECTOR-SET!"): BuiltInProcs.VectorSetProc(),
+        Symbol("VECTOR-LENGTH"): BuiltInProcs.VectorLengthProc(),
+        Symbol("LIST->VECTOR"): BuiltInProcs.ListToVectorProc(),
+        Symbol("VECTOR-ADD"): BuiltInProcs.VectorAddProc(),
+        Symbol("VECTOR-SCALE"): BuiltInProcs.VectorScaleProc(),
+        Symbol("VECTOR-SUM"): BuiltInProcs.VectorSumProc(),
+        Symbol("VECTOR-DOT"): BuiltInProcs.VectorDotProc(),
+        Symbol("FORCE"): BuiltInProcs.ForceProc(),
+        Symbol("STREAM-CAR"): BuiltInProcs.StreamCarProc(),
+        Symbol("STREAM-CDR"): BuiltInProcs.StreamCdrProc(),
+        Symbol("STREAM-NULL?"): BuiltInProcs.StreamNullProc(),
+        Symbol("THE-EMPTY-STREAM"): NIL,
+        Symbol("STREAM-MAP"): BuiltInProcs.StreamMapProc(),
+        Symbol("STREAM-FILTER"): BuiltInProcs.StreamFilterProc(),
+        Symbol("STREAM-REF"): BuiltInProcs.StreamRefProc(),
+        Symbol("SAVE-IMAGE"): BuiltInProcs.EnvironmentForm('SAVE-IMAGE', BuiltInProcs.SaveImageProc()),
+        Symbol("LOAD-IMAGE"): BuiltInProcs.EnvironmentForm('LOAD-IMAGE', BuiltInProcs.LoadImageProc()),
+        Symbol("PMAP"): BuiltInProcs.EnvironmentForm('PMAP', BuiltInProcs.PMapProc()),
+        Symbol("PARALLEL-FOR-EACH"): BuiltInProcs.EnvironmentForm('PARALLEL-FOR-EACH',
+                                                                 BuiltInProcs.ParallelForEachProc()),
+        Symbol("PROFILE"): BuiltInProcs.ProfileForm(BuiltInProcs.ProfileProc()),
+        Symbol("SPAWN"): BuiltInProcs.SpawnProc(),
+        Symbol("YIELD"): BuiltInProcs.YieldProc(),
+        Symbol("JOIN"): BuiltInProcs.JoinProc(),
+        Symbol("AWAIT"): BuiltInProcs.AwaitProc(),
+        Symbol("MAKE-CHANNEL"): BuiltInProcs.MakeChannelProc(),
+        Symbol("CHANNEL-PUT"): BuiltInProcs.ChannelPutProc(),
+        Symbol("CHANNEL-GET"): BuiltInProcs.ChannelGetProc(),
     }
     global_env = Environment(globals)
+    output = contextvars.ContextVar('output', default=None)  # File DISPLAY writes to; standard output if `None`
+
+
+class Scope:
+    """
+    Compile-time picture of a frame for lexical addressing (SICP 5.5.6): the slot each visible name is kept in.
+
+    Frames are lists with the parent frame in slot 0, so a variable is found at a (depth, slot) address fixed at
+    analysis time. Names bound in no enclosing scope are globals, held in cells of `env`.
+    """
+    def __init__(self, parent, parameters, env=None):
+        self.parent = parent
+        self.env = env if parent is None else parent.env
+        self.toplevel = parent is None  # DEFINEs at top level bind globals rather than slots
+        self.names = list(parameters)  # Visible names, innermost last
+        self.slots = list(range(1, len(self.names) + 1))
+        self.size = len(self.names) + 1  # Number of slots in a frame, including the parent frame
+
+    def allocate(self, symbol):
+        self.names.append(symbol)
+        self.slots.append(self.size)
+        self.size += 1
+        return self.size - 1
+
+    def lookup(self, symbol):
+        scope = self
+        depth = 0
+        while scope is not None:
+            for i in range(len(scope.names) - 1, -1, -1):
+                if scope.names[i] is symbol:
+                    return depth, scope.slots[i]
+            scope = scope.parent
+            depth += 1
+        return None
+
+    def local_slot(self, symbol):
+        # Slot for an internal DEFINE; allocated here unless `scan_defines` already did
+        for i in range(len(self.names) - 1, -1, -1):
+            if self.names[i] is symbol:
+                return self.slots[i]
+        return self.allocate(symbol)
+
+    def scan_defines(self, expression):
+        # Internal DEFINEs get their slots before the body is analyzed so that its procedures can refer to each other
+        if self.toplevel:
+            return
+        while expression is not BuiltIns.NIL:
+            e = expression.car
+            if (type(e) is Cons and (e.car is Symbol('DEFINE') or e.car is Symbol('DEFINE-MEMOIZED')) and
+                    e.cdr is not BuiltIns.NIL):
+                name = e.cdr.car if type(e.cdr.car) is Symbol else e.cdr.car.car
+                if type(name) is Symbol:
+                    self.local_slot(name)
+            expression = expression.cdr
+
+    def snapshot(self):
+        # Copy of the names visible now, which LET blocks and internal DEFINEs will change
+        scope = Scope(None if self.parent is None else self.parent.snapshot(), (), self.env)
+        scope.toplevel = self.toplevel
+        scope.names = list(self.names)
+        scope.slots = list(self.slots)
+        scope.size = self.size
+        return scope
+
+    @contextlib.contextmanager
+    def block(self, names):
+        # Names visible only within a LET body, stored in slots of the enclosing frame
+        toplevel = self.toplevel
+        count = len(self.names)
+        self.toplevel = False
+        try:
+            yield [self.allocate(name) for name in names]
+        finally:
+            del self.names[count:]
+            del self.slots[count:]
+            self.toplevel = toplevel
+
+
+class Analyzer:
+    """
+    Syntactic analysis (SICP 4.1.7): turns a parsed form into a Python closure taking a frame,
+    so special forms are dispatched once at analysis time instead of on every evaluation.
+
+    `tail` marks forms in tail position, whose applications return a `TailCall` instead of recursing.
+    """
+    @staticmethod
+    def evaluate(exp, env):
+        scope = Scope(None, (), env)
+        execute = Analyzer.analyze(exp, scope)
+        return execute([None] * scope.size)
+
+    @staticmethod
+    def analyze(exp, scope, tail=False):
+        if type(exp) is Symbol:
+            return Analyzer.analyze_variable(exp, scope)
+        if type(exp) is Cons:
+            if type(exp.car) is Symbol:
+                form = BuiltIns.globals.get(exp.car)
+                if isinstance(form, SpecialForm):
+                    return form.analyze(exp.cdr, scope, tail)
+            return Analyzer.analyze_application(exp, scope, tail)
+        return lambda frame: exp
+
+    @staticmethod
+    def analyze_variable(symbol, scope):
+        address = scope.lookup(symbol)
+        if address is None:
+            cell = scope.env.cell(symbol)
+
+            def execute(frame):
+                value = cell.value
+                if value is None:
+                    raise Error.UndefinedVariableException(symbol)
+                return value
+            return execute
+        depth, slot = address
+        if depth == 0:
+            return lambda frame: frame[slot]
+        if depth == 1:
+            return lambda frame: frame[0][slot]
+        if depth == 2:
+            return lambda frame: frame[0][0][slot]
+
+        def execute(frame):
+            for _ in range(depth):
+                frame = frame[0]
+            return frame[slot]
+        return execute
+
+    @staticmethod
+    def analyze_application(exp, scope, tail):
+        operator = Analyzer.analyze(exp.car, scope)
+        operands = []
+        arg = exp.cdr
+        while arg is not BuiltIns.NIL:
+            operands.append(Analyzer.analyze(arg.car, scope))
+            arg = arg.cdr
+        # Operands are evaluated by arity-specialized closures to avoid building a generator per call
+        if len(operands) == 0:
+            evaluate_operands = lambda frame: []
+        elif len(operands) == 1:
+            a, = operands
+            evaluate_operands = lambda frame: [a(frame)]
+        elif len(operands) == 2:
+            a, b = operands
+            evaluate_operands = lambda frame: [a(frame), b(frame)]
+        elif len(operands) == 3:
+            a, b, c = operands
+            evaluate_operands = lambda frame: [a(frame), b(frame), c(frame)]
+        else:
+            evaluate_operands = lambda frame: [operand(frame) for operand in operands]
+        if tail:
+            def execute(frame):
+                proc = operator(frame)
+                if type(proc) is UserDefinedProcedure:  # Only user procedures can grow the stack
+                    return TailCall(proc, evaluate_operands(frame))
+                return proc.apply_tail(evaluate_operands(frame))
+            return execute
+        return lambda frame: operator(frame).apply(evaluate_operands(frame))
+
+    @staticmethod
+    def analyze_body(expression, scope, tail=True):
+        # Sequence of expressions returning the value of the last one
+        scope.scan_defines(expression)
+        sequence = []
+        e = expression
+        while e.cdr is not BuiltIns.NIL:
+            sequence.append(Analyzer.analyze(e.car, scope))
+            e = e.cdr
+        last = Analyzer.analyze(e.car, scope, tail)
+        if len(sequence) == 0:
+            return last
+
+        def execute(frame):
+            for exp in sequence:
+                exp(frame)
+            return last(frame)
+        return execute
+
+    @staticmethod
+    def analyze_lambda(name, parameters, expression, scope):
+        names = []
+        parameter = parameters
+        while parameter is not BuiltIns.NIL:
+            if type(parameter.car) is not Symbol:
+                raise Error.IllegalVariableNameException(parameter.car)
+            names.append(parameter.car)
+            parameter = parameter.cdr
+        names = tuple(names)
+        lambda_scope = Scope(scope, names)
+        body = Analyzer.analyze_body(expression, lambda_scope)
+        size = lambda_scope.size
+        kernel = Vectorizer.translate(names, expression, lambda_scope)
+        scope = scope.snapshot()
+        return lambda frame: UserDefinedProcedure(name=name, parameters=names, expression=expression,
+                                                  frame=frame, body=body, size=size, kernel=kernel, scope=scope)
+
+
+class Vectorizer:
+    """
+    Batched application of arithmetic procedures for MAP, FILTER and ACCUMULATE.
+
+    A procedure whose body is a single arithmetic or comparison form over its parameters and numeric constants is
+    translated at analysis time into a kernel: a tree of ('PARAM', index), ('CONST', number) and (operator, children)
+    nodes, evaluated over whole NumPy arrays at once. Kernels are only used while every operator's global cell still
+    holds the builtin, and are abandoned for the interpreted path when an integer result could leave int64 range, an
+    integer over 2**53 would be divided or compared with a float, or a divisor is zero, so results are the same either
+    way.
+    """
+    arithmetic = ('+', '-', '*', '/')
+    comparisons = ('<', '>', '=', 'NOT')
+
+    class Kernel:
+        __slots__ = ('tree', 'cells', 'nparams')
+
+        def __init__(self, tree, cells, nparams):
+            self.tree = tree
+            self.cells = cells  # Global cells of the operators used
+            self.nparams = nparams
+
+        def valid(self):
+            return all(cell.value is BuiltIns.globals[cell.symbol] for cell in self.cells)
+
+    @staticmethod
+    def translate(parameters, expression, scope):
+        if numpy is None or expression.cdr is not BuiltIns.NIL:
+            return None
+        cells = []
+        tree = Vectorizer.translate_node(expression.car, parameters, scope, cells)
+        if tree is None or tree[0] == 'PARAM' or tree[0] == 'CONST':
+            return None
+        return Vectorizer.Kernel(tree, cells, len(parameters))
+
+    @staticmethod
+    def translate_node(exp, parameters, scope, cells):
+        if type(exp) is int or type(exp) is float:
+            return 'CONST', exp
+        if type(exp) is Symbol:
+            return ('PARAM', parameters.index(exp)) if exp in parameters else None
+        if type(exp) is not Cons or type(exp.car) is not Symbol or scope.lookup(exp.car) is not None:
+            return None
+        op = exp.car.value
+        if op not in Vectorizer.arithmetic and op not in Vectorizer.comparisons:
+            return None
+        children = []
+        arg = exp.cdr
+        while arg is not BuiltIns.NIL:
+            child = Vectorizer.translate_node(arg.car, parameters, scope, cells)
+            if child is None:
+                return None
+            children.append(child)
+            arg = arg.cdr
+        # Operands must be numbers, except for NOT which takes a single comparison
+        if op == 'NOT':
+            if len(children) != 1 or children[0][0] not in Vectorizer.comparisons:
+                return None
+        elif any(child[0] in Vectorizer.comparisons for child in children):
+            return None
+        if len(children) == 0 and op not in ('+', '*'):
+            return None
+        cells.append(scope.env.cell(exp.car))
+        return op, tuple(children)
+
+    @staticmethod
+    def magnitude(column):
+        # Largest magnitude in an integer column; `None` for a float column
+        if column.dtype == float:
+            return None
+        return max(-int(column.min()), int(column.max())) if len(column) > 0 else 0
+
+    @staticmethod
+    def bound(node, bounds):
+        # Largest magnitude an integer node can take given the bounds of the integer columns; `None` if not integer
+        op, args = node
+        if op == 'PARAM':
+            return bounds[args]
+        if op == 'CONST':
+            result = abs(args) if type(args) is int else None
+        else:
+            children = [Vectorizer.bound(child, bounds) for child in args]
+            # NumPy divides integers, and compares them with floats, as float64, exact only up to 2**53
+            if ((op == '/' or op in Vectorizer.comparisons and None in children) and
+                    any(child is not None and child > 2 ** 53 for child in children)):
+                raise OverflowError
+            if op not in ('+', '-', '*') or None in children:
+                return None
+            result = math.prod(children) if op == '*' else sum(children)
+        if result is not None and result >= 2 ** 63:
+            raise OverflowError
+        return result
+
+    @staticmethod
+    def evaluate(node, columns):
+        op, args = node
+        if op == 'PARAM':
+            return columns[args]
+        if op == 'CONST':
+            return args
+        values = [Vectorizer.evaluate(child, columns) for child in args]
+        if op == '+':
+            return functools.reduce(numpy.add, values, 0)
+        if op == '*':
+            return functools.reduce(numpy.multiply, values, 1)
+        if op == '-':
+            return numpy.negative(values[0]) if len(values) == 1 else functools.reduce(numpy.subtract, values)
+        if op == '/':
+            if len(values) == 1:
+                values = [1.0, values[0]]
+            if any(numpy.any(numpy.equal(value, 0)) for value in values[1:]):
+                raise ZeroDivisionError
+            return functools.reduce(numpy.true_divide, values)
+        if op == 'NOT':
+            return numpy.logical_not(values[0])
+        if op == '=':
+            return functools.reduce(numpy.logical_and, [numpy.equal(values[0], value) for value in values[1:]], True)
+        compare = numpy.less if op == '<' else numpy.greater
+        return functools.reduce(numpy.logical_and, [compare(a, b) for a, b in zip(values, values[1:])], True)
+
+    @staticmethod
+    def apply(proc, vectors):
+        # Applies `proc` elementwise to numeric vectors in one batched call; `None` if it must be interpreted instead
+        kernel = proc.kernel
+        if (kernel is None or kernel.nparams != len(vectors) or not all(vector.numeric() for vector in vectors) or
+                not kernel.valid()):
+            return None
+        columns = [vector.value for vector in vectors]
+        try:
+            Vectorizer.bound(kernel.tree, [Vectorizer.magnitude(column) for column in columns])
+            with numpy.errstate(all='ignore'):
+                result = Vectorizer.evaluate(kernel.tree, columns)
+        except (OverflowError, ZeroDivisionError):
+            return None
+        if numpy.ndim(result) == 0:
+            result = numpy.full(len(columns[0]), result)
+        return result
+
+    @staticmethod
+    def fold(op, initial, vector):
+        # Right fold of `+` or `*` over a numeric vector in one call, rounding as the interpreted fold does; or `None`
+        if not vector.numeric() or not (type(initial) is int or type(initial) is float):
+            return None
+        if op is BuiltIns.globals[Symbol('+')] or op is BuiltIns.globals[Symbol('*')]:
+            operator = op.name
+        elif (op.kernel is not None and op.kernel.nparams == 2 and op.kernel.tree[0] in ('+', '*') and
+              sorted(op.kernel.tree[1]) == [('PARAM', 0), ('PARAM', 1)] and op.kernel.valid()):
+            operator = op.kernel.tree[0]
+        else:
+            return None
+        if type(initial) is int and not -2 ** 63 <= initial < 2 ** 63:  # Else an array of Python objects
+            return None
+        column = vector.value
+        bound = Vectorizer.magnitude(column)
+        if bound is not None and type(initial) is int:
+            if operator == '+':
+                if len(column) * bound + abs(initial) >= 2 ** 63:
+                    return None
+            elif len(column) * bound.bit_length() + abs(initial).bit_length() >= 63:
+                return None
+        values = numpy.concatenate((numpy.array([initial]), column[::-1]))
+        # `accumulate` adds one element at a time, unlike the pairwise summation of `numpy.sum`
+        ufunc = numpy.add if operator == '+' else numpy.multiply
+        with numpy.errstate(all='ignore'):
+            return ufunc.accumulate(values)[-1].item()
+
+    @staticmethod
+    def vector(sequence):
+        # A list or vector as a vector
+        if type(sequence) is BuiltIns.Vector:
+            return sequence
+        items = []
+        while sequence is not BuiltIns.NIL:
+            items.append(sequence.car)
+            sequence = sequence.cdr
+        return BuiltIns.Vector(items)
+
+    @staticmethod
+    def sequence(items, like):
+        # Array or list of items as a sequence of the same type as `like`
+        if numpy is not None and type(items) is numpy.ndarray:
+            if items.dtype == bool:
+                items = [BuiltIns.T if item else BuiltIns.NIL for item in items.tolist()]
+            elif type(like) is BuiltIns.Vector:
+                return BuiltIns.Vector(items)
+            else:
+                items = items.tolist()
+        if type(like) is BuiltIns.Vector:
+            return BuiltIns.Vector(items)
+        result = BuiltIns.NIL
+        for i in range(len(items) - 1, -1, -1):
+            result = Cons(items[i], result)
+        return result
+
+
+class Opcode:
+    CONST = 0  # CONST index: push constants[index]
+    LOAD_LOCAL = 1  # LOAD_LOCAL slot: push frame[slot]
+    LOAD_DEREF = 2  # LOAD_DEREF depth slot: push the slot of the frame `depth` parents up
+    LOAD_GLOBAL = 3  # LOAD_GLOBAL index: push the value of the global cell constants[index]
+    STORE_LOCAL = 4  # STORE_LOCAL slot: pop into frame[slot]
+    DEFINE_GLOBAL = 5  # DEFINE_GLOBAL index: pop into the global cell constants[index], push its name
+    POP = 6
+    JUMP = 7  # JUMP target
+    JUMP_IF_FALSE = 8  # JUMP_IF_FALSE target: pop and jump unless it is `T`
+    CALL = 9  # CALL n: pop n arguments and the procedure, push the result
+    TAIL_CALL = 10  # TAIL_CALL n: as CALL, returning the result and replacing the current frame
+    RETURN = 11
+    MAKE_CLOSURE = 12  # MAKE_CLOSURE index: push a procedure for the code object constants[index]
+    MEMO_RETURN = 13  # Return through a memoized application, storing the value in the cache constants[0] by key[1]
+
+
+class Compiler:
+    """
+    Compiles parsed forms into `VirtualMachine.Code` for the bytecode engine.
+
+    Variables are resolved by a `Scope` to frame slots or global cells, as by the `Analyzer`.
+    `tail` marks code in return position, which ends in `RETURN` or `TAIL_CALL`.
+    """
+    @staticmethod
+    def compile(exp, env):
+        scope = Scope(None, (), env)
+        code = VirtualMachine.Code('TOPLEVEL', 0)
+        Compiler.compile_expression(exp, code, scope, True)
+        code.size = scope.size
+        return code
+
+    @staticmethod
+    def compile_expression(exp, code, scope, tail):
+        if type(exp) is Symbol:
+            address = scope.lookup(exp)
+            if address is None:
+                code.emit(Opcode.LOAD_GLOBAL, code.constant(scope.env.cell(exp)))
+            elif address[0] == 0:
+                code.emit(Opcode.LOAD_LOCAL, address[1])
+            else:
+                code.emit(Opcode.LOAD_DEREF, address[0], address[1])
+        elif type(exp) is Cons:
+            if type(exp.car) is Symbol:
+                form = BuiltIns.globals.get(exp.car)
+                if isinstance(form, SpecialForm):
+                    if exp.car not in Compiler.special_forms:
+                        raise Error.IllegalFunctionCallException(form)
+                    Compiler.special_forms[exp.car](form, exp.cdr, code, scope, tail)
+                    return
+            Compiler.compile_expression(exp.car, code, scope, False)
+            n = 0
+            arg = exp.cdr
+            while arg is not BuiltIns.NIL:
+                Compiler.compile_expression(arg.car, code, scope, False)
+                arg = arg.cdr
+                n += 1
+            code.emit(Opcode.TAIL_CALL if tail else Opcode.CALL, n)
+            return
+        else:
+            code.emit(Opcode.CONST, code.constant(exp))
+        if tail:
+            code.emit(Opcode.RETURN)
+
+    @staticmethod
+    def compile_body(expression, code, scope, tail):
+        scope.scan_defines(expression)
+        while expression.cdr is not BuiltIns.NIL:
+            Compiler.compile_expression(expression.car, code, scope, False)
+            code.emit(Opcode.POP)
+            expression = expression.cdr
+        Compiler.compile_expression(expression.car, code, scope, tail)
+
+    @staticmethod
+    def compile_lambda(name, parameters, expression, code, scope):
+        names = []
+        parameter = parameters
+        while parameter is not BuiltIns.NIL:
+            if type(parameter.car) is not Symbol:
+                raise Error.IllegalVariableNameException(parameter.car)
+            names.append(parameter.car)
+            parameter = parameter.cdr
+        lambda_scope = Scope(scope, names)
+        lambda_code = VirtualMachine.Code(name, len(names))
+        Compiler.compile_body(expression, lambda_code, lambda_scope, True)
+        lambda_code.size = lambda_scope.size
+        lambda_code.kernel = Vectorizer.translate(names, expression, lambda_scope)
+        code.emit(Opcode.MAKE_CLOSURE, code.constant(lambda_code))
+
+    @staticmethod
+    def compile_if(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is BuiltIns.NIL or  # 1 arg
+                args.cdr.cdr is BuiltIns.NIL or  # 2 args
+                args.cdr.cdr.cdr is not BuiltIns.NIL):  # > 3 args
+            raise Error.InvalidNOFArgumentsException(form)
+        Compiler.compile_expression(args.car, code, scope, False)
+        code.emit(Opcode.JUMP_IF_FALSE, None)
+        alternative_jump = len(code.instructions) - 1
+        Compiler.compile_expression(args.cdr.car, code, scope, tail)
+        if not tail:
+            code.emit(Opcode.JUMP, None)
+            end_jump = len(code.instructions) - 1
+        code.instructions[alternative_jump] = len(code.instructions)
+        Compiler.compile_expression(args.cdr.cdr.car, code, scope, tail)
+        if not tail:
+            code.instructions[end_jump] = len(code.instructions)
+
+    @staticmethod
+    def compile_cond(form, args, code, scope, tail):
+        end_jumps = []
+        arg = args
+        while arg is not BuiltIns.NIL:
+            Compiler.compile_expression(arg.car.car, code, scope, False)
+            code.emit(Opcode.JUMP_IF_FALSE, None)
+            next_jump = len(code.instructions) - 1
+            Compiler.compile_expression(arg.car.cdr.car, code, scope, tail)
+            if not tail:
+                code.emit(Opcode.JUMP, None)
+                end_jumps.append(len(code.instructions) - 1)
+            code.instructions[next_jump] = len(code.instructions)
+            arg = arg.cdr
+        Compiler.compile_expression(BuiltIns.NIL, code, scope, tail)
+        for jump in end_jumps:
+            code.instructions[jump] = len(code.instructions)
+
+    @staticmethod
+    def compile_quote(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is not BuiltIns.NIL):  # > 1 arg
+            raise Error.InvalidNOFArgumentsException(form)
+        code.emit(Opcode.CONST, code.constant(args.car))
+        if tail:
+            code.emit(Opcode.RETURN)
+
+    @staticmethod
+    def compile_define(form, args, code, scope, tail):
+        name = Compiler.compile_define_value(form, args, code, scope)
+        Compiler.compile_define_binding(name, code, scope, tail)
+
+    @staticmethod
+    def compile_define_memoized(form, args, code, scope, tail):
+        if args is BuiltIns.NIL or type(args.car) is not Cons:
+            raise Error.IllegalProcedureNameException(form)
+        code.emit(Opcode.CONST, code.constant(BuiltIns.globals[Symbol('MEMOIZE')]))
+        name = Compiler.compile_define_value(form, args, code, scope)
+        code.emit(Opcode.CALL, 1)
+        Compiler.compile_define_binding(name, code, scope, tail)
+
+    @staticmethod
+    def compile_define_value(form, args, code, scope):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.car is BuiltIns.NIL or  # No Designator Names (FuncName + Parameters / VarName)
+                args.cdr is BuiltIns.NIL):  # No Func Def
+            raise Error.InvalidNOFArgumentsException(form)
+        if type(args.car) is Symbol:  # Def var
+            if args.cdr.cdr is not BuiltIns.NIL:  # > 2 args
+                raise Error.InvalidNOFArgumentsException(form)
+            Compiler.compile_expression(args.cdr.car, code, scope, False)
+            return args.car
+        # Def func
+        name = args.car.car
+        if type(name) is not Symbol:
+            raise Error.IllegalVariableNameException(name)
+        Compiler.compile_lambda(name, args.car.cdr, args.cdr, code, scope)
+        return name
+
+    @staticmethod
+    def compile_define_binding(name, code, scope, tail):
+        if scope.toplevel:
+            code.emit(Opcode.DEFINE_GLOBAL, code.constant(scope.env.cell(name)))
+        else:
+            code.emit(Opcode.STORE_LOCAL, scope.local_slot(name), Opcode.CONST, code.constant(name))
+        if tail:
+            code.emit(Opcode.RETURN)
+
+    @staticmethod
+    def compile_lambda_form(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is BuiltIns.NIL):  # 1 arg
+            raise Error.InvalidNOFArgumentsException(form)
+        Compiler.compile_lambda('LAMBDA', args.car, args.cdr, code, scope)
+        if tail:
+            code.emit(Opcode.RETURN)
+
+    @staticmethod
+    def compile_delay(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is not BuiltIns.NIL):  # > 1 arg
+            raise Error.InvalidNOFArgumentsException(form)
+        code.emit(Opcode.CONST, code.constant(Compiler.promise))
+        Compiler.compile_lambda('DELAY', BuiltIns.NIL, args, code, scope)
+        code.emit(Opcode.TAIL_CALL if tail else Opcode.CALL, 1)
+
+    @staticmethod
+    def compile_cons_stream(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is BuiltIns.NIL or  # 1 arg
+                args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+            raise Error.InvalidNOFArgumentsException(form)
+        code.emit(Opcode.CONST, code.constant(BuiltIns.globals[Symbol('CONS')]))
+        Compiler.compile_expression(args.car, code, scope, False)
+        Compiler.compile_delay(form, args.cdr, code, scope, False)
+        code.emit(Opcode.TAIL_CALL if tail else Opcode.CALL, 2)
+
+    @staticmethod
+    def compile_profile(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is not BuiltIns.NIL and args.cdr.cdr is not BuiltIns.NIL):  # > 2 args
+            raise Error.InvalidNOFArgumentsException(form)
+        code.emit(Opcode.CONST, code.constant(form.proc))
+        Compiler.compile_lambda('PROFILE', BuiltIns.NIL, Cons(args.car, BuiltIns.NIL), code, scope)
+        if args.cdr is not BuiltIns.NIL:
+            Compiler.compile_expression(args.cdr.car, code, scope, False)
+        code.emit(Opcode.TAIL_CALL if tail else Opcode.CALL, 2 if args.cdr is not BuiltIns.NIL else 1)
+
+    @staticmethod
+    def compile_environment_form(form, args, code, scope, tail):
+        form.check(scope.env)
+        code.emit(Opcode.CONST, code.constant(form.proc))
+        code.emit(Opcode.CONST, code.constant(scope.env))
+        n = 1
+        while args is not BuiltIns.NIL:
+            Compiler.compile_expression(args.car, code, scope, False)
+            args = args.cdr
+            n += 1
+        code.emit(Opcode.TAIL_CALL if tail else Opcode.CALL, n)
+
+    @staticmethod
+    def compile_let(form, args, code, scope, tail):
+        if (args is BuiltIns.NIL or  # 0 args
+                args.cdr is BuiltIns.NIL):  # 1 arg
+            raise Error.InvalidNOFArgumentsException(form)
+        names = []
+        assignment = args.car
+        while assignment is not BuiltIns.NIL:
+            if (assignment.car is BuiltIns.NIL or  # 0 args
+                    assignment.car.cdr is BuiltIns.NIL or  # 1 arg
+                    assignment.car.cdr.cdr is not BuiltIns.NIL):  # > 2 arg
+                raise Error.InvalidNOFArgumentsException(assignment)
+            if type(assignment.car.car) is not Symbol:
+                raise Error.IllegalVariableNameException(assignment.car.car)
+            names.append(assignment.car.car)
+            Compiler.compile_expression(assignment.car.cdr.car, code, scope, False)
+            assignment = assignment.cdr
+        with scope.block(names) as slots:
+            for slot in reversed(slots):
+                code.emit(Opcode.STORE_LOCAL, slot)
+            Compiler.compile_body(args.cdr, code, scope, tail)
+
+    special_forms = {
+        Symbol('IF'): compile_if,
+        Symbol('COND'): compile_cond,
+        Symbol('QUOTE'): compile_quote,
+        Symbol('DEFINE'): compile_define,
+        Symbol('DEFINE-MEMOIZED'): compile_define_memoized,
+        Symbol('LAMBDA'): compile_lambda_form,
+        Symbol('LET'): compile_let,
+        Symbol('DELAY'): compile_delay,
+        Symbol('CONS-STREAM'): compile_cons_stream,
+        Symbol('SAVE-IMAGE'): compile_environment_form,
+        Symbol('LOAD-IMAGE'): compile_environment_form,
+        Symbol('PMAP'): compile_environment_form,
+        Symbol('PARALLEL-FOR-EACH'): compile_environment_form,
+        Symbol('PROFILE'): compile_profile,
+    }
+    promise = BuiltIns.BuiltInProcs.PromiseProc()
+
+
+class VirtualMachine:
+    class Code:
+        def __init__(self, name, nparams):
+            self.name = name
+            self.nparams = nparams
+            self.size = 0  # Number of frame slots, including the parent frame in slot 0
+            self.instructions = []
+            self.constants = []
+            self.kernel = None  # See `Vectorizer`
+
+        def emit(self, *instructions):
+            self.instructions.extend(instructions)
+
+        def constant(self, value):
+            for i, constant in enumerate(self.constants):
+                if constant is value:
+                    return i
+            self.constants.append(value)
+            return len(self.constants) - 1
+
+    class Closure(Procedure):
+        __slots__ = ('code', 'frame')
+
+        def __init__(self, code, frame):
+            super().__init__(code.name)
+            self.code = code
+            self.frame = frame  # Frame the procedure was created in
+
+        @property
+        def kernel(self):
+            return self.code.kernel
+
+        def apply(self, args):
+            if len(args) != self.code.nparams:
+                raise Error.InvalidNOFArgumentsException(self)
+            frame = [self.frame, *args]
+            frame.extend([None] * (self.code.size - len(frame)))
+            return VirtualMachine.execute(self.code, frame)
+
+    class Suspension(Exception):
+        # Raised by a procedure to suspend the task applying it, see `Scheduler`
+        def __init__(self, proc, park):
+            super().__init__(proc)
+            self.proc = proc
+            self.park = park
+
+    returning = [Opcode.RETURN]  # Instructions resuming a task suspended by a call in tail position
+    memoizing = [Opcode.MEMO_RETURN]  # Instructions returned to by a memoized closure, see `MemoizedProcedure`
+
+    @staticmethod
+    def execute(code, frame=None, task=None):
+        # Calls between closures are kept on `calls` rather than the Python stack
+        # With `task`, runs from its saved state, and saves the state again if the task is suspended
+        CONST, LOAD_LOCAL, LOAD_DEREF, LOAD_GLOBAL = Opcode.CONST, Opcode.LOAD_LOCAL, Opcode.LOAD_DEREF, \
+            Opcode.LOAD_GLOBAL
+        STORE_LOCAL, DEFINE_GLOBAL, POP, JUMP, JUMP_IF_FALSE = Opcode.STORE_LOCAL, Opcode.DEFINE_GLOBAL, \
+            Opcode.POP, Opcode.JUMP, Opcode.JUMP_IF_FALSE
+        CALL, TAIL_CALL, RETURN, MAKE_CLOSURE = Opcode.CALL, Opcode.TAIL_CALL, Opcode.RETURN, Opcode.MAKE_CLOSURE
+        MEMO_RETURN = Opcode.MEMO_RETURN
+        closure = VirtualMachine.Closure
+        memoized = MemoizedProcedure
+        t = BuiltIns.T
+
+        if task is not None:
+            instructions, constants, pc, frame, stack, calls = task.state
+            task.state = None
+        else:
+            instructions = code.instructions
+            constants = code.constants
+            if frame is None:
+                frame = [None] * code.size
+            stack = []
+            calls = []
+            pc = 0
+        # Tasks are not profiled, as their applications would be interleaved on the profiler's stack
+        profiler = Profiler.current.get() if profiling and task is None else None
+        if profiler is not None:
+            profiler.enter(code.name)
+        op = proc = None
+        try:
+            while True:
+                op = instructions[pc]
+                if op == LOAD_LOCAL:
+                    stack.append(frame[instructions[pc + 1]])
+                    pc += 2
+                elif op == LOAD_GLOBAL:
+                    cell = constants[instructions[pc + 1]]
+                    if cell.value is None:
+                        raise Error.UndefinedVariableException(cell.symbol)
+                    stack.append(cell.value)
+                    pc += 2
+                elif op == CONST:
+                    stack.append(constants[instructions[pc + 1]])
+                    pc += 2
+                elif op == JUMP_IF_FALSE:
+                    if stack.pop() is t:
+                        pc += 2
+                    else:
+                        pc = instructions[pc + 1]
+                elif op == CALL or op == TAIL_CALL:
+                    n = instructions[pc + 1]
+                    args = stack[len(stack) - n:]
+                    del stack[len(stack) - n:]
+                    proc = stack.pop()
+                    if type(proc) is closure:
+                        if n != proc.code.nparams:
+                            raise Error.InvalidNOFArgumentsException(proc)
+                        if op == CALL:
+                            calls.append((instructions, constants, pc + 2, frame))
+                        if profiler is not None:
+                            if op == TAIL_CALL:
+                                profiler.exit()  # The application being replaced
+                            profiler.enter(proc.name)
+                        frame = [proc.frame, *args]
+                        if proc.code.size > n + 1:
+                            frame.extend([None] * (proc.code.size - n - 1))
+                        instructions = proc.code.instructions
+                        constants = proc.code.constants
+                        pc = 0
+                    elif type(proc) is memoized and type(proc.proc) is closure:
+                        # Called as the closure on a miss, returning through `memoizing` to fill the cache
+                        key = memoized.arguments_key(args)
+                        value = proc.get(key)
+                        if value is None:
+                            if n != proc.proc.code.nparams:
+                                raise Error.InvalidNOFArgumentsException(proc)
+                            if op == CALL:
+                                calls.append((instructions, constants, pc + 2, frame))
+                            calls.append((VirtualMachine.memoizing, (proc, key), 0, None))
+                            proc = proc.proc
+                            if profiler is not None:
+                                if op == TAIL_CALL:
+                                    profiler.exit()
+                                profiler.enter(proc.name)
+                            frame = [proc.frame, *args]
+                            if proc.code.size > n + 1:
+                                frame.extend([None] * (proc.code.size - n - 1))
+                            instructions = proc.code.instructions
+                            constants = proc.code.constants
+                            pc = 0
+                        elif op == CALL:
+                            stack.append(value)
+                            pc += 2
+                        else:
+                            stack.append(value)
+                            if profiler is not None:
+                                profiler.exit()
+                            if len(calls) == 0:
+                                return stack.pop()
+                            instructions, constants, pc, frame = calls.pop()
+                    elif op == CALL:
+                        stack.append(proc.apply(args))
+                        pc += 2
+                    else:
+                        stack.append(proc.apply(args))
+                        if profiler is not None:
+                            profiler.exit()
+                        if len(calls) == 0:
+                            return stack.pop()
+                        instructions, constants, pc, frame = calls.pop()
+                elif op == RETURN:
+                    # The value is left on the stack for the caller, so no local variable keeps it alive
+                    if profiler is not None:
+                        profiler.exit()
+                    if len(calls) == 0:
+                        return stack.pop()
+                    instructions, constants, pc, frame = calls.pop()
+                elif op == LOAD_DEREF:
+                    target = frame
+                    for _ in range(instructions[pc + 1]):
+                        target = target[0]
+                    stack.append(target[instructions[pc + 2]])
+                    pc += 3
+                elif op == STORE_LOCAL:
+                    frame[instructions[pc + 1]] = stack.pop()
+                    pc += 2
+                elif op == POP:
+                    stack.pop()
+                    pc += 1
+                elif op == JUMP:
+                    pc = instructions[pc + 1]
+                elif op == MAKE_CLOSURE:
+                    stack.append(closure(constants[instructions[pc + 1]], frame))
+                    pc += 2
+                elif op == DEFINE_GLOBAL:
+                    cell = constants[instructions[pc + 1]]
+                    cell.value = stack.pop()
+                    stack.append(cell.symbol)
+                    pc += 2
+                elif op == MEMO_RETURN:
+                    constants[0].store(constants[1], stack[-1])
+                    if len(calls) == 0:
+                        return stack.pop()
+                    instructions, constants, pc, frame = calls.pop()
+                else:
+                    raise Exception('Undefined Opcode:', op)
+        except VirtualMachine.Suspension as suspension:
+            # Only a procedure applied by this code may suspend it, rather than one applied by a builtin it applied
+            if task is None or suspension.proc is not proc or (op != CALL and op != TAIL_CALL):
+                raise Error.IllegalSuspensionException(suspension.proc) from None
+            # The state is saved as it will be after the call, whose value the scheduler pushes on `stack`
+            if op == CALL:
+                pc += 2
+            elif len(calls) == 0:
+                instructions, constants, pc = VirtualMachine.returning, (), 0
+            else:
+                instructions, constants, pc, frame = calls.pop()
+            task.state = instructions, constants, pc, frame, stack, calls
+            task.park = suspension.park
+
+
+class Scheduler:
+    """
+    Green threads: Lisp tasks (SPAWN) interleaved on an asyncio event loop.
+
+    Code compiled for the `VirtualMachine` keeps its calls on the machine's own stacks, so a task is suspended by saving
+    them. YIELD, JOIN of a running task, CHANNEL-GET of an empty channel and AWAIT of a host awaitable suspend the task
+    applying them; it is resumed later with the value of that application. A waiting task costs its stacks and frames
+    rather than a Python stack or thread. Procedures of the 'analyze' engine can be tasks too, but run to completion.
+
+    A task waits for as long as it takes, since the host may still put to a channel or spawn another task: the host
+    bounds a wait with `asyncio.wait_for`, and a task the host stops waiting for is dropped.
+    """
+    current = contextvars.ContextVar('scheduler', default=None)  # Scheduler of the task being run
+    batch = 64  # Tasks run between turns of the event loop
+
+    def __init__(self, output=None):
+        self.ready = collections.deque()
+        self.tasks = set()  # Tasks not done
+        self.output = output  # File object DISPLAY writes to in the tasks; `None` for that of the caller's context
+        self.wakeup = None  # Event set when there is something for `run` to do
+        self.runner = None  # asyncio task of `run`, while there are tasks
+
+    def spawn(self, proc, args=()):
+        # Must be called on the event loop
+        task = BuiltIns.Task(self, proc, list(args))
+        if type(proc) is VirtualMachine.Closure:
+            if len(args) != proc.code.nparams:
+                raise Error.InvalidNOFArgumentsException(proc)
+            frame = [proc.frame, *args]
+            frame.extend([None] * (proc.code.size - len(frame)))
+            task.state = proc.code.instructions, proc.code.constants, 0, frame, [], []
+        self.tasks.add(task)
+        self.ready.append(task)
+        if self.runner is not None:
+            self.wakeup.set()
+        else:
+            import asyncio  # Imported here so that importing the interpreter stays cheap
+            self.wakeup = asyncio.Event()
+            self.runner = asyncio.get_running_loop().create_task(self.run())
+        return task
+
+    def join(self, task):
+        # Future of the value of `task`, for the host
+        if task.future is None:
+            import asyncio
+            task.future = asyncio.get_running_loop().create_future()
+            if task.done:
+                Scheduler.settle(task)
+            else:
+                task.future.add_done_callback(lambda future: self.drop(task) if future.cancelled() else None)
+        return task.future
+
+    def drop(self, task):
+        # Ends a task the host stopped waiting for, wherever it is waiting
+        if not task.done:
+            import asyncio
+            self.ready = collections.deque(ready for ready in self.ready if ready is not task)
+            self.finish(task, error=asyncio.CancelledError())
+
+    async def run(self):
+        import asyncio
+        Scheduler.current.set(self)  # In the context of this asyncio task only
+        if self.output is not None:
+            BuiltIns.output.set(self.output)
+        try:
+            while len(self.tasks) > 0:
+                for _ in range(min(len(self.ready), Scheduler.batch)):
+                    self.step(self.ready.popleft())
+                if len(self.ready) > 0:
+                    await asyncio.sleep(0)
+                else:  # Until a task is resumed or spawned
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+        finally:
+            self.runner = None
+
+    def step(self, task):
+        try:
+            if task.state is None:
+                value = task.proc.apply(task.args)
+            else:
+                value = VirtualMachine.execute(None, None, task)
+                if task.park is not None:
+                    park = task.park
+                    task.park = None
+                    park(self, task)
+                    return
+        except VirtualMachine.Suspension as suspension:  # From a procedure that is not compiled
+            self.finish(task, error=Error.IllegalSuspensionException(suspension.proc))
+        except Exception as e:
+            self.finish(task, error=e)
+        else:
+            self.finish(task, value)
+
+    def resume(self, task, value):
+        task.state[4].append(value)  # On the stack, as the value of the application that suspended the task
+        self.ready.append(task)
+        self.wakeup.set()
+
+    def wait(self, task, awaitable):
+        import asyncio
+        future = asyncio.ensure_future(awaitable)
+
+        def done(future):
+            if task.done:  # Dropped while waiting
+                return
+            if future.cancelled():
+                self.finish(task, error=asyncio.CancelledError())
+            elif future.exception() is not None:
+                self.finish(task, error=future.exception())
+            else:
+                self.resume(task, future.result())
+        future.add_done_callback(done)
+
+    def finish(self, task, value=None, error=None):
+        task.done = True
+        task.value = value
+        task.error = error
+        task.state = None
+        self.tasks.discard(task)
+        for waiter in task.waiters:
+            if not waiter.done:
+                if error is None:
+                    self.resume(waiter, value)
+                else:
+                    self.finish(waiter, error=error)
+        task.waiters = []
+        if task.future is not None:
+            Scheduler.settle(task)
+        self.wakeup.set()
+
+    @staticmethod
+    def settle(task):
+        if not task.future.done():
+            if task.error is None:
+                task.future.set_result(task.value)
+            else:
+                task.future.set_exception(task.error)
+
+
+class Profiler:
+    """
+    Deterministic profile of the procedures applied by a program: for each name, the number of applications and the
+    time spent in them inclusive and exclusive of the procedures they applied. With `memory`, also the memory blocks
+    still allocated when they return (`sys.getallocatedblocks`), likewise, at about twice the cost per application.
+    Retained blocks are not the blocks allocated: memory freed before a procedure returns is not counted, and an
+    application freeing more than it allocates counts as retaining none. The code of the program itself, TOPLEVEL and
+    the thunk of PROFILE, is left out of the stats.
+
+    Builtins are recorded by wrapping their classes' `apply` only while some profiler runs, so a program run without
+    one pays nothing for them. Procedures defined by the program record themselves, in
+    `UserDefinedProcedure.apply_tail` and in the `VirtualMachine`, once the module's `profiling` flag is set. A tail
+    call ends the application it replaces, as it does on the stack, and time spent in a procedure applied recursively
+    is counted once in its inclusive time.
+    """
+    current = contextvars.ContextVar('profiler', default=None)  # Profiler of the program being run
+    lock = threading.Lock()
+    active = 0  # Profilers running
+    wrapped = {}  # (class, attribute) -> [function wrapped, or `None` if inherited; profilers running that wrap it]
+    hidden = ('TOPLEVEL', 'PROFILE')  # Names of the code compiled for a form and of the thunk of PROFILE
+
+    def __init__(self, memory=False):
+        # name -> [calls, inclusive time, exclusive time, retained blocks, exclusive retained blocks,
+        #         applications on `stack`]; exclusive retained blocks may be negative, see `report`
+        self.stats = {}
+        self.stack = []  # [stats of the name, start time, blocks at start, time in callees, blocks in callees]
+        self.memory = memory
+        if memory:
+            self.enter = self.enter_counting
+            self.exit = self.exit_counting
+
+    def enter(self, name):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0.0, 0.0, 0, 0, 0]
+        stat[5] += 1
+        self.stack.append([stat, time.perf_counter(), 0, 0.0, 0])
+
+    def exit(self):
+        end = time.perf_counter()
+        stat, start, _, callee_time, _ = self.stack.pop()
+        elapsed = end - start
+        stat[0] += 1
+        stat[2] += elapsed - callee_time
+        stat[5] -= 1
+        if stat[5] == 0:  # Outermost application of the name
+            stat[1] += elapsed
+        if self.stack:
+            self.stack[-1][3] += elapsed
+
+    def enter_counting(self, name):
+        # `enter`, counting retained blocks
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0.0, 0.0, 0, 0, 0]
+        stat[5] += 1
+        record = [stat, 0.0, 0, 0.0, 0]
+        self.stack.append(record)
+        # Read last and first in `exit_counting`, so that the profiler's own objects are not counted
+        record[1] = time.perf_counter()
+        record[2] = sys.getallocatedblocks() + 1  # Counting the int returned
+
+    def exit_counting(self):
+        blocks = sys.getallocatedblocks()
+        end = time.perf_counter()
+        stat, start, start_blocks, callee_time, callee_blocks = self.stack.pop()
+        elapsed = end - start
+        allocated = max(blocks - start_blocks, 0)
+        stat[0] += 1
+        stat[2] += elapsed - callee_time
+        # Not clamped per application, so that the exclusive blocks of a name add up to at most its inclusive ones
+        stat[4] += allocated - callee_blocks
+        stat[5] -= 1
+        if stat[5] == 0:  # Outermost application of the name
+            stat[1] += elapsed
+            stat[3] += allocated
+        if self.stack:
+            caller = self.stack[-1]
+            caller[3] += elapsed
+            caller[4] += allocated
+
+    def unwind(self, depth):
+        # Ends the applications above `depth`, including those left by an exception
+        while len(self.stack) > depth:
+            self.exit()
+
+    def run(self, thunk):
+        token = Profiler.current.set(self)
+        depth = len(self.stack)
+        targets = self.targets()
+        Profiler.instrument(targets)
+        try:
+            return thunk()
+        finally:
+            self.unwind(depth)
+            Profiler.uninstrument(targets)
+            Profiler.current.reset(token)
+            for name in Profiler.hidden:
+                self.stats.pop(name, None)
+
+    def report(self, file=None, limit=None):
+        # Writes the stats sorted by exclusive time, at most `limit` rows
+        rows = sorted(self.stats.items(), key=lambda item: item[1][2], reverse=True)
+        if not self.memory:
+            print(f'{"calls":>10} {"inclusive":>10} {"exclusive":>10}  procedure', file=file)
+            for name, (calls, inclusive, exclusive, *_) in rows[:limit]:
+                print(f'{calls:>10} {inclusive:>10.6f} {exclusive:>10.6f}  {name}', file=file)
+            return
+        print(f'{"calls":>10} {"inclusive":>10} {"exclusive":>10} {"retained":>10} {"own retained":>12}  procedure',
+              file=file)
+        for name, (calls, inclusive, exclusive, blocks, own_blocks, _) in rows[:limit]:
+            # Blocks a procedure frees that its callees retained make its own count negative, reported as none
+            own_blocks = min(max(own_blocks, 0), blocks)
+            print(f'{calls:>10} {inclusive:>10.6f} {exclusive:>10.6f} {blocks:>10} {own_blocks:>12}  {name}', file=file)
+
+    @staticmethod
+    def wrap(cls, function):
+        # `function` recording the applications of instances of exactly `cls`, whose subclasses are wrapped themselves
+        def apply(self, args):
+            profiler = Profiler.current.get()
+            if profiler is None or type(self) is not cls:
+                return function(self, args)
+            depth = len(profiler.stack)
+            profiler.enter(self.name)
+            try:
+                return function(self, args)
+            finally:
+                if len(profiler.stack) > depth + 1:
+                    profiler.unwind(depth + 1)
+                profiler.exit()
+        return apply
+
+    def targets(self):
+        # Classes and attributes wrapped while the profiler runs
+        targets = []
+        for value in Image.builtins().values():
+            if isinstance(value, Procedure) and not isinstance(value, SpecialForm):
+                targets.append((type(value), 'apply'))
+        return list(dict.fromkeys(targets))
+
+    @staticmethod
+    def instrument(targets):
+        global profiling
+        with Profiler.lock:
+            Profiler.active += 1
+            profiling = True
+            for cls, attribute in targets:
+                wrapped = Profiler.wrapped.get((cls, attribute))
+                if wrapped is None:
+                    Profiler.wrapped[cls, attribute] = [cls.__dict__.get(attribute), 1]
+                    setattr(cls, attribute, Profiler.wrap(cls, getattr(cls, attribute)))
+                else:
+                    wrapped[1] += 1
+
+    @staticmethod
+    def uninstrument(targets):
+        global profiling
+        with Profiler.lock:
+            Profiler.active -= 1
+            profiling = Profiler.active > 0
+            for cls, attribute in targets:
+                wrapped = Profiler.wrapped[cls, attribute]
+                wrapped[1] -= 1
+                if wrapped[1] > 0:
+                    continue
+                del Profiler.wrapped[cls, attribute]
+                if wrapped[0] is None:
+                    delattr(cls, attribute)
+                else:
+                    setattr(cls, attribute, wrapped[0])
+
+
+class Sampler(Profiler):
+    """
+    Statistical profile of a long-running program: the procedures it defines are kept on a shadow stack of their
+    names while applied, which a background thread copies `rate` times a second, for a small cost per application
+    whatever the rate. `report` writes the stacks seen in the collapsed format of flame graph tools, one line per stack.
+
+    The thread only runs when the program releases the GIL, at least every `sys.getswitchinterval()` seconds, which
+    bounds the rate actually reached.
+    """
+    def __init__(self, rate=100):
+        super().__init__()
+        self.interval = 1 / rate
+        self.samples = collections.Counter()  # Tuple of names, outermost first -> times seen
+        self.stopped = threading.Event()
+        # Applications only push and pop their names
+        self.enter = self.stack.append
+        self.exit = self.stack.pop
+
+    def targets(self):
+        # Builtins are left out of the stacks, so that the many applications of arithmetic cost nothing
+        return []
+
+    def unwind(self, depth):
+        del self.stack[depth:]
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            stack = tuple(self.stack)
+            if stack:
+                self.samples[stack] += 1
+
+    def run(self, thunk):
+        self.stopped.clear()
+        thread = threading.Thread(target=self.sample, name='sampler', daemon=True)
+        thread.start()
+        try:
+            return super().run(thunk)
+        finally:
+            self.stopped.set()
+            thread.join()
+
+    def report(self, file=None, limit=None):
+        # Writes the `limit` stacks seen most, or all of them, as "OUTER;...;INNER count" lines
+        samples = collections.Counter()
+        for stack, count in self.samples.items():
+            names = tuple(str(name) for name in stack if name not in Profiler.hidden)
+            if names:
+                samples[names] += count
+        for stack, count in samples.most_common(limit):
+            print(f'{";".join(stack)} {count}', file=file)
 
 
 class Parser:
+    symbols = {}  # Spelling as read -> interned symbol, so each distinct spelling is converted once
+
+    # Whitespace and comments, then one token; numbers are told apart from symbols here rather than by conversion
+    tokens = re.compile(r'''
+        (?:\s+|;[^\n]*)*
+        (?:
+            (?P<open>\()
+            |(?P<close>\))
+            |(?P<quote>')
+            |(?P<string>"[^"]*"?)                              # Unterminated if the input ends before the closing `"`
+            |(?P<int>[+-]?\d+(?![^\s()';"]))
+            |(?P<float>[+-]?(?:\d+\.\d*|\.\d+|\d+(?=[eE]))(?:[eE][+-]?\d+)?(?![^\s()';"]))
+            |(?P<symbol>[^\s()';"]+)
+            |(?P<end>\Z)
+        )
+    ''', re.VERBOSE)
+
     class ConsBuilder:
         def __init__(self):
             """
-            root & tar cons for easy bookkeeping: what to return and what to add to, respectively
-            When adding, assert that `target.cdr` is `NIL`, then set `target.cdr` to `Cons(val, NIL)`
-
-            Note: trailing `NIL` is redacted from root reprs:
-
-            ToBeConsed: (1 2 3 4)
-            Root          |  Target
-            (1 (2))         (2 NIL)
-            (1 (2 3))       (3 NIL)
-            (1 (2 (3 4)))   (4 NIL)
+            The items read for each open list are collected in a Python list, and consed together into the list
+            only when its closing parenthesis is read.
 
             ToBeConsed: (1 (2 3) 4)
-            Root         |         Target
-            (1)                   (1 NIL)
-            (2 3)                 (3 NIL)
-            (1 (2 3))         ((2 3) NIL)
-            (1 ((2 3) 4))         (4 NIL)
+            Open lists                |  Built
+            [1]
+            [1] [2 3]
+            [1 (2 3)]                    (2 3)
+            [1 (2 3) 4]
+                                         (1 (2 3) 4)
+
+            A quote opens a list of its own, `[QUOTE]`, which closes itself once it has an item.
             """
-            self.cons_q = []
-            self.level = 0
-            self.quote_q = []
+            self.open_lists = []  # Items of each open list, innermost last
+            self.quotes = []  # Whether each open list is a quote
+            self.forms = []  # Completed top-level forms not yet taken by the parser
 
         def empty(self):
-            return len(self.cons_q) == 0
+            return len(self.open_lists) == 0
 
         def add(self, leaf):
-            if len(self.cons_q) == 0:  # Not in any list
+            if len(self.open_lists) == 0:  # Not in any list
                 return False
-            root_cons, tar_cons = self.cons_q[-1]
-            if tar_cons.car is None:  # (None . NIL)
-                # Should only be reached on 1st call immediately after `open_list`
-                tar_cons.car = leaf
-            else:  # (x . NIL)
-                assert tar_cons.cdr is BuiltIns.NIL
-                tar_cons.cdr = Cons(car=leaf, cdr=BuiltIns.NIL)  # (x . (leaf . NIL))
-                self.cons_q[-1] = root_cons, tar_cons.cdr
-                if len(self.quote_q) > 0 and self.level == self.quote_q[-1]:
-                    self.quote_q.pop()
-                    self.close_list()
+            items = self.open_lists[-1]
+            items.append(leaf)
+            if self.quotes[-1] and len(items) == 2:
+                self.close_list()
             return True
 
         def quote(self):
-            self.open_list()
-            self.add(Symbol('QUOTE'))
-            self.quote_q.append(self.level)
+            self.open_lists.append([Symbol('QUOTE')])
+            self.quotes.append(True)
 
         def open_list(self):
-            self.level += 1
-            cons = Cons(car=None, cdr=BuiltIns.NIL)
-            self.cons_q.append((cons, cons))
+            self.open_lists.append([])
+            self.quotes.append(False)
 
         def close_list(self):
-            self.level -= 1
-            cons, _ = self.cons_q.pop()
-            if cons.car is None:  # Empty list
-                cons = BuiltIns.NIL
-            if len(self.cons_q) == 0:
-                return cons
-            self.add(cons)
+            items = self.open_lists.pop()
+            self.quotes.pop()
+            cons = BuiltIns.NIL  # Empty list
+            for i in range(len(items) - 1, -1, -1):
+                cons = Cons(items[i], cons)
+            if len(self.open_lists) == 0:
+                self.forms.append(cons)
+            else:
+                self.add(cons)
 
         def clear(self):
-            self.cons_q.clear()
-            self.level = 0
-            self.quote_q.clear()
+            self.open_lists.clear()
+            self.quotes.clear()
+            self.forms.clear()
 
     def __init__(self):
         self.cons_builder = self.ConsBuilder()
-        self.result = []
-        self.symbol_build = ''
-        self.string_building = False
+        self.pending = ''  # Unfinished token at the end of the last chunk
 
     def parse(self, code: str) -> list:
         #  Returns list of Atoms/Cons to be evaluated
+        return list(self.iter_forms(io.StringIO(code)))
+
+    def iter_forms(self, stream, chunk_size=65536):
+        """
+        Yields the top-level forms read from a text file object, each as soon as it is complete, so that they can be
+        evaluated while the rest of the input is still being read. The input is read a line (of at most `chunk_size`
+        characters) at a time, which suits sockets as well as files, and only the form being read is held in memory.
+        """
         self.cons_builder.clear()
-        self.result.clear()
-        self.symbol_build = ''
-        self.string_building = False
-
-        # Case-insensitive names, comments begin w/ `;`
-        lines = list(map(lambda l: l if ';' not in l else l[:l.index(';')], code.strip().split('\n')))
-        for line in lines:
-            for char in line:
-                if char == '"':
-                    if not self.string_building:
-                        self.string_building = True
-                    else:
-                        self.exit_atom_build()
-                elif self.string_building:
-                    self.enter_atom_build(char)
-                    continue
-                elif char == ' ':
-                    self.exit_atom_build()
-                elif char == '(':
-                    self.exit_atom_build()
-                    self.cons_builder.open_list()
-                elif char == ')':
-                    self.exit_atom_build()
-                    try:
-                        returned_list = self.cons_builder.close_list()
-                    except IndexError:
-                        raise Error.UnmatchedParenthesesException()
-                    if returned_list is not None:
-                        self.result.append(returned_list)
-                elif char == '\'':
-                    self.cons_builder.quote()
-
-                else:
-                    self.enter_atom_build(char)
-        if self.string_building:
-            raise Error.UnmatchedQuotationException()
+        self.pending = ''
+        for chunk in iter(lambda: stream.readline(chunk_size), ''):
+            yield from self.feed(chunk)
+        yield from self.feed('', True)
         if not self.cons_builder.empty():
             raise Error.UnmatchedParenthesesException()
-        return self.result
 
-    def enter_atom_build(self, char):
-        self.symbol_build += char
-
-    def exit_atom_build(self):
-        if len(self.symbol_build) > 0:
-            if self.string_building:
-                atom = BuiltIns.String(self.symbol_build)
-                self.string_building = False
-            else:
+    def feed(self, chunk, final=False):
+        # Case-insensitive names, comments begin w/ `;` and run to the end of the line
+        text = self.pending + chunk
+        self.pending = ''
+        end = len(text)
+        builder = self.cons_builder
+        forms = builder.forms
+        open_lists = builder.open_lists
+        quotes = builder.quotes
+        for match in Parser.tokens.finditer(text):
+            kind = match.lastgroup
+            if kind == 'open':
+                open_lists.append([])
+                quotes.append(False)
+                continue
+            if kind == 'close':
                 try:
-                    atom = BuiltIns.Number(int(self.symbol_build))
-                except ValueError:
-                    try:
-                        atom = BuiltIns.Number(float(self.symbol_build))
-                    except ValueError:
-                        atom = Symbol(self.symbol_build.upper())
+                    builder.close_list()
+                except IndexError:
+                    raise Error.UnmatchedParenthesesException()
+                if len(forms) > 0:
+                    yield from forms
+                    forms.clear()
+                continue
+            if kind == 'end' or match.end() == end and not final:
+                # Left for the next chunk, which may continue a comment or atom
+                self.pending = text[match.start():]
+                return
+            token = match.group(kind)
+            if kind == 'symbol':
+                atom = Parser.symbols.get(token)
+                if atom is None:
+                    atom = Parser.symbols[token] = Symbol(token.upper())
+            elif kind == 'int':
+                atom = int(token)
+            elif kind == 'float':
+                atom = float(token)
+            elif kind == 'string':
+                if len(token) == 1 or token[-1] != '"':
+                    raise Error.UnmatchedQuotationException()
+                atom = BuiltIns.String(token[1:-1])
+            else:  # quote
+                builder.quote()
+                continue
+            if len(open_lists) > 0 and not quotes[-1]:  # Inlined `builder.add` for the common case
+                open_lists[-1].append(atom)
+                continue
             # If `atom` is outside list:
-            if not self.cons_builder.add(atom):
-                self.result.append(atom)
-            self.symbol_build = ''
+            if not builder.add(atom):
+                forms.append(atom)
+            if len(forms) > 0:
+                yield from forms
+                forms.clear()
+
+
+class ParseCache:
+    """
+    The forms read from a source file, kept in `__pycache__` beside it so that an unchanged file is not parsed again.
+
+    A cache file starts with a key made of the cache version, the `marshal` version, the byte order and the SHA-256 of
+    the source; a cache whose key does not match is ignored and rewritten. The forms follow as `marshal` data, flattened
+    so that loading them is a single pass without recursion:
+
+    (define (f x) x)  ->  constants (DEFINE F X), atoms [0 1 2 2], shape [-3 2 -1 3]
+
+    `atoms` are indices into `constants` (symbol names, strings as UTF-8 bytes, numbers) in the order read. In `shape`,
+    -n takes the next n atoms and n >= 0 replaces the last n items taken with the list of them.
+    """
+    version = 1  # Of the reader and of the format above; bumping it invalidates existing caches
+
+    @staticmethod
+    def path(source):
+        directory, name = os.path.split(source)
+        return os.path.join(directory, '__pycache__', f'{name}.scheme-pylisp.cache')
+
+    @staticmethod
+    def key(data):
+        import hashlib  # Imported here, as are array and pickle, so that importing the interpreter stays cheap
+        return f'{ParseCache.version}:{marshal.version}:{sys.byteorder}:'.encode() + hashlib.sha256(data).digest()
+
+    @staticmethod
+    def read(source):
+        # Returns the forms of the file at `source`, from its cache if there is a valid one
+        with open(source, 'rb') as f:
+            data = f.read()
+        key = ParseCache.key(data)
+        path = ParseCache.path(source)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(key)) == key:
+                    return ParseCache.decode(*marshal.load(f))
+        except (OSError, EOFError, ValueError, TypeError):  # Missing or damaged cache
+            pass
+        forms = Parser().parse(data.decode('utf-8'))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f'{path}.{os.getpid()}'
+            with open(temporary, 'wb') as f:
+                f.write(key)
+                marshal.dump(ParseCache.encode(forms), f)
+            os.replace(temporary, path)  # Readers never see a partly written cache
+        except OSError:  # An unwritable directory just goes without a cache
+            pass
+        return forms
+
+    @staticmethod
+    def pack(values):
+        # Smallest array of signed ints that holds `values`
+        import array
+        for typecode in 'bhiq':
+            try:
+                return typecode, array.array(typecode, values).tobytes()
+            except OverflowError:
+                pass
+
+    @staticmethod
+    def encode(forms):
+        constants = {}
+        atoms = []
+        shape = []
+        pending = [(form, False) for form in reversed(forms)]  # Items to visit, and lists to close once visited
+        while len(pending) > 0:
+            exp, close = pending.pop()
+            if close:
+                shape.append(exp)
+            elif type(exp) is Cons or exp is BuiltIns.NIL:
+                items = []
+                while exp is not BuiltIns.NIL:
+                    items.append(exp.car)
+                    exp = exp.cdr
+                pending.append((len(items), True))
+                pending.extend((item, False) for item in reversed(items))
+            else:
+                if type(exp) is Symbol:
+                    constant = exp.value
+                elif type(exp) is BuiltIns.String:
+                    constant = exp.value.encode('utf-8')
+                else:
+                    constant = exp
+                # Keyed by type as well, since 1 == 1.0
+                atoms.append(constants.setdefault((type(constant), constant), len(constants)))
+                if len(shape) > 0 and shape[-1] < 0:
+                    shape[-1] -= 1
+                else:
+                    shape.append(-1)
+        return tuple(constant for _, constant in constants), ParseCache.pack(atoms), ParseCache.pack(shape)
+
+    @staticmethod
+    def decode(constants, atoms, shape):
+        table = []
+        for constant in constants:
+            if type(constant) is str:
+                constant = Symbol(constant)
+            elif type(constant) is bytes:
+                constant = BuiltIns.String(constant.decode('utf-8'))
+            table.append(constant)
+        typecode, data = atoms
+        atoms = iter(list(map(table.__getitem__, memoryview(data).cast(typecode))))
+        typecode, data = shape
+        stack = []
+        for n in memoryview(data).cast(typecode):
+            if n < 0:
+                stack.extend(itertools.islice(atoms, -n))
+            else:
+                cons = BuiltIns.NIL
+                for _ in range(n):
+                    cons = Cons(stack.pop(), cons)
+                stack.append(cons)
+        return stack
+
+
+class Image:
+    """
+    The global bindings of a program saved to a file, so that a program can start from an environment already
+    holding its definitions instead of evaluating them again.
+
+    Values are pickled, with the builtins, the global cells and the environment itself saved by name and restored as
+    those of the interpreter loading the image. Procedures of the `Analyzer` are kept as their source and scope and
+    analyzed again when first applied; closures of the `VirtualMachine` keep their bytecode. Lists sharing a tail are
+    restored with a copy of it each.
+    """
+    version = 1  # Bumping it makes existing images fail to load
+
+    @staticmethod
+    def builtins():
+        names = {}
+        for symbol, value in BuiltIns.globals.items():
+            names[symbol.value] = value
+            if type(value) in (BuiltIns.BuiltInProcs.EnvironmentForm, BuiltIns.BuiltInProcs.ProfileForm):
+                names[f'{symbol.value} PROCEDURE'] = value.proc
+        names['PROMISE'] = Compiler.promise
+        return names
+
+    @staticmethod
+    def pickler(file, env):
+        import pickle
+        builtins = {id(value): ('BUILTIN', name) for name, value in Image.builtins().items()}
+
+        def persistent_id(obj):
+            if obj is env:
+                return 'ENV'
+            if type(obj) is Cell and env.cells.get(obj.symbol) is obj:
+                return 'CELL', obj.symbol
+            return builtins.get(id(obj))
+        pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = persistent_id
+        return pickler
+
+    @staticmethod
+    def unpickler(file, env):
+        import pickle
+        builtins = Image.builtins()
+
+        def persistent_load(pid):
+            if pid == 'ENV':
+                return env
+            kind, name = pid
+            if kind == 'CELL':
+                return env.cell(name)
+            return builtins[name]
+        unpickler = pickle.Unpickler(file)
+        unpickler.persistent_load = persistent_load
+        return unpickler
+
+    @staticmethod
+    def dumps(value, env):
+        file = io.BytesIO()
+        Image.pickler(file, env).dump(value)
+        return file.getvalue()
+
+    @staticmethod
+    def loads(data, env):
+        return Image.unpickler(io.BytesIO(data), env).load()
+
+    @staticmethod
+    def bindings(env):
+        # Bindings of `env` other than those it shares with its parent
+        parent = {} if env.parent is None else env.parent.cells
+        return {symbol: cell.value for symbol, cell in env.cells.items()
+                if cell.value is not None and (symbol not in parent or parent[symbol].value is not cell.value)}
+
+    @staticmethod
+    def bind(env, bindings):
+        for symbol, value in bindings.items():
+            env.cell(symbol).value = value
+
+    @staticmethod
+    def save(path, env):
+        with open(path, 'wb') as f:
+            pickler = Image.pickler(f, env)
+            pickler.dump(Image.version)
+            pickler.dump(Image.bindings(env))
+
+    @staticmethod
+    def load(path, env=None):
+        # Binds the globals saved at `path` in `env`, by default a new environment extending the builtins
+        if env is None:
+            env = BuiltIns.global_env.extend()
+        enabled = gc.isenabled()
+        gc.disable()  # Nothing loaded is garbage, so collections triggered by the allocations would be wasted
+        try:
+            with open(path, 'rb') as f:
+                unpickler = Image.unpickler(f, env)
+                if unpickler.load() != Image.version:
+                    raise Error.IncompatibleImageException(path)
+                Image.bind(env, unpickler.load())
+        finally:
+            if enabled:
+                gc.enable()
+        return env
+
+
+class Serializer:
+    """
+    Compact binary form of Lisp values, for moving them between processes or to disk without printing and reading.
+
+    Handles NIL, T, symbols, strings, numbers, conses, vectors, builtin procedures, and user procedures with the frames
+    and scopes they close over; procedures are analyzed again in the environment given to `loads` when first applied.
+    `dumps` returns `marshal` data in the layout of `ParseCache`, generalized to a small stack machine:
+
+    constants  symbol names, strings as UTF-8 bytes and numbers, each stored once
+    atoms      indices into NIL, T and the constants, in the order pushed
+    ops        op kind in the low 3 bits, its argument n in the others:
+               ATOMS push the next n atoms, LIST / DOTTED replace the last n items (and a tail) with a list of n new
+               conses, REF push object n again, OBJECT push a new object of kind n, FILL set the contents of the
+               object under the last n items to them, BUILTIN replace a name by the builtin it names
+
+    Conses and objects are numbered for REF in the order they are made, the conses of a list from its end, so that
+    structure met again while encoding stays shared without being looked for beforehand: a list whose rest was already
+    made is DOTTED to a REF to it. Objects are numbered before their contents, so they may refer to themselves, as a
+    frame holding a procedure defined in it does.
+    """
+    version = 2  # Of the format above; `loads` refuses data of another version
+    ATOMS, LIST, DOTTED, REF, OBJECT, FILL, BUILTIN = range(7)
+    objects = (list, BuiltIns.Vector, UserDefinedProcedure, Scope)  # Kinds of OBJECT; lists are frames
+
+    @staticmethod
+    def dumps(value):
+        return marshal.dumps((Serializer.version, *Serializer.encode(value)))
+
+    @staticmethod
+    def loads(data, env=None):
+        # `env` holds the globals of the procedures loaded, by default a new environment extending the builtins
+        version, *encoded = marshal.loads(data)
+        if version != Serializer.version:
+            raise Error.IncompatibleDataException(version)
+        return Serializer.decode(*encoded, BuiltIns.global_env.extend() if env is None else env)
+
+    @staticmethod
+    def contents(value):
+        # Contents of an OBJECT
+        if type(value) is list:
+            return value
+        if type(value) is BuiltIns.Vector:
+            return value.items()
+        if type(value) is UserDefinedProcedure:
+            return [value.name, value.expression, value.frame, value.scope, value.size, *value.parameters]
+        return [value.parent, value.toplevel, value.size, *value.names, *value.slots]
+
+    @staticmethod
+    def encode(value):
+        S = Serializer
+        objects = {cls: kind for kind, cls in enumerate(S.objects)}
+        builtins = {id(value): Symbol(name) for name, value in Image.builtins().items()}
+        constants = {}
+        known = {id(BuiltIns.NIL): 0, id(BuiltIns.T): 1}  # Id of a symbol met -> its atom, as symbols repeat
+        atoms = []
+        ops = []
+        grouped = 0  # Atoms counted by the ATOMS ops so far
+        # Id of an object or cons -> its number, or for a cons, the entry of its list: [next cons or the tail, conses
+        # walked, whether the tail is encoded, number of the first cons once made, `None` while the list is encoded]
+        memo = {}
+        made = 0  # Conses and objects numbered
+        pending = [(iter((value,)), None)]  # Entries of lists, and other values as (iterator, op ending them)
+
+        def emit(op):
+            nonlocal grouped
+            if len(atoms) > grouped:
+                ops.append(S.ATOMS | (len(atoms) - grouped) << 3)
+                grouped = len(atoms)
+            ops.append(op)
+
+        def enter(value):
+            # Encodes `value` if it is an atom or was met before, else pushes an entry for it; whether it pushed one
+            nonlocal made
+            if id(value) in known:
+                atoms.append(known[id(value)])
+                return False
+            if type(value) is Cons:
+                number = memo.get(id(value))
+                if number is None:
+                    pending.append([value, [], False, None])
+                    return True
+                if type(number) is not int:
+                    if number[3] is None:  # Met again from its own car or rest
+                        raise ValueError('Cannot serialize a list containing itself')
+                    if number[1][0] is value:
+                        number = number[3]
+                    else:  # A rest of the list, whose conses are then looked up one by one
+                        memo.update(zip(map(id, number[1]), range(number[3], number[3] - len(number[1]), -1)))
+                        number = memo[id(value)]
+                emit(S.REF | number << 3)
+                return False
+            if type(value) in objects:
+                if id(value) in memo:
+                    emit(S.REF | memo[id(value)] << 3)
+                    return False
+                emit(S.OBJECT | objects[type(value)] << 3)
+                memo[id(value)] = made
+                made += 1
+                contents = S.contents(value)
+                pending.append((iter(contents), S.FILL | len(contents) << 3))
+                return True
+            if type(value) is Symbol:
+                constant = value.value
+            elif type(value) in (int, float, complex, bool) or value is None:  # Also in scopes and frames
+                constant = value
+            elif type(value) is BuiltIns.String:
+                constant = value.value.encode('utf-8')
+            elif type(value) is str:  # Name of a procedure, read back as a symbol
+                constant = value
+            elif id(value) in builtins:
+                pending.append((iter((builtins[id(value)],)), S.BUILTIN))
+                return True
+            else:
+                raise TypeError(f'Cannot serialize {value}')
+            # Keyed by type as well, since 1 == 1.0
+            atoms.append(constants.setdefault((type(constant), constant), len(constants) + 2))
+            if type(value) is Symbol:
+                known[id(value)] = atoms[-1]
+            return False
+
+        get = memo.get
+        known_get = known.get
+        while len(pending) > 0:
+            entry = pending[-1]
+            if type(entry) is tuple:
+                for value in entry[0]:
+                    if enter(value):
+                        break
+                else:
+                    pending.pop()
+                    if entry[1] is not None:
+                        emit(entry[1])
+                continue
+            # The items are encoded as the list is walked, up to its end or to a cons already made, a rest shared with
+            # a list encoded before. A later cons of the list met first from one of its items starts a list of its
+            # own, at which the walk then stops.
+            p, conses = entry[0], entry[1]
+            entered = False
+            while type(p) is Cons:
+                key = id(p)
+                if key in memo:
+                    break
+                memo[key] = entry
+                conses.append(p)
+                car = p.car
+                p = p.cdr
+                atom = known_get(id(car))
+                if atom is not None:
+                    atoms.append(atom)
+                elif enter(car):
+                    entered = True
+                    break
+            if not entered and p is not BuiltIns.NIL and not entry[2]:  # Improper list, or the rest is shared
+                entry[2] = True
+                entered = enter(p)
+            if entered:
+                entry[0] = p
+                continue
+            pending.pop()
+            emit((S.LIST if p is BuiltIns.NIL else S.DOTTED) | len(conses) << 3)
+            made += len(conses)  # Numbered as `decode` makes them, from the end of the list
+            entry[3] = made - 1
+        if len(atoms) > grouped:
+            ops.append(S.ATOMS | (len(atoms) - grouped) << 3)
+        return tuple(constant for _, constant in constants), ParseCache.pack(atoms), ParseCache.pack(ops)
+
+    @staticmethod
+    def decode(constants, atoms, ops, env):
+        S = Serializer
+        table = [BuiltIns.NIL, BuiltIns.T]
+        for constant in constants:
+            if type(constant) is str:
+                constant = Symbol(constant)
+            elif type(constant) is bytes:
+                constant = BuiltIns.String(constant.decode('utf-8'))
+            table.append(constant)
+        typecode, data = atoms
+        atoms = iter(list(map(table.__getitem__, memoryview(data).cast(typecode))))
+        typecode, data = ops
+        stack = []
+        memo = []
+        builtins = None
+        for op in memoryview(data).cast(typecode):
+            kind = op & 7
+            n = op >> 3
+            if kind == S.ATOMS:
+                stack.extend(itertools.islice(atoms, n))
+            elif kind == S.LIST or kind == S.DOTTED:
+                cons = BuiltIns.NIL if kind == S.LIST else stack.pop()
+                for _ in range(n):
+                    cons = Cons(stack.pop(), cons)
+                    memo.append(cons)
+                stack.append(cons)
+            elif kind == S.REF:
+                stack.append(memo[n])
+            elif kind == S.OBJECT:
+                cls = S.objects[n]
+                obj = cls.__new__(cls)
+                memo.append(obj)
+                stack.append(obj)
+            elif kind == S.FILL:
+                contents = stack[len(stack) - n:]
+                del stack[len(stack) - n:]
+                S.fill(stack[-1], contents, env)
+            else:
+                if builtins is None:
+                    builtins = Image.builtins()
+                stack[-1] = builtins[stack[-1].value]
+        return stack[0]
+
+    @staticmethod
+    def fill(obj, contents, env):
+        if type(obj) is list:
+            obj.extend(contents)
+        elif type(obj) is BuiltIns.Vector:
+            obj.__init__(contents)
+        elif type(obj) is UserDefinedProcedure:
+            name, expression, frame, scope, size, *parameters = contents
+            obj.__init__(name, tuple(parameters), expression, None, None, size)
+            obj.__setstate__((frame, scope))
+        else:
+            parent, toplevel, size, *names = contents
+            obj.__init__(parent, (), env)
+            obj.toplevel = toplevel
+            obj.size = size
+            obj.names = names[:len(names) // 2]
+            obj.slots = names[len(names) // 2:]
+
+
+class Parallel:
+    """
+    PMAP and PARALLEL-FOR-EACH: a procedure applied to the items of a list in chunks, by worker processes.
+
+    The procedure is sent to the workers with the global bindings of the program, pickled as by `Image`, and analyzed
+    again there; each worker keeps the last few it loaded, so the further chunks of a map only cost their items. The
+    results are returned in order. The workers are kept for later maps.
+    """
+    workers = os.cpu_count() or 1  # Default number of worker processes
+    pools = {}  # Number of workers -> executor
+    loaded = collections.OrderedDict()  # In a worker: pickled procedure and bindings -> (env, procedure)
+    in_worker = False  # Maps in a worker are run there, rather than by workers of its own
+
+    @staticmethod
+    def map(env, proc, items, chunk_size=None, workers=None):
+        if workers is None:
+            workers = Parallel.workers
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(len(items) / (workers * 4)))  # A few chunks per worker to balance the load
+        if type(chunk_size) is not int or chunk_size < 1 or type(workers) is not int or workers < 1:
+            raise ValueError(f'Invalid chunk size or number of workers: {chunk_size}, {workers}')
+        if workers == 1 or len(items) <= chunk_size or Parallel.in_worker:
+            return [proc.apply([item]) for item in items]
+        payload = Image.dumps((Image.bindings(env), proc), env)
+        chunks = [Image.dumps(items[i:i + chunk_size], env) for i in range(0, len(items), chunk_size)]
+        results = []
+        for chunk in Parallel.pool(workers).map(Parallel.apply, itertools.repeat(payload), chunks):
+            results.extend(Image.loads(chunk, env))
+        return results
+
+    @staticmethod
+    def pool(workers):
+        import concurrent.futures
+        pool = Parallel.pools.get(workers)
+        if pool is None:
+            pool = Parallel.pools[workers] = concurrent.futures.ProcessPoolExecutor(workers)
+        return pool
+
+    @staticmethod
+    def apply(payload, chunk):
+        # Run by a worker: the results for the items of `chunk`, pickled
+        Parallel.in_worker = True
+        loaded = Parallel.loaded.get(payload)
+        if loaded is None:
+            env = BuiltIns.global_env.extend()
+            bindings, proc = Image.loads(payload, env)
+            Image.bind(env, bindings)
+            loaded = Parallel.loaded[payload] = env, proc
+            if len(Parallel.loaded) > 8:
+                Parallel.loaded.popitem(last=False)
+        env, proc = loaded
+        return Image.dumps([proc.apply([item]) for item in Image.loads(chunk, env)], env)
 
 
 class SchemePyLispInterpreter:
+    engines = ('analyze', 'vm')
+
     @staticmethod
-    def run(code: str):
-        run_env = Environment(BuiltIns.global_env.copy())
+    def run(code, engine: str = 'analyze', image=None):
+        # `code` is a string or a text file object, evaluated form by form as it is read
+        # `engine` is either 'analyze' (closures from `Analyzer`) or 'vm' (bytecode from `Compiler`)
+        # `image` is a file saved by SAVE-IMAGE, whose bindings the program starts with
         parser = Parser()
-        parsed = parser.parse(code)
-        for exp in parsed:
-            exp.evaluate(run_env)
+        forms = parser.iter_forms(io.StringIO(code) if type(code) is str else code)
+        SchemePyLispInterpreter.run_forms(forms, engine, image)
+
+    @staticmethod
+    def run_file(path, engine: str = 'analyze', cache: bool = False, image=None):
+        # With `cache`, the forms read are kept beside the file and reused while it is unchanged, see `ParseCache`
+        if cache:
+            SchemePyLispInterpreter.run_forms(ParseCache.read(path), engine, image)
+            return
+        with open(path, encoding='utf-8') as stream:
+            SchemePyLispInterpreter.run(stream, engine, image)
 
+    @staticmethod
+    def run_forms(forms, engine: str = 'analyze', image=None):
+        interpreter = Interpreter(engine, image)
+        for exp in forms:
+            interpreter.evaluate(exp)
 
-c = """
+    @staticmethod
+    def evaluate(exp, env, engine: str = 'analyze'):
+        if engine == 'vm':
+            return VirtualMachine.execute(Compiler.compile(exp, env))
+        return Analyzer.evaluate(exp, env)
+
+
+class Interpreter:
+    """
+    A Scheme program with a global environment of its own over the builtins, for running many programs side by side.
+
+    Creating one costs an empty `Environment`: the builtins are copied into it cell by cell as the program first uses
+    them, and the builtin environment itself is only ever read. An instance runs one form at a time; separate instances
+    can run in separate threads without seeing each other's bindings, DISPLAY writing to each one's `output`.
+    """
+    __slots__ = ('env', 'engine', 'output', 'lock', 'scheduler')
+
+    def __init__(self, engine: str = 'analyze', image=None, output=None, restricted=()):
+        if engine not in SchemePyLispInterpreter.engines:
+            raise ValueError(f'Unknown engine: {engine}')
+        self.env = BuiltIns.global_env.extend() if image is None else Image.load(image)
+        self.env.restricted = frozenset(restricted)  # Names of the forms programs may not use, e.g. SAVE-IMAGE
+        self.engine = engine
+        self.output = output  # File object DISPLAY writes to; `None` for that of the caller's context
+        self.lock = threading.Lock()
+        self.scheduler = None  # Of the green threads, created by `evaluate_async`
+
+    def evaluate(self, exp):
+        with self.lock:
+            token = None if self.output is None else BuiltIns.output.set(self.output)
+            try:
+                return SchemePyLispInterpreter.evaluate(exp, self.env, self.engine)
+            finally:
+                if token is not None:
+                    BuiltIns.output.reset(token)
+
+    async def evaluate_async(self, exp):
+        # Evaluates `exp` as a task on the running event loop, alongside the tasks it spawns, see `Scheduler`
+        if self.engine != 'vm':
+            raise ValueError('Tasks are suspended by the vm engine only')
+        if self.scheduler is None:
+            self.scheduler = Scheduler(self.output)
+        task = self.scheduler.spawn(VirtualMachine.Closure(Compiler.compile(exp, self.env), None))
+        return await self.scheduler.join(task)
+
+    async def run_async(self, code):
+        # As `run`, evaluating each form with `evaluate_async`
+        value = BuiltIns.NIL
+        for exp in Parser().iter_forms(io.StringIO(code) if type(code) is str else code):
+            value = await self.evaluate_async(exp)
+        return value
+
+    def run(self, code):
+        # Evaluates the forms of `code`, a string or a text file object, returning the value of the last one
+        value = BuiltIns.NIL
+        for exp in Parser().iter_forms(io.StringIO(code) if type(code) is str else code):
+            value = self.evaluate(exp)
+        return value
+
+    def run_file(self, path, cache: bool = False):
+        if cache:
+            value = BuiltIns.NIL
+            for exp in ParseCache.read(path):
+                value = self.evaluate(exp)
+            return value
+        with open(path, encoding='utf-8') as stream:
+            return self.run(stream)
+
+    def profile(self, code, limit=None, memory=False):
+        # Runs `code` as `run` does under a new `Profiler`, writing its report to `output`; returns the profiler
+        profiler = Profiler(memory)
+        profiler.run(functools.partial(self.run, code))
+        profiler.report(self.output, limit)
+        return profiler
+
+    def sample(self, code, rate=100):
+        # Runs `code` as `run` does under a new `Sampler`, returned for its `report` of the stacks seen
+        sampler = Sampler(rate)
+        sampler.run(functools.partial(self.run, code))
+        return sampler
+
+
+if __name__ == '__main__':
+    c = """
 (define (x y) (y 2) (y 3))
 
 (display 
@@ -628,6 +3442,6 @@ c = """
 
 (define y (list x (+ 0.5 0.5) (cons 2.1 2.5) 3 4))
 (display y)
-"""
+    """
 
-SchemePyLispInterpreter.run(c)
+    SchemePyLispInterpreter.run(c)
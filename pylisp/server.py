@@ -0,0 +1,240 @@
+"""
+Evaluation server: python -m pylisp.server [--port PORT | --unix PATH] [options]
+
+Each connection is a session with a global environment of its own, kept warm for as long as the connection is open.
+The client sends source text, and each top-level form is evaluated as soon as it is complete. The server answers
+each form with JSON lines: {"output": text} for what DISPLAY writes while the form runs, streamed as it is written,
+then {"value": text} or {"error": text}.
+
+Each session evaluates its forms in order in a thread of its own, so a long evaluation holds up only its own session.
+An evaluation running longer than --timeout seconds is interrupted and answered with an error. Closing the connection,
+or only its sending side, ends the session: the form being evaluated is interrupted and the rest are dropped, so a
+client keeps the connection open until it has read its answers. DISPLAY waits while the client has not taken what was
+written before, so that a program displaying in a loop cannot fill the server's memory.
+
+Unless the server is started with --trusted, sessions cannot use the Scheme forms that read or write files or fork
+the server: SAVE-IMAGE and LOAD-IMAGE, whose images are unpickled, PMAP and PARALLEL-FOR-EACH.
+"""
+import argparse
+import asyncio
+import codecs
+import ctypes
+import importlib
+import json
+import queue
+import sys
+import threading
+
+dialects = {'scheme': 'pylisp.scheme_pylisp', 'common': 'pylisp.common_pylisp'}
+restricted = ('SAVE-IMAGE', 'LOAD-IMAGE', 'PMAP', 'PARALLEL-FOR-EACH')  # Forms of untrusted sessions
+default_timeout = 30.0  # Seconds an evaluation may run
+
+
+class InterruptedException(Exception): pass
+
+
+class Output:
+    # File object for DISPLAY in a session's thread, sending each write to the client from the event loop
+    limit = 1 << 20  # Characters written but not yet taken by the connection, beyond which DISPLAY waits
+
+    def __init__(self, session):
+        self.session = session
+        self.pending = 0
+        self.drained = threading.Condition()
+
+    def write(self, text):
+        if text:
+            with self.drained:
+                while self.pending > Output.limit:
+                    self.drained.wait(0.1)  # In slices, so that an interruption is not held up by the client
+                self.pending += len(text)
+            self.session.loop.call_soon_threadsafe(self.session.output, text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def release(self, size):
+        with self.drained:
+            self.pending -= size
+            self.drained.notify_all()
+
+
+class Session:
+    def __init__(self, interpreter, engine, image, trusted, timeout, writer):
+        self.interpreter = interpreter
+        self.timeout = timeout
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.parser = interpreter.Parser()
+        self.stdout = Output(self)
+        if hasattr(interpreter, 'SchemePyLispInterpreter'):
+            self.lisp = interpreter.Interpreter(engine, image, self.stdout, () if trusted else restricted)
+        else:
+            self.lisp = interpreter.Interpreter(self.stdout)
+        self.chunks = asyncio.Queue(16)  # Input read ahead of the evaluation, `None` once the client closed
+        self.closed = self.loop.create_future()  # Done once the client closed the connection
+        self.jobs = queue.SimpleQueue()  # Forms for the thread, with the futures of their outcomes
+        self.lock = threading.Lock()  # Held to change `running`, or to interrupt the thread while it is set
+        self.running = False  # Whether the thread is evaluating a form
+        self.thread = threading.Thread(target=self.work, name='session', daemon=True)
+        self.thread.start()
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b'\n')
+
+    def output(self, text):
+        self.send({'output': text})
+        self.loop.create_task(self.drain(len(text)))
+
+    async def drain(self, size):
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.stdout.release(size)
+
+    async def receive(self, reader):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        try:
+            while data := await reader.read(65536):
+                await self.chunks.put(decoder.decode(data))
+        except ConnectionError:
+            pass
+        finally:
+            self.closed.set_result(None)
+        await self.chunks.put(None)
+
+    async def serve(self, reader):
+        receiving = self.loop.create_task(self.receive(reader))
+        try:
+            while (chunk := await self.chunks.get()) is not None and await self.feed(chunk):
+                pass
+        finally:
+            receiving.cancel()
+            self.interrupt()
+            self.jobs.put(None)
+
+    async def feed(self, chunk):
+        # Evaluates the forms completed by `chunk`; false once the client closed the connection
+        forms = self.parser.feed(chunk)
+        while not self.closed.done():
+            # Each form is evaluated as soon as it is read, so a reader error only loses the rest of the chunk
+            try:
+                exp = next(forms)
+            except StopIteration:
+                return True
+            except Exception as e:
+                self.parser = self.interpreter.Parser()  # Reading starts over with the next chunk
+                self.send({'error': error_message(e)})
+                return True
+            outcome = self.loop.create_future()
+            self.jobs.put((exp, outcome))
+            await asyncio.wait((outcome, self.closed), timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+            if outcome.done():
+                ok, value = outcome.result()
+                self.send({'value': str(value)} if ok else {'error': error_message(value)})
+            elif self.closed.done():
+                return False
+            else:
+                self.interrupt()
+                self.send({'error': f'TimeoutError: interrupted after {self.timeout:g} seconds'})
+            await self.writer.drain()
+        return False
+
+    def work(self):
+        # The session's thread, evaluating the forms put on `jobs` until it gets `None`
+        while (job := self.jobs.get()) is not None:
+            exp, outcome = job
+            try:
+                result = self.evaluate(exp)
+            except InterruptedException as e:  # Raised as the evaluation returned
+                result = False, e
+            try:
+                self.loop.call_soon_threadsafe(self.settle, outcome, result)
+            except RuntimeError:  # The event loop was closed with the session
+                return
+
+    def evaluate(self, exp):
+        with self.lock:
+            self.running = True
+        try:
+            return True, self.lisp.evaluate(exp)
+        except Exception as e:
+            return False, e
+        finally:
+            with self.lock:
+                self.running = False
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread.ident), None)  # Too late
+
+    def interrupt(self):
+        # Raises `InterruptedException` in the thread if it is evaluating, at its next bytecode instruction
+        with self.lock:
+            if self.running:
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread.ident),
+                                                           ctypes.py_object(InterruptedException))
+
+    @staticmethod
+    def settle(outcome, result):
+        if not outcome.done():
+            outcome.set_result(result)
+
+
+def error_message(e):
+    return f'{type(e).__name__}: {" ".join(str(arg) for arg in e.args)}'
+
+
+async def handle(interpreter, engine, image, trusted, timeout, reader, writer):
+    try:
+        await Session(interpreter, engine, image, trusted, timeout, writer).serve(reader)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(interpreter, engine='analyze', image=None, host='127.0.0.1', port=0, path=None, ready=None,
+                trusted=False, timeout=default_timeout):
+    # Serves on the Unix socket at `path` if given, else on TCP; `ready` is called with the server once listening
+    def handler(reader, writer):
+        return handle(interpreter, engine, image, trusted, timeout, reader, writer)
+    if path is not None:
+        server = await asyncio.start_unix_server(handler, path)
+    else:
+        server = await asyncio.start_server(handler, host, port)
+    async with server:
+        if ready is not None:
+            ready(server)
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pylisp.server', description='Serves Lisp evaluation sessions.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--dialect', choices=dialects, default='scheme')
+    parser.add_argument('--engine', choices=('analyze', 'vm'), default='analyze', help='Scheme evaluator')
+    parser.add_argument('--image', help='Scheme image saved by SAVE-IMAGE that each session starts from')
+    parser.add_argument('--trusted', action='store_true', help='let sessions use ' + ', '.join(restricted))
+    parser.add_argument('--timeout', type=float, default=default_timeout, metavar='SECONDS',
+                        help='interrupt evaluations running longer (default %(default)g)')
+    args = parser.parse_args(argv)
+    if args.dialect == 'common' and (args.engine != 'analyze' or args.image is not None):
+        parser.error('--engine and --image apply to Scheme only')
+    interpreter = importlib.import_module(dialects[args.dialect])
+
+    def ready(server):
+        for socket in server.sockets:
+            print('Listening on', socket.getsockname(), file=sys.stderr)
+    try:
+        asyncio.run(serve(interpreter, args.engine, args.image, args.host, args.port, args.unix, ready, args.trusted,
+                          args.timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
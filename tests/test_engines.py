@@ -0,0 +1,62 @@
+"""
+The virtual machine must give what the analyzer gives: the same values, the same output and the same errors.
+"""
+import io
+
+import pytest
+
+from pylisp.scheme_pylisp import Interpreter
+
+programs = [
+    # Procedures, scopes and tail calls
+    '(define (fact n) (if (= n 0) 1 (* n (fact (- n 1))))) (fact 30)',
+    '(define (loop n acc) (if (= n 0) acc (loop (- n 1) (+ acc n)))) (loop 100000 0)',
+    '(define (make-counter) (let ((n 0)) (lambda () n))) ((make-counter))',
+    '(define (adder n) (lambda (x) (+ x n))) (map (adder 10) (list 1 2 3))',
+    '(define (compose f g) (lambda (x) (f (g x)))) ((compose (lambda (x) (* x 2)) (lambda (x) (+ x 1))) 5)',
+    '((lambda (x y) (let ((x y) (y x)) (list x y))) 1 2)',
+    '(define (even n) (if (= n 0) t (odd (- n 1)))) (define (odd n) (if (= n 0) nil (even (- n 1)))) (even 10001)',
+    '(define (f) (define a 1) (define (g) (+ a 1)) (g)) (f)',
+    # Conditionals and data
+    "(cond ((> 1 2) 'a) ((< 1 2) 'b) (t 'c))",
+    "(cond ((> 1 2) 'a))",
+    "(list (if nil 1 2) (if '() 1 2) (if 0 1 2) (not nil) (not 0))",
+    "(list 'a \"text\" 1.5 (/ 7 2) (/ 6 3) (- 5) (cons 1 2) '(1 (2 . 3)) (quote ()))",
+    '(accumulate + 0 (filter (lambda (x) (> x 2)) (map (lambda (x) (* x x)) (list 1 2 3 4))))',
+    # Vectors
+    '(define v (make-vector 3 0)) (vector-set! v 1 5) (list (vector-ref v 1) (vector-length v) (vector-sum v))',
+    '(vector-dot (vector-scale (list->vector (list 1 2)) 2) (vector-add (list->vector (list 1 1)) '
+    '(list->vector (list 2 3))))',
+    # Streams, promises and memoized procedures
+    '(define (ints n) (cons-stream n (ints (+ n 1)))) (stream-ref (stream-filter (lambda (x) (> x 5)) '
+    '(stream-map (lambda (x) (* x 2)) (ints 0))) 3)',
+    '(define p (delay (undefined-procedure))) 1',
+    "(define p (delay (+ 1 2))) (list (force p) (force p) (stream-null? the-empty-stream))",
+    '(define-memoized (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))) (fib 80)',
+    # Output
+    '(display "a") (newline) (display (list 1 "b")) (display 2.5)',
+    # Errors
+    '(car 5)',
+    '(undefined-procedure 1)',
+    '(+ 1 undefined-variable)',
+    '(define (f x) x) (f 1 2)',
+    '((lambda (x) x))',
+    '(1 2)',
+    '(vector-ref (make-vector 2 0) 5)',
+    '(/ 1 0)',
+]
+
+
+def outcome(engine, program):
+    output = io.StringIO()
+    interpreter = Interpreter(engine, output=output)
+    try:
+        value = str(interpreter.run(program))
+    except Exception as e:
+        value = type(e).__name__
+    return value, output.getvalue()
+
+
+@pytest.mark.parametrize('program', programs)
+def test_parity(program):
+    assert outcome('vm', program) == outcome('analyze', program)
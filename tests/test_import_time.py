@@ -0,0 +1,46 @@
+"""
+Import-time budget: importing an interpreter defines its classes and nothing more, so it stays cheap.
+
+Each import is timed in a fresh process, best of a few runs, as a warm process would have the modules cached.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+budget = 0.2  # Seconds for the import alone; about 0.02 at the time of writing
+runs = 3
+deferred = ('asyncio', 'pickle', 'concurrent', 'multiprocessing')  # Imported only by the features that use them
+
+probe = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in sys.modules if name.split('.')[0] in {deferred!r} or name.startswith('numpy.')]
+print(elapsed, *loaded)
+'''
+
+
+def run_probe(module):
+    result = subprocess.run([sys.executable, '-c', probe.format(module=module, deferred=deferred)], cwd=root,
+                            capture_output=True, text=True, check=True)
+    elapsed, *loaded = result.stdout.split()
+    return float(elapsed), loaded, result.stderr
+
+
+@pytest.mark.parametrize('module', ['pylisp.scheme_pylisp', 'pylisp.common_pylisp'])
+def test_import_time(module):
+    best = min(run_probe(module)[0] for _ in range(runs))
+    assert best < budget, f'importing {module} took {best:.3f}s, over the budget of {budget}s'
+
+
+@pytest.mark.parametrize('module', ['pylisp.scheme_pylisp', 'pylisp.common_pylisp'])
+def test_import_runs_nothing(module):
+    result = subprocess.run([sys.executable, '-c', f'import {module}'], cwd=root, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout == '' and result.stderr == ''
+    _, loaded, _ = run_probe(module)
+    assert loaded == [], f'importing {module} imported {", ".join(loaded)}'
@@ -0,0 +1,28 @@
+"""
+Command-line runner: the dialect is chosen by the file suffixes, which must agree unless --dialect is given.
+"""
+import pytest
+
+from pylisp.__main__ import main
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / 'a.scm').write_text('(display (list 1 2))')
+    (tmp_path / 'b.lisp').write_text('(print (list 1 2))')
+    (tmp_path / 'c.lisp').write_text('(display 3)')  # Also Scheme
+    return tmp_path
+
+
+@pytest.mark.parametrize('argv, printed', [(['a.scm'], '(1 2)'), (['b.lisp'], '(1 2)'),
+                                           (['a.scm', '-e', '(display 3)'], '(1 2)3'),
+                                           (['--dialect', 'scheme', 'a.scm', 'c.lisp'], '(1 2)3')])
+def test_dialect(files, capsys, argv, printed):
+    assert main([str(files / arg) if arg.endswith(('.scm', '.lisp')) else arg for arg in argv]) == 0
+    assert capsys.readouterr().out.strip() == printed
+
+
+def test_mixed_dialects(files, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(files / 'a.scm'), str(files / 'b.lisp')])
+    assert exit_info.value.code == 2 and 'both dialects' in capsys.readouterr().err
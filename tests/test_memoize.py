@@ -0,0 +1,57 @@
+"""
+Memoized procedures: DEFINE-MEMOIZED, MEMOIZE, MEMO-STATS and MEMO-CLEAR!, how deep they recurse, and what they are given.
+"""
+import pytest
+
+from pylisp.scheme_pylisp import Error, Interpreter
+
+engines = ['analyze', 'vm']
+
+count_change = '''
+(define-memoized (cc amount kinds)
+  (cond ((= amount 0) 1)
+        ((< amount 0) 0)
+        ((= kinds 0) 0)
+        ((> kinds 0) (+ (cc amount (- kinds 1)) (cc (- amount (first-denomination kinds)) kinds)))))
+(define (first-denomination kinds)
+  (cond ((= kinds 1) 1) ((= kinds 2) 5) ((= kinds 3) 10) ((= kinds 4) 25) ((= kinds 5) 50)))
+'''
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_count_change(engine):
+    interpreter = Interpreter(engine)
+    assert interpreter.run(count_change + '(cc 100 5)') == 292
+    stats = interpreter.run('(memo-stats cc)')
+    hits, misses, entries = stats.car, stats.cdr.car, stats.cdr.cdr.car
+    assert misses == entries and hits > 0
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_memoized_tail_recursion(engine):
+    # Memoized applications in tail position are resolved in a loop, like those of other procedures
+    code = '(define-memoized (loop n acc) (if (= n 0) acc (loop (- n 1) (+ acc 1)))) (loop 20000 0)'
+    assert Interpreter(engine).run(code) == 20000
+
+
+def test_deep_memoized_recursion():
+    # The virtual machine keeps memoized applications on its own stack, as it does those of other closures
+    interpreter = Interpreter('vm')
+    assert interpreter.run('(define-memoized (count n) (if (= n 0) 0 (+ 1 (count (- n 1))))) (count 5000)') == 5000
+    assert interpreter.run(count_change + '(cc 1000 5)') == 801451
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_eviction_and_clear(engine):
+    interpreter = Interpreter(engine)
+    interpreter.run('(define g (memoize (lambda (x) (* x 2)) 2)) (g 1) (g 2) (g 3) (g 1)')
+    assert str(interpreter.run('(memo-stats g)')) == '(0 4 2)'
+    interpreter.run('(memo-clear! g)')
+    assert str(interpreter.run('(memo-stats g)')) == '(0 0 0)'
+
+
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('code', ['(memo-stats car)', '(memo-stats 5)', '(define (f x) x) (memo-clear! f)'])
+def test_not_memoized(engine, code):
+    with pytest.raises(Error.WrongTypeArgumentException):
+        Interpreter(engine).run(code)
@@ -0,0 +1,57 @@
+"""
+Profiler: applications counted on either engine and in Common Lisp, and memory counted only when asked, own blocks within the retained.
+"""
+import io
+
+import pytest
+
+from pylisp import common_pylisp
+from pylisp.scheme_pylisp import Interpreter, Symbol
+
+engines = ['analyze', 'vm']
+
+programs = '''
+(define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+(define (build n) (if (= n 0) '() (cons (list n n) (build (- n 1)))))
+'''
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_calls(engine):
+    output = io.StringIO()
+    interpreter = Interpreter(engine, output=output)
+    interpreter.run(programs)
+    profiler = interpreter.profile('(fib 10)')
+    assert profiler.stats[Symbol('FIB')][0] == 177 and profiler.stats['+'][0] == 88
+    assert 'retained' not in output.getvalue()
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_memory(engine):
+    output = io.StringIO()
+    interpreter = Interpreter(engine, output=output)
+    interpreter.run(programs)
+    profiler = interpreter.profile('(build 50)', memory=True)
+    calls, inclusive, exclusive, retained, own, _ = profiler.stats[Symbol('BUILD')]
+    assert calls == 51 and retained >= 50 and own <= retained
+    assert 'retained' in output.getvalue()
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_profile_form(engine):
+    output = io.StringIO()
+    interpreter = Interpreter(engine, output=output)
+    assert interpreter.run(programs + '(list (profile (fib 5)) (profile (fib 5) t))') is not None
+    timing, memory = output.getvalue().split('     calls')[1:]
+    assert 'retained' not in timing and 'retained' in memory
+
+
+def test_common_lisp():
+    output = io.StringIO()
+    interpreter = common_pylisp.Interpreter(output)
+    interpreter.run('(defun fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))')
+    profiler = interpreter.profile('(fib 10)')
+    assert profiler.stats[common_pylisp.Symbol('FIB')][0] == 177 and profiler.stats['+'][0] == 88
+    assert interpreter.run('(profile (fib 5) t)') == 5
+    timing, memory = output.getvalue().split('     calls')[1:]
+    assert 'retained' not in timing and 'retained' in memory
@@ -0,0 +1,78 @@
+"""
+Serializer and Image round-trips: values come back equal, with the structure they share still shared and the objects
+referring to themselves still doing so.
+"""
+import pytest
+
+from pylisp.scheme_pylisp import BuiltIns, Cons, Interpreter, Serializer, Symbol
+
+engines = ['analyze', 'vm']
+
+definitions = '''
+(define shared (list 1 "two" 'three))
+(define x (list shared shared (cons 0 shared) (list->vector (list shared 2.5))))
+(define v (make-vector 2 0))
+(vector-set! v 0 v)
+(define (f n) (if (= n 0) 'done (f (- n 1))))
+'''
+
+
+def round_trip(value):
+    return Serializer.loads(Serializer.dumps(value))
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_shared(engine):
+    x = Interpreter(engine).run(definitions + 'x')
+    y = round_trip(x)
+    assert str(y) == str(x)
+    shared = y.car
+    assert y.cdr.car is shared and y.cdr.cdr.car.cdr is shared and y.cdr.cdr.cdr.car.items()[0] is shared
+
+
+def test_shared_tail():
+    # A list whose rest was made before it, and one whose rest is made while encoding an item of it
+    tail = Cons(2, Cons(3, BuiltIns.NIL))
+    y = round_trip(Cons(Cons(1, tail), Cons(tail, BuiltIns.NIL)))
+    assert y.car.cdr is y.cdr.car
+    y = round_trip(Cons(tail, Cons(1, tail)))
+    assert y.car is y.cdr.cdr
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_cyclic(engine):
+    v = round_trip(Interpreter(engine).run(definitions + 'v'))
+    assert v.items()[0] is v and v.items()[1] == 0
+
+
+def test_procedure():
+    # A procedure closing over a frame that holds it, analyzed again in the environment it is loaded in
+    interpreter = Interpreter()
+    proc = interpreter.run("(define (make) (define (loop n) (if (= n 0) 'done (loop (- n 1)))) loop) (make)")
+    interpreter = Interpreter()
+    interpreter.env.cell(Symbol('LOOP-AGAIN')).value = Serializer.loads(Serializer.dumps(proc), interpreter.env)
+    assert interpreter.run('(loop-again 10000)') == Symbol('DONE')
+
+
+def test_list_containing_itself():
+    lst = Cons(1, BuiltIns.NIL)
+    lst.cdr = Cons(2, lst)
+    with pytest.raises(ValueError):
+        Serializer.dumps(lst)
+    vector = BuiltIns.Vector([0])
+    lst = Cons(vector, BuiltIns.NIL)
+    vector.set(0, lst)
+    with pytest.raises(ValueError):
+        Serializer.dumps(lst)
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_image(engine, tmp_path):
+    path = tmp_path / 'image'
+    saved = Interpreter(engine).run(definitions + f'(save-image "{path}") x')
+    interpreter = Interpreter(engine, image=str(path))
+    x, shared, v = interpreter.run('x'), interpreter.run('shared'), interpreter.run('v')
+    assert str(x) == str(saved)
+    assert x.car is shared and x.cdr.car is shared and x.cdr.cdr.cdr.car.items()[0] is shared
+    assert v.items()[0] is v
+    assert interpreter.run('(f 10000)') == Symbol('DONE')
@@ -0,0 +1,130 @@
+"""
+Evaluation server: answers, timeouts, interruption on disconnect, output waiting for the client, and the forms
+of untrusted sessions.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from pylisp import scheme_pylisp, server
+
+
+async def start(**options):
+    # Server on a free port of the running loop, with its port
+    started = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(server.serve(scheme_pylisp, ready=started.set_result, **options))
+    return task, (await started).sockets[0].getsockname()[1]
+
+
+async def ask(port, text, answers):
+    # Messages up to the `answers`-th value or error, the connection being kept open until then
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(text.encode())
+    messages = []
+    while sum('output' not in message for message in messages) < answers:
+        messages.append(json.loads(await asyncio.wait_for(reader.readline(), 10)))
+    writer.close()
+    return messages
+
+
+def sessions():
+    return [thread for thread in threading.enumerate() if thread.name == 'session']
+
+
+def wait_for_sessions(count, seconds=5):
+    deadline = time.monotonic() + seconds
+    while len(sessions()) > count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return len(sessions())
+
+
+def test_answers():
+    async def main():
+        task, port = await start()
+        messages = await ask(port, '(define x 5) (display x) (+ x 1) (car 5) (1 2)) (+ 1 2)\n', 6)
+        task.cancel()
+        return messages
+    assert asyncio.run(main()) == [{'value': 'X'}, {'output': '5'}, {'value': 'NIL'}, {'value': '6'},
+                                   {'error': "AttributeError: 'int' object has no attribute 'car'"},
+                                   {'error': "AttributeError: 'int' object has no attribute 'apply'"},
+                                   {'error': 'UnmatchedParenthesesException: '}]
+
+
+def test_timeout():
+    async def main():
+        task, port = await start(timeout=0.2)
+        messages = await ask(port, '(define (f) (f)) (f) (+ 1 2)\n', 3)
+        task.cancel()
+        return messages
+    assert asyncio.run(main()) == [{'value': 'F'}, {'error': 'TimeoutError: interrupted after 0.2 seconds'},
+                                   {'value': '3'}]
+
+
+def test_disconnect_interrupts():
+    before = len(sessions())
+
+    async def main():
+        task, port = await start()
+        for _ in range(8):  # Runaway clients leaving without waiting for their answers
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'(define (f) (f)) (f)\n')
+            await writer.drain()
+            await asyncio.sleep(0.05)
+            writer.close()
+        messages = await ask(port, '(+ 1 1)\n', 1)
+        await asyncio.get_running_loop().run_in_executor(None, wait_for_sessions, before)
+        task.cancel()
+        return messages
+    assert asyncio.run(main()) == [{'value': '2'}]
+    assert wait_for_sessions(before) <= before
+
+
+def test_output_waits_for_the_client(monkeypatch):
+    outputs = []
+
+    class Output(server.Output):
+        limit = 1000
+
+        def __init__(self, session):
+            super().__init__(session)
+            outputs.append(self)
+    monkeypatch.setattr(server, 'Output', Output)
+
+    async def main():
+        task, port = await start()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'(define (f) (display "0123456789") (f)) (f)\n')  # Never read
+        pending = []
+        deadline = time.monotonic() + 10
+        while max(pending, default=0) <= Output.limit and time.monotonic() < deadline:  # Until the connection is full
+            pending.append(outputs[0].pending)
+            await asyncio.sleep(0.01)
+        for _ in range(20):
+            pending.append(outputs[0].pending)
+            await asyncio.sleep(0.01)
+        writer.close()
+        task.cancel()
+        return max(pending)
+    assert Output.limit < asyncio.run(main()) <= Output.limit + 10  # Waiting with at most one write over the limit
+
+
+@pytest.mark.parametrize('engine', ['analyze', 'vm'])
+def test_restricted_forms(engine, tmp_path):
+    # Rejected as they are analyzed or compiled, so that a procedure using one is not defined either
+    path = tmp_path / 'image'
+
+    async def main(trusted):
+        task, port = await start(engine=engine, trusted=trusted)
+        messages = await ask(port, f'(save-image "{path}") (load-image "{path}") (pmap car (list)) '
+                                   '(parallel-for-each car (list)) (define (f) (pmap car (list))) (f)\n', 6)
+        task.cancel()
+        return messages
+    assert asyncio.run(main(False)) == [{'error': f'UndefinedVariableException: {name}'} for name in
+                                        ('SAVE-IMAGE', 'LOAD-IMAGE', 'PMAP', 'PARALLEL-FOR-EACH', 'PMAP')] + \
+        [{'error': 'UndefinedVariableException: F'}]
+    assert not path.exists()
+    assert asyncio.run(main(True)) == [{'value': 'NIL'}] * 4 + [{'value': 'F'}, {'value': 'NIL'}]
+    assert path.exists()
@@ -0,0 +1,41 @@
+"""
+Streams: promises forced once, long and nested pipelines forced without deep recursion, and what the stream procedures
+are given.
+"""
+import io
+
+import pytest
+
+from pylisp.scheme_pylisp import Error, Interpreter
+
+engines = ['analyze', 'vm']
+
+integers = '(define (integers-from n) (cons-stream n (integers-from (+ n 1)))) (define ints (integers-from 0))'
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_pipelines(engine):
+    interpreter = Interpreter(engine)
+    interpreter.run(integers)
+    assert interpreter.run('(stream-ref (stream-filter (lambda (x) (> x 100000)) ints) 0)') == 100001
+    assert interpreter.run('(stream-ref (stream-map + ints ints) 20000)') == 40000
+    nested = '(stream-filter (lambda (x) (> x 10000)) ints)'
+    for _ in range(50):
+        nested = f'(stream-filter (lambda (x) t) {nested})'
+    assert interpreter.run(f'(stream-ref {nested} 10)') == 10011
+
+
+@pytest.mark.parametrize('engine', engines)
+def test_forced_once(engine):
+    output = io.StringIO()
+    code = '(define (f) (display "x") 1) (define p (delay (f))) (list (force p) (force p))'
+    assert str(Interpreter(engine, output=output).run(code)) == '(1 1)' and output.getvalue() == 'x'
+
+
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('code', ['(stream-car 5)', '(stream-cdr (list 1 2))', '(stream-ref (list 1 2) 1)',
+                                  '(stream-ref (cons-stream 1 5) 1)', '(stream-map car 5)',
+                                  '(stream-filter (lambda (x) nil) (cons-stream 1 (list 2)))'])
+def test_not_streams(engine, code):
+    with pytest.raises(Error.WrongTypeArgumentException):
+        Interpreter(engine).run(code)
@@ -0,0 +1,30 @@
+"""
+Green threads of the `vm` engine on an asyncio event loop.
+"""
+import asyncio
+
+from pylisp.scheme_pylisp import Interpreter
+
+
+def test_host_feeds_a_waiting_task():
+    async def main():
+        interpreter = Interpreter('vm')
+        await interpreter.run_async('(define c (make-channel))')
+        receiver = asyncio.create_task(interpreter.run_async('(channel-get c)'))
+        await asyncio.sleep(0.01)  # Until the receiver waits on the empty channel
+        await interpreter.run_async('(channel-put c 5)')
+        return await receiver
+    assert asyncio.run(main()) == 5
+
+
+def test_timed_out_task_is_dropped():
+    async def main():
+        interpreter = Interpreter('vm')
+        await interpreter.run_async('(define c (make-channel))')
+        try:
+            await asyncio.wait_for(interpreter.run_async('(channel-get c)'), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        await interpreter.run_async('(channel-put c 7)')  # Kept in the channel rather than given to the dropped task
+        return len(interpreter.scheduler.tasks), await interpreter.run_async('(channel-get c)')
+    assert asyncio.run(main()) == (0, 7)
@@ -0,0 +1,74 @@
+"""
+Batched MAP, FILTER and ACCUMULATE, and vectors held in NumPy arrays, must give what the interpreted procedures and
+lists give, falling back to them otherwise.
+"""
+import pytest
+
+from pylisp import scheme_pylisp
+from pylisp.scheme_pylisp import BuiltIns, Cons, Interpreter
+
+programs = [
+    '(map (lambda (x) (* x x)) (list 1 2 3))',
+    '(map (lambda (x) (+ x 0.5)) (list 1 2 3))',
+    '(map (lambda (x y) (- x y)) (list 1 2 3) (list 3 2 1))',
+    '(filter (lambda (x) (> x 2)) (list 1 2 3 4))',
+    '(accumulate + 0 (list 1 2 3 4))',
+    '(accumulate * 1 (list 1.5 2 3))',
+    # Integer results leaving int64
+    '(map (lambda (x) (* x x)) (list 4294967296 3))',
+    '(map (lambda (x) (+ x 1)) (list 9223372036854775807))',
+    '(accumulate + 0 (list 9223372036854775807 1))',
+    '(accumulate * 1 (list 4294967296 4294967296))',
+    # Integers past 2**53 divided, or compared with floats
+    '(map (lambda (x) (/ x 3)) (list 9007199254740993 3))',
+    '(filter (lambda (x) (< x 9007199254740992.0)) (list 9007199254740993 1))',
+    # Initial values and elements outside int64, and ints mixed with floats
+    '(accumulate + 1180591620717411303424 (list 1.5 2.5))',
+    '(accumulate + 1180591620717411303424 (list 1 2))',
+    '(accumulate + 0 (list 1180591620717411303424 1))',
+    '(map (lambda (x) (* x 2)) (list 1 2.5 1180591620717411303424))',
+    '(accumulate + 0 (list 1 2.5))',
+    # Division by zero
+    '(map (lambda (x) (/ 1 x)) (list 1 0))',
+]
+
+vector_programs = [
+    '(vector-ref (list->vector (list 1 2.5)) 0)',
+    '(vector-ref (list->vector (list 9007199254740993 2.5)) 0)',
+    '(define v (list->vector (list 1.5 2.5))) (vector-set! v 0 3) (vector-ref v 0)',
+    '(define v (list->vector (list 1 2))) (vector-set! v 0 3.5) (list (vector-ref v 0) (vector-ref v 1))',
+    '(define v (list->vector (list 1 2))) (vector-set! v 0 9223372036854775808) (vector-sum v)',
+    '(vector-add (list->vector (list 1 2)) (list->vector (list 0.5 1)))',
+    '(vector-add (list->vector (list 9223372036854775807 1)) (list->vector (list 1 1)))',
+    '(vector-scale (list->vector (list 4294967296 1)) 4294967296)',
+    '(vector-sum (list->vector (list 9223372036854775807 1)))',
+    '(vector-dot (list->vector (list 4294967296 1)) (list->vector (list 4294967296 1)))',
+    '(vector-dot (list->vector (list 1.5 2)) (list->vector (list 2 2)))',
+]
+
+
+def typed(value):
+    # The value with the type of each number, as 1 and 1.0 print differently
+    if type(value) is BuiltIns.Vector:
+        return 'VECTOR', [typed(item) for item in value.items()]
+    if type(value) is Cons:
+        items = []
+        while value is not BuiltIns.NIL:
+            items.append(typed(value.car))
+            value = value.cdr
+        return items
+    return type(value).__name__, str(value)
+
+
+def run(code):
+    try:
+        return typed(Interpreter().run(code))
+    except Exception as e:
+        return type(e).__name__
+
+
+@pytest.mark.parametrize('code', programs + vector_programs)
+def test_same_as_interpreted(code, monkeypatch):
+    batched = run(code)
+    monkeypatch.setattr(scheme_pylisp, 'numpy', None)  # No kernels nor arrays
+    assert batched == run(code)